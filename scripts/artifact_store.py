@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Artifact Store for the 1-Click Onboarding Portal
+------------------------------------------------
+Optional place to keep a copy of the artifacts generated for each
+application. Artifacts are rendered in memory and pushed to GitLab; a store
+is only needed to inspect what was last generated outside GitLab.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("onboarding-portal.artifacts")
+
+# Empty disables the store; memory:// keeps artifacts in the worker process
+# (an object storage stand-in); file:///path writes them below a local
+# directory or tmpfs mount
+ARTIFACT_STORE = os.getenv('ARTIFACT_STORE', '')
+ARTIFACT_STORE_MAX_BYTES = int(os.getenv('ARTIFACT_STORE_MAX_BYTES', 64 * 1024 * 1024))
+ARTIFACT_STORE_RETENTION = float(os.getenv('ARTIFACT_STORE_RETENTION', 7 * 24 * 3600))
+ARTIFACT_STORE_GC_INTERVAL = float(os.getenv('ARTIFACT_STORE_GC_INTERVAL', 60))
+
+def artifact_size(files):
+    """Total encoded size of a {path: content} artifact set"""
+    return sum(len(content.encode('utf-8')) for content in files.values())
+
+class MemoryArtifactStore:
+    """
+    In-process store holding the latest artifact set per application.
+
+    Sets older than `retention` seconds are dropped, and the least recently
+    saved sets are evicted while the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=ARTIFACT_STORE_MAX_BYTES, retention=ARTIFACT_STORE_RETENTION):
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def save(self, app_name, files):
+        size = artifact_size(files)
+        if size > self.max_bytes:
+            logger.warning(f"Artifacts for {app_name} ({size} bytes) exceed the store limit, not stored")
+            return False
+        with self._lock:
+            self._discard(app_name)
+            self._entries[app_name] = (time.time(), dict(files), size)
+            self._size += size
+            self.gc()
+        return True
+
+    def load(self, app_name):
+        with self._lock:
+            entry = self._entries.get(app_name)
+            return dict(entry[1]) if entry else None
+
+    def delete(self, app_name):
+        with self._lock:
+            self._discard(app_name)
+
+    def _discard(self, app_name):
+        entry = self._entries.pop(app_name, None)
+        if entry:
+            self._size -= entry[2]
+
+    def gc(self):
+        """Drop expired sets, then the oldest sets until within `max_bytes`"""
+        cutoff = time.time() - self.retention
+        while self._entries:
+            app_name, (saved_at, _, _) = next(iter(self._entries.items()))
+            if saved_at > cutoff and self._size <= self.max_bytes:
+                break
+            self._discard(app_name)
+
+    @property
+    def size(self):
+        return self._size
+
+class LocalArtifactStore:
+    """
+    Directory-backed store (local disk or tmpfs) holding the latest artifact
+    set per application under <root>/<app_name>/.
+
+    A set is written to a private staging directory and renamed into place,
+    so concurrent saves of the same application never interleave files and
+    readers never see a half-written set. Garbage collection runs at most
+    every `gc_interval` seconds and applies the same retention and size
+    limits as MemoryArtifactStore, using directory mtimes.
+    """
+
+    STAGING_PREFIX = '.staging-'
+
+    def __init__(self, root, max_bytes=ARTIFACT_STORE_MAX_BYTES, retention=ARTIFACT_STORE_RETENTION,
+                 gc_interval=ARTIFACT_STORE_GC_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _app_dir(self, app_name):
+        path = os.path.abspath(os.path.join(self.root, app_name))
+        if os.path.dirname(path) != self.root:
+            raise ValueError(f"Invalid application name for artifact store: {app_name}")
+        return path
+
+    def save(self, app_name, files):
+        size = artifact_size(files)
+        if size > self.max_bytes:
+            logger.warning(f"Artifacts for {app_name} ({size} bytes) exceed the store limit, not stored")
+            return False
+
+        target = self._app_dir(app_name)
+        staging = os.path.join(self.root, f"{self.STAGING_PREFIX}{uuid.uuid4().hex}")
+        for file_path, content in files.items():
+            path = os.path.abspath(os.path.join(staging, file_path))
+            if not path.startswith(staging + os.sep):
+                shutil.rmtree(staging, ignore_errors=True)
+                raise ValueError(f"Invalid artifact path: {file_path}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+
+        # Swap the new set in; the previous one is moved aside before removal
+        retired = f"{staging}-retired"
+        try:
+            os.rename(target, retired)
+        except FileNotFoundError:
+            retired = None
+        os.rename(staging, target)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+
+        self._maybe_gc()
+        return True
+
+    def load(self, app_name):
+        target = self._app_dir(app_name)
+        if not os.path.isdir(target):
+            return None
+        files = {}
+        for directory, _, filenames in os.walk(target):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                with open(path) as f:
+                    files[os.path.relpath(path, target).replace(os.sep, '/')] = f.read()
+        return files
+
+    def delete(self, app_name):
+        shutil.rmtree(self._app_dir(app_name), ignore_errors=True)
+
+    def _maybe_gc(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_gc < self.gc_interval:
+                return
+            self._last_gc = now
+        self.gc()
+
+    def _directory_size(self, path):
+        return sum(
+            os.path.getsize(os.path.join(directory, filename))
+            for directory, _, filenames in os.walk(path)
+            for filename in filenames
+        )
+
+    def gc(self):
+        """Drop expired sets and stale staging directories, then the oldest sets until within `max_bytes`"""
+        cutoff = time.time() - self.retention
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+            elif not name.startswith(self.STAGING_PREFIX):
+                entries.append((mtime, path, self._directory_size(path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+def create_artifact_store(uri=ARTIFACT_STORE):
+    """Build the artifact store named by an ARTIFACT_STORE URI, or None when disabled"""
+    if not uri:
+        return None
+    if uri.startswith('memory://'):
+        return MemoryArtifactStore()
+    if uri.startswith('file://'):
+        return LocalArtifactStore(uri[len('file://'):])
+    raise ValueError(f"Unsupported artifact store: {uri}")
@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+"""
+GitLab API Client for the 1-Click Onboarding Portal
+---------------------------------------------------
+Pooled, keep-alive HTTP client shared by every GitLab call the portal makes.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("onboarding-portal.gitlab")
+
+# Connection pool configuration
+GITLAB_POOL_SIZE = int(os.getenv('GITLAB_POOL_SIZE', 10))
+GITLAB_TIMEOUT = float(os.getenv('GITLAB_TIMEOUT', 30))
+
+# Verified-token cache configuration
+GITLAB_CREDENTIAL_TTL = float(os.getenv('GITLAB_CREDENTIAL_TTL', 300))
+
+# Conditional GET (ETag / Last-Modified) cache configuration
+GITLAB_CACHE_MAX_ENTRIES = int(os.getenv('GITLAB_CACHE_MAX_ENTRIES', 512))
+GITLAB_CACHE_TTL = float(os.getenv('GITLAB_CACHE_TTL', 600))
+
+# Retries of idempotent GETs after transient failures: attempts in total,
+# base of the jittered exponential backoff, and the longest wait (including
+# a Retry-After) worth making instead of failing
+GITLAB_RETRY_ATTEMPTS = int(os.getenv('GITLAB_RETRY_ATTEMPTS', 3))
+GITLAB_RETRY_BACKOFF = float(os.getenv('GITLAB_RETRY_BACKOFF', 0.25))
+GITLAB_RETRY_MAX_DELAY = float(os.getenv('GITLAB_RETRY_MAX_DELAY', 10))
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Concurrent identical GETs share one in-flight call
+GITLAB_COALESCE_READS = os.getenv('GITLAB_COALESCE_READS', 'True').lower() == 'true'
+
+# Circuit breaker: consecutive failures (5xx or no response) that open it,
+# and seconds it stays open before a single probe request is let through;
+# a threshold of 0 disables it
+GITLAB_BREAKER_THRESHOLD = int(os.getenv('GITLAB_BREAKER_THRESHOLD', 5))
+GITLAB_BREAKER_COOLDOWN = float(os.getenv('GITLAB_BREAKER_COOLDOWN', 30))
+
+class GitLabAPIError(Exception):
+    """Raised when a GitLab API call fails or returns an error status"""
+    def __init__(self, message, status_code=None, body=None):
+        self.message = message
+        self.status_code = status_code
+        self.body = body
+        super().__init__(self.message)
+
+class DeadlineExceeded(GitLabAPIError):
+    """Raised instead of calling GitLab once the caller's deadline has passed"""
+
+class CircuitOpenError(GitLabAPIError):
+    """Raised instead of calling GitLab while the circuit breaker is open"""
+
+_deadline = ContextVar('gitlab_deadline', default=None)
+
+def begin_deadline(seconds):
+    """
+    Require GitLab calls made in the current context to finish within
+    `seconds`; an enclosing deadline that expires sooner still applies.
+    Returns a token for end_deadline().
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    return _deadline.set(expires if current is None else min(current, expires))
+
+def end_deadline(token):
+    _deadline.reset(token)
+
+@contextmanager
+def deadline(seconds):
+    """Context manager form of begin_deadline()"""
+    token = begin_deadline(seconds)
+    try:
+        yield
+    finally:
+        end_deadline(token)
+
+def remaining_time():
+    """Seconds left before the current deadline, or None without one"""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+def retry_after(response):
+    """Seconds requested by a Retry-After header (delay or HTTP date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """
+    Stops calls to GitLab while it is failing.
+
+    After `threshold` consecutive failures the breaker opens and calls fail
+    immediately. Once `cooldown` seconds have passed a single probe is let
+    through (half-open): its success closes the breaker, its failure opens
+    it for another cooldown.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=GITLAB_BREAKER_THRESHOLD, cooldown=GITLAB_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        """True if a call may go to GitLab now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                # Only the caller that flips the breaker to half-open probes
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("GitLab circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.threshold):
+                logger.warning(
+                    f"GitLab circuit breaker open for {self.cooldown:.0f}s after {self._failures} consecutive failures"
+                )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+class CredentialCache:
+    """
+    Process-wide record of the last successful token verification.
+
+    A verification is trusted for `ttl` seconds. Once it is past the refresh
+    point (80% of the TTL) callers still get the cached result while a single
+    background thread re-validates the token.
+    """
+
+    REFRESH_RATIO = 0.8
+
+    def __init__(self, ttl=GITLAB_CREDENTIAL_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._verified_at = None
+        self._user = None
+        self._refreshing = False
+
+    @property
+    def user(self):
+        return self._user
+
+    def _age(self):
+        if self._verified_at is None:
+            return None
+        return time.monotonic() - self._verified_at
+
+    def is_valid(self):
+        """True while the last verification is within the TTL"""
+        age = self._age()
+        return age is not None and age < self.ttl
+
+    def needs_refresh(self):
+        """True when a valid entry should be re-validated in the background"""
+        age = self._age()
+        return age is not None and age >= self.ttl * self.REFRESH_RATIO
+
+    def claim_refresh(self):
+        """Reserve the background refresh slot; only one refresh runs at a time"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def release_refresh(self):
+        """Free the refresh slot after a failed refresh so it can be retried"""
+        with self._lock:
+            self._refreshing = False
+
+    def mark_verified(self, user):
+        with self._lock:
+            self._user = user
+            self._verified_at = time.monotonic()
+            self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._user = None
+            self._verified_at = None
+            self._refreshing = False
+
+class ResponseCache:
+    """
+    LRU cache of GitLab GET responses that carry validators.
+
+    Entries are never served blindly: the client always revalidates with
+    If-None-Match / If-Modified-Since and only reuses the cached body when
+    GitLab answers 304. Entries expire `ttl` seconds after they were stored
+    and the least recently used entry is evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries=GITLAB_CACHE_MAX_ENTRIES, ttl=GITLAB_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, params=None):
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()), doseq=True)}"
+
+    def get(self, key):
+        """Return the cached response for `key`, dropping it if expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, response = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix):
+        """Drop every entry whose key starts with `prefix`"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call
+    for their key is in flight wait for it and share its result or error
+    instead of making their own. Waiters give up at their own deadline; a
+    leader that ran out of its own (possibly much shorter) deadline does not
+    fail waiters with time left, they call again.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            self.out_of_time = False
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.led = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = self._Call()
+                    self.led += 1
+                else:
+                    self.shared += 1
+
+            if leader:
+                try:
+                    call.result = func()
+                    return call.result
+                except Exception as e:
+                    call.error = e
+                    remaining = remaining_time()
+                    call.out_of_time = isinstance(e, DeadlineExceeded) or (remaining is not None and remaining <= 0)
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+
+            remaining = remaining_time()
+            if not call.done.wait(None if remaining is None else max(0.0, remaining)):
+                raise DeadlineExceeded(f"Request deadline exceeded waiting for a shared call to {key}")
+            if call.out_of_time:
+                remaining = remaining_time()
+                if remaining is None or remaining > 0:
+                    continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+class GitLabClient:
+    """
+    Thread-safe GitLab REST API client.
+
+    All requests share one requests.Session whose adapter keeps a bounded pool
+    of keep-alive connections per host, so TCP and TLS setup is paid once per
+    pooled connection instead of once per call.
+
+    Every call is bounded by the caller's deadline (see deadline()) as well
+    as `timeout`. GETs are retried after transient failures, and while the
+    circuit breaker is open calls fail fast, except GETs with a cached
+    response, which is served as-is. Identical GETs made concurrently are
+    coalesced into one call whose response all callers share.
+    """
+
+    def __init__(self, base_url, token, pool_size=GITLAB_POOL_SIZE, timeout=GITLAB_TIMEOUT,
+                 credential_ttl=GITLAB_CREDENTIAL_TTL, cache_max_entries=GITLAB_CACHE_MAX_ENTRIES,
+                 retry_attempts=GITLAB_RETRY_ATTEMPTS, breaker_threshold=GITLAB_BREAKER_THRESHOLD,
+                 coalesce_reads=GITLAB_COALESCE_READS):
+        self.base_url = base_url.rstrip('/')
+        self.api_url = f"{self.base_url}/api/v4"
+        self.timeout = timeout
+        self.retry_attempts = max(1, retry_attempts)
+        self.breaker = CircuitBreaker(breaker_threshold) if breaker_threshold > 0 else None
+        self.singleflight = SingleFlight() if coalesce_reads else None
+        self.credentials = CredentialCache(credential_ttl)
+        self.cache = ResponseCache(cache_max_entries) if cache_max_entries > 0 else None
+        # Optional callable(method, status_code, seconds) told about every API
+        # call; status_code is None when no response was received
+        self.observer = None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'PRIVATE-TOKEN': token,
+            'Accept': 'application/json',
+            'User-Agent': 'devops-suite-onboarding-portal',
+        })
+
+        # pool_block keeps the pool bounded: callers wait for a free connection
+        # instead of opening throwaway ones under load
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def encode(value):
+        """URL-encode a path segment (file paths, namespaced project names)"""
+        return quote(str(value), safe='')
+
+    def request(self, method, path, params=None, json_body=None, timeout=None):
+        """
+        Send a request to the GitLab API and return the raw response.
+        
+        `path` is relative to /api/v4, or an absolute URL such as a pagination
+        Link returned by GitLab.
+        """
+        if path.startswith(('https://', 'http://')):
+            url = path
+        else:
+            url = f"{self.api_url}/{path.lstrip('/')}"
+        
+        if method == 'GET' and self.singleflight is not None:
+            # The shared Response is fully read (not streamed), so every caller can decode it
+            return self.singleflight.do(
+                ResponseCache.key(url, params),
+                lambda: self._request(method, url, path, params, json_body, timeout)
+            )
+        return self._request(method, url, path, params, json_body, timeout)
+
+    def _request(self, method, url, path, params, json_body, timeout):
+        """request() for one caller: conditional GET, retries and error handling"""
+        # Conditional GET: revalidate a cached response instead of re-downloading it
+        cache_key = cached = None
+        headers = {}
+        if method == 'GET' and self.cache is not None:
+            cache_key = ResponseCache.key(url, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if cached.headers.get('ETag'):
+                    headers['If-None-Match'] = cached.headers['ETag']
+                if cached.headers.get('Last-Modified'):
+                    headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        
+        attempt = 1
+        while True:
+            try:
+                response = self._send(method, url, path, params, json_body, headers, timeout)
+            except CircuitOpenError:
+                if cached is None:
+                    raise
+                # GitLab is unhealthy: serve the last known response rather than nothing
+                self.cache.record(hit=True)
+                return cached
+            except DeadlineExceeded:
+                raise
+            except GitLabAPIError as e:
+                delay = self._retry_delay(method, attempt)
+                if delay is None:
+                    raise
+                logger.info(f"{e.message}; retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    break
+                delay = self._retry_delay(method, attempt, response)
+                if delay is None:
+                    break
+                logger.info(f"{method} {path} returned HTTP {response.status_code}; retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+        if response.status_code == 401:
+            # Token revoked or expired: drop the cached verification immediately
+            self.credentials.invalidate()
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.record(hit=True)
+            self.cache.put(cache_key, cached)
+            return cached
+
+        if response.status_code >= 400:
+            raise GitLabAPIError(
+                f"{method} {path} returned HTTP {response.status_code}",
+                status_code=response.status_code,
+                body=response.text[:500]
+            )
+        
+        if cache_key is not None:
+            self.cache.record(hit=False)
+            if response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+                self.cache.put(cache_key, response)
+        elif method != 'GET' and self.cache is not None:
+            # Cached reads of a resource that was just written can no longer revalidate
+            self.cache.invalidate(url)
+        return response
+
+    def _send(self, method, url, path, params, json_body, headers, timeout):
+        """Make one HTTP call, within the deadline and subject to the circuit breaker"""
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{method} {path} not sent: request deadline exceeded")
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(f"{method} {path} not sent: GitLab is unavailable (circuit breaker open)")
+        
+        timeout = timeout or self.timeout
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        
+        started = time.monotonic()
+        try:
+            response = self.session.request(
+                method, url,
+                params=params,
+                json=json_body,
+                headers=headers or None,
+                timeout=timeout
+            )
+        except requests.RequestException as e:
+            self._observe(method, None, started)
+            self._record_health(healthy=False)
+            raise GitLabAPIError(f"{method} {path} failed: {str(e)}") from e
+        self._observe(method, response.status_code, started)
+        self._record_health(healthy=response.status_code < 500)
+        return response
+
+    def _record_health(self, healthy):
+        if self.breaker is None:
+            return
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _retry_delay(self, method, attempt, response=None):
+        """
+        Seconds to wait before retrying a failed call, or None when it must not
+        be retried: not a GET, out of attempts, or the wait (Retry-After, else
+        full-jitter exponential backoff) is too long or would pass the deadline
+        """
+        if method != 'GET' or attempt >= self.retry_attempts:
+            return None
+        delay = retry_after(response) if response is not None else None
+        if delay is None:
+            delay = random.uniform(0, GITLAB_RETRY_BACKOFF * 2 ** (attempt - 1))
+        if delay > GITLAB_RETRY_MAX_DELAY:
+            return None
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def _observe(self, method, status_code, started):
+        if self.observer is not None:
+            self.observer(method, status_code, time.monotonic() - started)
+
+    def _json(self, response):
+        """Decode a JSON response body, tolerating empty bodies"""
+        if not response.content:
+            return None
+        return response.json()
+
+    def get(self, path, params=None, timeout=None):
+        """GET a GitLab resource and return the decoded JSON body"""
+        return self._json(self.request('GET', path, params=params, timeout=timeout))
+
+    def paginate(self, path, params=None, per_page=100):
+        """
+        Iterate over every item of a paginated GitLab collection.
+        
+        Requests keyset pagination (ordered by id) and follows the Link
+        rel="next" header, which GitLab also sends for offset pagination on
+        endpoints without keyset support. Items are yielded page by page so
+        only one page is held in memory at a time.
+        """
+        params = dict(params or {})
+        params.setdefault('per_page', per_page)
+        params.setdefault('pagination', 'keyset')
+        params.setdefault('order_by', 'id')
+        params.setdefault('sort', 'asc')
+        
+        url = path
+        while url:
+            response = self.request('GET', url, params=params)
+            for item in self._json(response) or []:
+                yield item
+            
+            # The next link already carries every query parameter
+            url = response.links.get('next', {}).get('url')
+            params = None
+    
+    def post(self, path, data=None):
+        """POST to a GitLab resource and return the decoded JSON body"""
+        return self._json(self.request('POST', path, json_body=data))
+
+    def put(self, path, data=None):
+        """PUT to a GitLab resource and return the decoded JSON body"""
+        return self._json(self.request('PUT', path, json_body=data))
+
+    def delete(self, path):
+        """DELETE a GitLab resource"""
+        return self._json(self.request('DELETE', path))
+
+    def verify_credentials(self, force=False):
+        """
+        Verify the token against /user, reusing a cached verification within
+        the TTL. Returns the authenticated GitLab user.
+        """
+        cache = self.credentials
+        if not force and cache.is_valid():
+            if cache.needs_refresh() and cache.claim_refresh():
+                threading.Thread(
+                    target=self._revalidate,
+                    name="gitlab-credential-refresh",
+                    daemon=True
+                ).start()
+            return cache.user
+
+        user = self.get('user')
+        cache.mark_verified(user)
+        return user
+
+    def _revalidate(self):
+        """Background re-validation of a cached token verification"""
+        try:
+            self.credentials.mark_verified(self.get('user'))
+            logger.debug("GitLab credentials re-validated")
+        except GitLabAPIError as e:
+            # A 401 has already invalidated the cache in request(); transient
+            # failures keep the current entry until the TTL runs out
+            logger.warning(f"GitLab credential re-validation failed: {e.message}")
+            self.credentials.release_refresh()
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
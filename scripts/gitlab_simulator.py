@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+GitLab API Simulator for the 1-Click Onboarding Portal
+------------------------------------------------------
+Local, in-memory stand-in for the GitLab v4 endpoints the portal calls,
+with configurable latency, injected errors and dataset size, for load
+testing and benchmarking the portal without a real GitLab.
+
+Usage:
+    python gitlab_simulator.py --port 8929 --projects 500 --latency lognormal:80:0.5 --error-rate 0.02
+    GITLAB_URL=http://localhost:8929 GITLAB_TOKEN=simulator python onboarding_portal.py
+
+Simulator endpoints:
+    GET /_simulator/stats    request counts per endpoint and injected errors
+    PUT /_simulator/config   change latency, error_rate or error_statuses at runtime
+"""
+
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import logging
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote, urlencode
+
+logger = logging.getLogger("gitlab-simulator")
+
+SIMULATOR_PORT = int(os.getenv('SIMULATOR_PORT', 8929))
+SIMULATOR_TOKEN = os.getenv('SIMULATOR_TOKEN', '')
+
+DEFAULT_ERROR_STATUSES = (500, 502, 503)
+FRAMEWORKS = ('nodejs', 'python', 'java', 'generic')
+ENVIRONMENT_NAMES = ('development', 'staging', 'production')
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def git_blob_sha(content):
+    """SHA-1 git computes for a blob, as returned in repository tree listings"""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class LatencyModel:
+    """
+    Response delay distribution, parsed from a spec (values in milliseconds):
+
+        fixed:MS                 always MS
+        uniform:MIN:MAX          uniformly between MIN and MAX
+        normal:MEAN:STDDEV       normal, clamped at 0
+        exponential:MEAN         exponential with mean MEAN
+        lognormal:MEDIAN:SIGMA   log-normal with median MEDIAN (long tail)
+    """
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'exponential': 1, 'lognormal': 2}
+
+    def __init__(self, spec='fixed:0'):
+        kind, _, args = str(spec).partition(':')
+        if not args and kind.replace('.', '', 1).isdigit():
+            kind, args = 'fixed', kind
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        params = [float(value) for value in args.split(':')] if args else []
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(f"Latency spec {spec} needs {self.KINDS[kind]} value(s)")
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self, rng):
+        """One delay in seconds"""
+        kind, params = self.kind, self.params
+        if kind == 'fixed':
+            ms = params[0]
+        elif kind == 'uniform':
+            ms = rng.uniform(params[0], params[1])
+        elif kind == 'normal':
+            ms = rng.gauss(params[0], params[1])
+        elif kind == 'exponential':
+            ms = rng.expovariate(1 / params[0]) if params[0] > 0 else 0
+        else:
+            ms = rng.lognormvariate(math.log(params[0]), params[1]) if params[0] > 0 else 0
+        return max(0.0, ms) / 1000
+
+class SimulatorError(Exception):
+    """An error response, shaped like GitLab's {"message": ...} bodies"""
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.message = message
+        super().__init__(message)
+
+class GitLabDataset:
+    """In-memory projects, repository files, environments and hooks"""
+
+    def __init__(self, projects=0, environments=2, seed=None, base_url='http://gitlab.simulator'):
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._next_id = 1
+        self.projects = {}
+        self.files = {}
+        self.environments = {}
+        self.hooks = {}
+        for number in range(1, projects + 1):
+            project = self._add_project(
+                f"sim-app-{number:04d}", f"Simulated application {number}",
+                ['onboarded', FRAMEWORKS[number % len(FRAMEWORKS)]]
+            )
+            self.environments[project['id']] = [
+                self._environment(project, name, index)
+                for index, name in enumerate(ENVIRONMENT_NAMES[-environments:] if environments else [])
+            ]
+
+    def _environment(self, project, name, index):
+        deployed = self._rng.random() < 0.8
+        return {
+            "id": project['id'] * 10 + index,
+            "name": name,
+            "state": 'available' if deployed else 'stopped',
+            "external_url": f"https://{project['name']}-{name}.simulator.local",
+            "last_deployment": {"created_at": _now()} if deployed else None,
+        }
+
+    def _add_project(self, name, description, tag_list, visibility='private'):
+        project_id = self._next_id
+        self._next_id += 1
+        project = {
+            "id": project_id,
+            "name": name,
+            "path": name,
+            "path_with_namespace": f"simulator/{name}",
+            "description": description,
+            "web_url": f"{self.base_url}/simulator/{name}",
+            "created_at": _now(),
+            "last_activity_at": _now(),
+            "visibility": visibility,
+            "default_branch": 'main',
+            "tag_list": list(tag_list),
+            "topics": list(tag_list),
+            "star_count": 0,
+        }
+        self.projects[project_id] = project
+        self.files[project_id] = {'README.md': f"# {name}\n"}
+        self.environments[project_id] = []
+        self.hooks[project_id] = []
+        return project
+
+    def project(self, project_ref):
+        """Look a project up by id or by URL-encoded namespace path"""
+        project = None
+        if project_ref.isdigit():
+            project = self.projects.get(int(project_ref))
+        else:
+            project = next((p for p in self.projects.values() if p['path_with_namespace'] == project_ref), None)
+        if project is None:
+            raise SimulatorError(404, "404 Project Not Found")
+        return project
+
+    def list_projects(self, search=None, tag=None, id_after=None):
+        with self._lock:
+            projects = sorted(self.projects.values(), key=lambda p: p['id'])
+        if search:
+            projects = [p for p in projects if search.lower() in p['name'].lower()]
+        if tag:
+            projects = [p for p in projects if tag in p['tag_list']]
+        if id_after is not None:
+            projects = [p for p in projects if p['id'] > id_after]
+        return projects
+
+    def create_project(self, data):
+        name = data.get('name')
+        if not name:
+            raise SimulatorError(400, "name is missing")
+        with self._lock:
+            if any(p['name'].lower() == name.lower() for p in self.projects.values()):
+                raise SimulatorError(400, {"name": ["has already been taken"]})
+            return self._add_project(
+                name, data.get('description', ''),
+                data.get('tag_list') or data.get('topics') or [], data.get('visibility', 'private')
+            )
+
+    def update_project(self, project, data):
+        with self._lock:
+            for field in ('description', 'visibility', 'name'):
+                if field in data:
+                    project[field] = data[field]
+            project['last_activity_at'] = _now()
+        return project
+
+    def delete_project(self, project):
+        with self._lock:
+            for collection in (self.projects, self.files, self.environments, self.hooks):
+                collection.pop(project['id'], None)
+
+    def write_file(self, project, file_path, content, action):
+        """Create or update one file through the repository files API"""
+        with self._lock:
+            self._apply(self.files[project['id']], file_path, content, action)
+            project['last_activity_at'] = _now()
+
+    @staticmethod
+    def _apply(files, file_path, content, action):
+        """Apply one create/update/delete action to a {path: content} mapping"""
+        if action == 'create' and file_path in files:
+            raise SimulatorError(400, "A file with this name already exists")
+        if action in ('update', 'delete') and file_path not in files:
+            raise SimulatorError(400, "A file with this name doesn't exist")
+        if action == 'delete':
+            del files[file_path]
+        elif action in ('create', 'update'):
+            files[file_path] = content or ''
+        else:
+            raise SimulatorError(400, f"Unknown action: {action}")
+
+    def commit(self, project, data):
+        actions = data.get('actions') or []
+        if not actions:
+            raise SimulatorError(400, "actions is missing")
+        with self._lock:
+            # Actions apply to a copy that replaces the files only if all succeed,
+            # so a rejected commit writes nothing
+            staged = dict(self.files[project['id']])
+            for action in actions:
+                self._apply(staged, action.get('file_path'), action.get('content'), action.get('action'))
+            self.files[project['id']] = staged
+            project['last_activity_at'] = _now()
+        message = data.get('commit_message', '')
+        sha = hashlib.sha1(f"{project['id']}:{message}:{time.time()}".encode()).hexdigest()
+        return {"id": sha, "short_id": sha[:8], "title": message.split('\n')[0], "message": message,
+                "created_at": _now()}
+
+    def tree(self, project):
+        with self._lock:
+            files = sorted(self.files[project['id']].items())
+        return [
+            {"id": git_blob_sha(content), "name": path.rsplit('/', 1)[-1], "type": 'blob', "path": path,
+             "mode": '100644'}
+            for path, content in files
+        ]
+
+    def add_hook(self, project, data):
+        with self._lock:
+            hook = {**data, "id": len(self.hooks[project['id']]) + 1, "project_id": project['id'],
+                    "created_at": _now()}
+            hook.pop('token', None)
+            self.hooks[project['id']].append(hook)
+        return hook
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes GitLab API requests to the simulator's dataset"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GitLabSimulator/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        simulator = self.server.simulator
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return self._send(400, {"message": "Invalid JSON body"})
+
+        if url.path.startswith('/_simulator/'):
+            return self._send(*simulator.control(method, url.path, data))
+
+        time.sleep(simulator.delay())
+        route = simulator.route_name(method, url.path)
+        injected = simulator.injected_error(route)
+        if injected is not None:
+            headers = {'Retry-After': '1'} if injected == 429 else {}
+            return self._send(injected, {"message": f"{injected} Simulated error"}, headers)
+        if simulator.token and self.headers.get('PRIVATE-TOKEN') != simulator.token:
+            return self._send(401, {"message": "401 Unauthorized"})
+
+        try:
+            status, payload, headers = simulator.dispatch(method, url.path, query, data, self._base_url())
+        except SimulatorError as e:
+            return self._send(e.status_code, {"message": e.message})
+
+        if method == 'GET' and status == 200:
+            encoded = json.dumps(payload).encode()
+            etag = f'W/"{hashlib.sha1(encoded).hexdigest()[:16]}"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, None, headers)
+        self._send(status, payload, headers)
+
+    def _base_url(self):
+        return f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address[:2])}"
+
+    def _send(self, status, payload, headers=None):
+        encoded = json.dumps(payload).encode() if payload is not None and status != 304 else b''
+        self.send_response(status)
+        if encoded:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if encoded:
+            self.wfile.write(encoded)
+
+class GitLabSimulator:
+    """
+    Threaded HTTP server answering the GitLab v4 API calls made by the portal.
+
+    `latency` is a LatencyModel spec applied to every API request,
+    `error_rate` the fraction of API requests answered with one of
+    `error_statuses` instead, and `projects` / `environments` the size of the
+    generated dataset of onboarded projects. A `seed` makes the dataset and
+    the injected latency and errors reproducible.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency='fixed:0', error_rate=0.0,
+                 error_statuses=DEFAULT_ERROR_STATUSES, projects=0, environments=2, token=SIMULATOR_TOKEN,
+                 seed=None):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.token = token
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = {}
+        self.injected_errors = 0
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.dataset = GitLabDataset(projects, environments, seed, base_url=self.url)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        with self._rng_lock:
+            return self.latency.sample(self._rng)
+
+    def injected_error(self, route):
+        """Count the request and pick an injected error status for it, if any"""
+        with self._rng_lock:
+            status = self._rng.choice(self.error_statuses) if self._rng.random() < self.error_rate else None
+        with self._stats_lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            if status is not None:
+                self.injected_errors += 1
+        return status
+
+    @staticmethod
+    def route_name(method, path):
+        """Request path with ids and file paths replaced by placeholders, for stats"""
+        parts = path.strip('/').split('/')[2:]
+        if len(parts) >= 2 and parts[0] == 'projects':
+            parts[1] = ':id'
+            if len(parts) >= 5 and parts[2:4] == ['repository', 'files']:
+                parts[4:] = [':file_path']
+        return f"{method} /{'/'.join(parts)}"
+
+    def control(self, method, path, data):
+        if path == '/_simulator/stats' and method == 'GET':
+            with self._stats_lock:
+                return 200, {"requests": dict(self.requests), "injected_errors": self.injected_errors,
+                             "projects": len(self.dataset.projects)}
+        if path == '/_simulator/config' and method == 'PUT':
+            try:
+                if 'latency' in data:
+                    self.latency = LatencyModel(data['latency'])
+                if 'error_rate' in data:
+                    self.error_rate = float(data['error_rate'])
+                if 'error_statuses' in data:
+                    self.error_statuses = tuple(int(status) for status in data['error_statuses'])
+            except (TypeError, ValueError) as e:
+                return 400, {"message": str(e)}
+            return 200, {"latency": self.latency.spec, "error_rate": self.error_rate,
+                         "error_statuses": list(self.error_statuses)}
+        return 404, {"message": "404 Not Found"}
+
+    def dispatch(self, method, path, query, data, base_url):
+        """Answer one API request; returns (status, payload, headers)"""
+        if not path.startswith('/api/v4/'):
+            raise SimulatorError(404, "404 Not Found")
+        parts = [unquote(part) for part in path[len('/api/v4/'):].strip('/').split('/')]
+        dataset = self.dataset
+
+        if parts == ['user'] and method == 'GET':
+            return 200, {"id": 1, "username": 'simulator', "name": 'GitLab Simulator', "state": 'active'}, {}
+
+        if parts == ['projects']:
+            if method == 'POST':
+                return 201, dataset.create_project(data), {}
+            if method == 'GET':
+                return self._list_projects(query, base_url)
+
+        if len(parts) < 2 or parts[0] != 'projects':
+            raise SimulatorError(404, "404 Not Found")
+        project = dataset.project(parts[1])
+        resource = parts[2:]
+
+        if not resource:
+            if method == 'GET':
+                return 200, project, {}
+            if method == 'PUT':
+                return 200, dataset.update_project(project, data), {}
+            if method == 'DELETE':
+                dataset.delete_project(project)
+                return 202, {"message": "202 Accepted"}, {}
+        elif resource == ['environments'] and method == 'GET':
+            return 200, dataset.environments.get(project['id'], []), {}
+        elif resource == ['hooks'] and method == 'POST':
+            return 201, dataset.add_hook(project, data), {}
+        elif resource == ['hooks'] and method == 'GET':
+            return self._paginate_offset(list(dataset.hooks[project['id']]), path, query, base_url)
+        elif resource == ['repository', 'commits'] and method == 'POST':
+            return 201, dataset.commit(project, data), {}
+        elif resource == ['repository', 'tree'] and method == 'GET':
+            return self._paginate_offset(dataset.tree(project), path, query, base_url)
+        elif resource[:2] == ['repository', 'files'] and len(resource) >= 3 and method in ('POST', 'PUT'):
+            file_path = '/'.join(resource[2:])
+            dataset.write_file(project, file_path, data.get('content'), 'create' if method == 'POST' else 'update')
+            return (201 if method == 'POST' else 200), {"file_path": file_path, "branch": data.get('branch', 'main')}, {}
+        raise SimulatorError(404, "404 Not Found")
+
+    def _list_projects(self, query, base_url):
+        """Project search and listing, with keyset pagination on id"""
+        per_page = min(int(query.get('per_page', 20)), 100)
+        id_after = int(query['id_after']) if query.get('id_after') else None
+        projects = self.dataset.list_projects(query.get('search'), query.get('tag_list') or query.get('topic'),
+                                              id_after)
+        page = projects[:per_page]
+        headers = {}
+        if len(projects) > per_page:
+            next_query = {**query, 'id_after': page[-1]['id']}
+            headers['Link'] = f'<{base_url}/api/v4/projects?{urlencode(next_query)}>; rel="next"'
+        return 200, page, headers
+
+    def _paginate_offset(self, items, path, query, base_url):
+        """Offset pagination (page / per_page) with a rel="next" Link"""
+        per_page = min(int(query.get('per_page', 20)), 100)
+        page_number = max(1, int(query.get('page', 1)))
+        start = (page_number - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            next_query = {**query, 'page': page_number + 1}
+            headers['Link'] = f'<{base_url}{path}?{urlencode(next_query)}>; rel="next"'
+        return 200, items[start:start + per_page], headers
+
+    def start(self):
+        """Serve on a background thread; returns the simulator"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="gitlab-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Local GitLab API simulator for the onboarding portal')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=SIMULATOR_PORT, help='Port to listen on')
+    parser.add_argument('--latency', default='fixed:0',
+                        help='Response delay in ms: fixed:MS, uniform:MIN:MAX, normal:MEAN:STDDEV, '
+                             'exponential:MEAN or lognormal:MEDIAN:SIGMA')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of API requests that fail')
+    parser.add_argument('--error-statuses', default=','.join(str(s) for s in DEFAULT_ERROR_STATUSES),
+                        help='Comma-separated HTTP statuses used for injected errors (429 adds Retry-After)')
+    parser.add_argument('--projects', type=int, default=100, help='Onboarded projects generated at startup')
+    parser.add_argument('--environments', type=int, default=2, choices=range(0, len(ENVIRONMENT_NAMES) + 1),
+                        help='Environments per generated project')
+    parser.add_argument('--token', default=SIMULATOR_TOKEN, help='Required PRIVATE-TOKEN (empty accepts any)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for a reproducible dataset, latency and errors')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    simulator = GitLabSimulator(
+        args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(',') if status],
+        projects=args.projects, environments=args.environments, token=args.token, seed=args.seed
+    )
+    logger.info(
+        f"GitLab simulator listening on {simulator.url} with {args.projects} projects, "
+        f"latency {args.latency}, error rate {args.error_rate}"
+    )
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.server.server_close()
+
+if __name__ == '__main__':
+    main()
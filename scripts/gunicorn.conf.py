@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the 1-Click Onboarding Portal
+--------------------------------------------------------
+PORTAL_SERVER_MODE selects how requests are served:
+
+  sync   Threaded workers (gthread). Each in-flight request holds an OS
+         thread, so GitLab concurrency is bounded by workers x threads.
+  async  Cooperative gevent workers. Socket I/O, including every requests
+         call made by the GitLab client, yields to an event loop, so one
+         process holds hundreds of in-flight GitLab requests and a slow
+         GitLab no longer stalls the pod.
+
+Usage: gunicorn -c gunicorn.conf.py onboarding_portal:app
+   or: gunicorn -c gunicorn.conf.py "onboarding_portal:create_app()"
+
+With GUNICORN_PRELOAD (on by default in sync mode) the app is imported once
+in the master and the workers share its memory copy-on-write; GitLab
+connections, pools and background threads are still created per worker.
+"""
+
+import os
+import math
+import tempfile
+
+PORTAL_SERVER_MODE = os.getenv('PORTAL_SERVER_MODE', 'sync').lower()
+
+def available_cpus():
+    """CPUs this process may actually use: its affinity, capped by a cgroup CPU quota"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        # cgroup v2 "<quota> <period>", or "max <period>" when unlimited
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+if PORTAL_SERVER_MODE == 'async':
+    # gevent patches sockets, threads and queues when each worker boots, so the
+    # portal's existing thread pools and background refreshers become greenlets
+    worker_class = 'gevent'
+    # One event loop per usable CPU, not per node CPU: each worker opens its
+    # own GitLab pool, so a container limited to a fraction of a large node
+    # must not start one worker for every core the node has
+    workers = int(os.getenv('GUNICORN_WORKERS', min(4, max(2, available_cpus()))))
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+    # The GitLab pool and fan-out pool bound in-flight GitLab calls per
+    # process; with greenlets they can be far larger than thread counts.
+    # Set here, before the app is imported, so explicit settings still win.
+    os.environ.setdefault('GITLAB_POOL_SIZE', os.getenv('ASYNC_GITLAB_POOL_SIZE', '200'))
+    os.environ.setdefault('FANOUT_WORKERS', os.getenv('ASYNC_FANOUT_WORKERS', '200'))
+    os.environ.setdefault('ONBOARDING_WORKERS', os.getenv('ASYNC_ONBOARDING_WORKERS', '32'))
+    os.environ.setdefault('SSE_MAX_STREAMS', os.getenv('ASYNC_SSE_MAX_STREAMS', '500'))
+elif PORTAL_SERVER_MODE == 'sync':
+    # Threaded workers so long-lived /api/events streams do not pin a whole worker
+    worker_class = 'gthread'
+    workers = int(os.getenv('GUNICORN_WORKERS', 4))
+    threads = int(os.getenv('GUNICORN_THREADS', 16))
+    # Each open /api/events stream holds a thread: keep half for the API
+    # and the liveness probe
+    os.environ.setdefault('SSE_MAX_STREAMS', str(max(1, threads // 2)))
+else:
+    raise ValueError(f"Unsupported PORTAL_SERVER_MODE: {PORTAL_SERVER_MODE} (expected sync or async)")
+
+if workers > 1:
+    # A poll of /api/jobs or /api/onboard/batch can reach any worker, so job
+    # state must not stay in the memory of the one that accepted the request.
+    # Replicas on several hosts need ONBOARDING_JOB_STORE=redis://... instead.
+    os.environ.setdefault(
+        'ONBOARDING_JOB_STORE', f"file://{os.path.join(tempfile.gettempdir(), 'onboarding-jobs')}"
+    )
+
+    # Workers forked from one master would share and each rotate one log
+    # file: log to stdout only, or to a file per process when LOG_FILE is set
+    os.environ.setdefault('LOG_FILE', '')
+    os.environ.setdefault('LOG_FILE_PER_PROCESS', 'true')
+
+    # Every worker writes its metrics here and /metrics combines them, so a
+    # scrape reports the whole server whichever worker answers it
+    os.environ.setdefault(
+        'METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'portal-metrics')
+    )
+
+# gevent must patch the standard library before the app is imported, which
+# only happens inside the workers, so async mode does not preload by default
+preload_app = os.getenv(
+    'GUNICORN_PRELOAD', 'true' if PORTAL_SERVER_MODE == 'sync' else 'false'
+).lower() == 'true'
+
+def on_starting(server):
+    """Start the server with no metrics left behind by a previous run"""
+    metrics_dir = os.getenv('METRICS_MULTIPROC_DIR')
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        # A preloaded master has already written its own file: keep it
+        if name.startswith('metrics-') and name != f"metrics-{os.getpid()}.json":
+            os.remove(os.path.join(metrics_dir, name))
+
+def when_ready(server):
+    """Build shared read-only state in the master before the workers fork"""
+    if preload_app:
+        from onboarding_portal import warm_up
+        warm_up()
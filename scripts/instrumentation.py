@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Metrics for the 1-Click Onboarding Portal
+-----------------------------------------
+Minimal in-process counters and histograms rendered in the Prometheus text
+exposition format (version 0.0.4) for the /metrics endpoint, combined across
+the worker processes of a server through METRICS_MULTIPROC_DIR, and
+per-request timing traces for the Server-Timing header and the slow-request
+log.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+logger = logging.getLogger("onboarding-portal.metrics")
+trace_logger = logging.getLogger("onboarding-portal.trace")
+
+# Requests and jobs slower than this many milliseconds log their trace as
+# JSON; negative disables the trace log
+TRACE_LOG_THRESHOLD_MS = float(os.getenv('TRACE_LOG_THRESHOLD_MS', 1000))
+# Individual spans kept per trace; later spans still count towards the
+# per-name totals in Server-Timing
+TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 200))
+
+# Directory shared by the worker processes of one server. When set, every
+# process writes its metrics there and /metrics reports all of them combined,
+# whichever worker answers the scrape. gunicorn.conf.py sets it when it starts
+# several workers.
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+# Seconds between writes of this process's metrics to that directory
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+# Latency buckets in seconds, from cached reads up to slow GitLab writes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """Monotonic counter with an optional fixed set of label names"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def snapshot(self):
+        """(labelvalues, value) pairs of every series"""
+        with self._lock:
+            return sorted(self._values.items())
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def format_samples(self, series, labelnames):
+        for labelvalues, value in series:
+            yield self.name, _format_labels(labelnames, labelvalues), value
+
+class Histogram:
+    """Cumulative-bucket histogram with an optional fixed set of label names"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['counts'][position] += 1
+                    break
+            series['sum'] += seconds
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series['counts']) if series else 0
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """Observe the duration of the enclosed block"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, *labelvalues)
+
+    def snapshot(self):
+        """(labelvalues, [per-bucket counts, sum]) pairs of every series"""
+        with self._lock:
+            return sorted((labelvalues, [list(series['counts']), series['sum']])
+                          for labelvalues, series in self._series.items())
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def format_samples(self, series, labelnames):
+        for labelvalues, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _format_labels(labelnames, labelvalues, [('le', _format_value(bound))]),
+                       cumulative)
+            yield f"{self.name}_sum", _format_labels(labelnames, labelvalues), total
+            yield f"{self.name}_count", _format_labels(labelnames, labelvalues), cumulative
+
+class CollectedMetric:
+    """
+    Metric whose samples are read from a callback at scrape time, for values
+    already counted elsewhere (e.g. cache hit counters)
+    """
+
+    def __init__(self, name, documentation, labelnames, collect, kind='gauge'):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def snapshot(self):
+        return sorted((tuple(labelvalues), value) for labelvalues, value in self._collect())
+
+    def reset(self):
+        # The values belong to whoever counts them
+        pass
+
+    def format_samples(self, series, labelnames):
+        for labelvalues, value in series:
+            yield self.name, _format_labels(labelnames, labelvalues), value
+
+def _merge_series(metric, snapshots):
+    """
+    Combine one metric's series from several processes: counters and
+    histograms are summed, gauges are kept apart under a `pid` label (only
+    for live processes, a dead worker's gauges being meaningless).
+    Returns (series, labelnames).
+    """
+    if metric.kind == 'gauge':
+        series = [(tuple(labelvalues) + (str(pid),), value)
+                  for pid, alive, snapshot in snapshots if alive
+                  for labelvalues, value in snapshot.get(metric.name, ())]
+        return sorted(series), metric.labelnames + ('pid',)
+    merged = {}
+    for _, _, snapshot in snapshots:
+        for labelvalues, value in snapshot.get(metric.name, ()):
+            labelvalues = tuple(labelvalues)
+            if metric.kind == 'histogram':
+                counts, total = merged.get(labelvalues, ([0] * len(value[0]), 0.0))
+                merged[labelvalues] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+            else:
+                merged[labelvalues] = merged.get(labelvalues, 0) + value
+    return sorted(merged.items()), metric.labelnames
+
+class Registry:
+    """Ordered set of metrics rendered together by /metrics"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name, documentation, labelnames, collect, kind='gauge'):
+        return self.register(CollectedMetric(name, documentation, labelnames, collect, kind))
+
+    def snapshot(self):
+        """JSON-serialisable values of every metric in this process"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def reset(self):
+        """Forget values counted so far, e.g. those a forked worker inherited"""
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self, snapshots=None):
+        """
+        Render this process's metrics, or with `snapshots`, a list of
+        (pid, alive, snapshot) from several processes, their combination
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if snapshots is None:
+                series, labelnames = metric.snapshot(), metric.labelnames
+            else:
+                series, labelnames = _merge_series(metric, snapshots)
+            for name, labels, value in metric.format_samples(series, labelnames):
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'portal_http_request_duration_seconds',
+    'Time to handle a portal HTTP request, by route',
+    ('method', 'route', 'status')
+)
+GITLAB_REQUEST_DURATION = REGISTRY.histogram(
+    'portal_gitlab_request_duration_seconds',
+    'Latency of GitLab API calls, by portal operation',
+    ('operation', 'method')
+)
+GITLAB_REQUEST_ERRORS = REGISTRY.counter(
+    'portal_gitlab_request_errors_total',
+    'Failed GitLab API calls, by portal operation and HTTP status (0 = no response)',
+    ('operation', 'method', 'status')
+)
+ONBOARDING_STEP_DURATION = REGISTRY.histogram(
+    'portal_onboarding_step_duration_seconds',
+    'Duration of onboarding steps, by step and outcome',
+    ('step', 'outcome')
+)
+ONBOARDING_JOBS = REGISTRY.counter(
+    'portal_onboarding_jobs_total',
+    'Finished onboarding jobs, by outcome',
+    ('outcome',)
+)
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    'portal_rate_limit_rejections_total',
+    'Requests rejected by the rate limiter, by route',
+    ('route',)
+)
+
+# GitLab calls made outside any labelled operation are reported under this name
+UNLABELLED_OPERATION = 'other'
+
+_current_operation = ContextVar('gitlab_operation', default=UNLABELLED_OPERATION)
+
+class Trace:
+    """
+    Timed spans recorded while handling one request or job.
+
+    Spans are kept in the order they finish, with offsets relative to the
+    start of the trace. Spans may be added from several threads (e.g. the
+    dashboard fan-out), so the trace is shared rather than copied.
+    """
+
+    def __init__(self, name, max_spans=None):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.max_spans = TRACE_MAX_SPANS if max_spans is None else max_spans
+        self.started = time.monotonic()
+        self.spans = []
+        self.dropped_spans = 0
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add(self, name, started, seconds, **attributes):
+        with self._lock:
+            total, count = self._totals.get(name, (0.0, 0))
+            self._totals[name] = (total + seconds, count + 1)
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return
+            self.spans.append({
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 1),
+                "duration_ms": round(seconds * 1000, 1),
+                **attributes
+            })
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value: total time per span name, then the whole trace"""
+        with self._lock:
+            totals = list(self._totals.items())
+        entries = []
+        for name, (seconds, count) in totals:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ', '.join(entries)
+
+    def to_dict(self, **fields):
+        with self._lock:
+            spans = list(self.spans)
+            dropped = self.dropped_spans
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.elapsed * 1000, 1),
+            **fields,
+            "spans": spans,
+            "dropped_spans": dropped,
+        }
+
+_current_trace = ContextVar('trace', default=None)
+
+def current_trace():
+    return _current_trace.get()
+
+def begin_trace(name):
+    """Start a trace and make it current; pair with end_trace() in the same context"""
+    trace = Trace(name)
+    trace._token = _current_trace.set(trace)
+    return trace
+
+def end_trace(trace):
+    if trace._token is not None:
+        _current_trace.reset(trace._token)
+        trace._token = None
+
+def log_trace(trace, **fields):
+    """Log the trace as one JSON line when it exceeded TRACE_LOG_THRESHOLD_MS"""
+    if 0 <= TRACE_LOG_THRESHOLD_MS <= trace.elapsed * 1000:
+        trace_logger.info(json.dumps(trace.to_dict(**fields), default=str))
+
+@contextmanager
+def traced_block(name, **fields):
+    """Run the enclosed block as its own trace, logging it with `fields` when slow"""
+    trace = begin_trace(name)
+    outcome = 'failed'
+    try:
+        yield trace
+        outcome = 'succeeded'
+    finally:
+        end_trace(trace)
+        log_trace(trace, outcome=outcome, **fields)
+
+@contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a span of the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, started, time.monotonic() - started, **attributes)
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def gitlab_operation(name):
+    """Attribute the GitLab calls made in the enclosed block to `name`, timing it as a span"""
+    token = _current_operation.set(name)
+    try:
+        with span(name):
+            yield
+    finally:
+        _current_operation.reset(token)
+
+def instrumented(name):
+    """Decorator form of gitlab_operation() for service methods"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with gitlab_operation(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def observe_gitlab_request(method, status_code, seconds):
+    """GitLabClient observer: record the latency and outcome of one API call"""
+    operation = _current_operation.get()
+    GITLAB_REQUEST_DURATION.observe(seconds, operation, method)
+    if status_code is None or status_code >= 400:
+        GITLAB_REQUEST_ERRORS.inc(operation, method, str(status_code or 0))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add('gitlab', time.monotonic() - seconds, seconds,
+                  operation=operation, method=method, status=status_code or 0)
+
+_caches = {}
+
+def register_cache(name, stats):
+    """
+    Export hit/miss counters of a cache. `stats` is a callable returning
+    (hits, misses), or None while the cache does not exist yet.
+    """
+    _caches[name] = stats
+
+def _cache_samples(position):
+    def collect():
+        for name, stats in sorted(_caches.items()):
+            values = stats()
+            if values is not None:
+                yield (name,), values[position]
+    return collect
+
+def _cache_hit_ratio():
+    for name, stats in sorted(_caches.items()):
+        values = stats()
+        if values is not None and sum(values):
+            yield (name,), values[0] / sum(values)
+
+REGISTRY.collected('portal_cache_hits_total', 'Cache hits, by cache', ('cache',), _cache_samples(0), kind='counter')
+REGISTRY.collected('portal_cache_misses_total', 'Cache misses, by cache', ('cache',), _cache_samples(1), kind='counter')
+REGISTRY.collected('portal_cache_hit_ratio', 'Cache hits / lookups since process start, by cache', ('cache',), _cache_hit_ratio)
+
+SNAPSHOT_PREFIX = 'metrics-'
+
+_snapshot_lock = threading.Lock()
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f"{SNAPSHOT_PREFIX}{pid}.json")
+
+def write_snapshot(directory=None, registry=REGISTRY):
+    """Atomically replace this process's metrics file in `directory`"""
+    path = _snapshot_path(directory or METRICS_MULTIPROC_DIR, os.getpid())
+    with _snapshot_lock:
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def read_snapshots(directory=None):
+    """
+    (pid, alive, snapshot) for every process that wrote metrics to
+    `directory`. Files of exited workers are kept, so the combined counters
+    never go backwards when a worker is replaced.
+    """
+    directory = directory or METRICS_MULTIPROC_DIR
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json')):
+            continue
+        try:
+            pid = int(name[len(SNAPSHOT_PREFIX):-len('.json')])
+            with open(os.path.join(directory, name)) as f:
+                snapshot = json.load(f)
+        except (ValueError, FileNotFoundError):
+            continue
+        snapshots.append((pid, pid == os.getpid() or _process_alive(pid), snapshot))
+    return snapshots
+
+def render_metrics():
+    """/metrics body: this process's metrics, or every process's with METRICS_MULTIPROC_DIR"""
+    if not METRICS_MULTIPROC_DIR:
+        return REGISTRY.render()
+    write_snapshot()
+    return REGISTRY.render(read_snapshots())
+
+def _flush_periodically():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning(f"Failed to write metrics to {METRICS_MULTIPROC_DIR}: {e}")
+
+def start_flusher():
+    """Keep this process's metrics file current from a background thread"""
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    threading.Thread(target=_flush_periodically, name="metrics-flusher", daemon=True).start()
+
+def _restart_after_fork():
+    """
+    A forked worker starts counting from zero, since what it inherited is
+    already in the parent's file, and gets its own writer thread
+    """
+    global _snapshot_lock
+    _snapshot_lock = threading.Lock()
+    REGISTRY.reset()
+    start_flusher()
+
+def _flush_at_exit():
+    try:
+        write_snapshot()
+    except OSError:
+        pass
+
+if METRICS_MULTIPROC_DIR:
+    start_flusher()
+    atexit.register(_flush_at_exit)
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -28,6 +28,10 @@ logger = logging.getLogger("onboarding-cli")
 # Constants
 PORTAL_URL = os.getenv('PORTAL_URL', 'http://localhost:5000')
 GITLAB_URL = os.getenv('GITLAB_URL', 'https://gitlab.yourdomain.com')
+# Last templates payload and its ETag, revalidated instead of re-downloaded
+TEMPLATE_CACHE_FILE = os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'onboarding-cli', 'templates.json'
+)
 
 # Terminal colors
 class Colors:
@@ -50,12 +54,39 @@ def print_banner():
     print("-" * 60)
     print()
 
+def load_cached_templates():
+    """Cached templates for this portal as {"etag", "templates"}, or None"""
+    try:
+        with open(TEMPLATE_CACHE_FILE) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('portal_url') != PORTAL_URL or not cached.get('etag'):
+        return None
+    return cached
+
+def save_cached_templates(etag, templates):
+    if not etag:
+        return
+    try:
+        os.makedirs(os.path.dirname(TEMPLATE_CACHE_FILE), exist_ok=True)
+        with open(TEMPLATE_CACHE_FILE, 'w') as f:
+            json.dump({"portal_url": PORTAL_URL, "etag": etag, "templates": templates}, f)
+    except OSError as e:
+        logger.debug(f"Could not cache templates: {str(e)}")
+
 def get_templates():
-    """Fetch available application templates"""
+    """Fetch available application templates, revalidating the cached copy if there is one"""
+    cached = load_cached_templates()
     try:
-        response = requests.get(f"{PORTAL_URL}/api/templates")
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+        response = requests.get(f"{PORTAL_URL}/api/templates", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached['templates']
         response.raise_for_status()
-        return response.json()
+        templates = response.json()
+        save_cached_templates(response.headers.get('ETag'), templates)
+        return templates
     except Exception as e:
         logger.error(f"Error fetching templates: {str(e)}")
         sys.exit(1)
@@ -208,16 +239,33 @@ def display_summary(app_data):
     confirm = input("\nDeploy this application? [Y/n]: ").lower()
     return confirm != 'n'
 
+# Onboarding steps reported by the portal's job API, with progress bar labels
+ONBOARDING_STEPS = {
+    "project_created": "Creating GitLab project",
+    "artifacts_rendered": "Generating CI/CD pipeline and Kubernetes manifests",
+    "files_committed": "Committing files to the repository",
+    "webhook_set": "Setting up GitLab webhooks",
+}
+
+# Seconds to keep polling a job the portal reports as unknown before giving up
+JOB_LOOKUP_GRACE = 30
+# Exit status when the onboarding outcome could not be determined
+EXIT_OUTCOME_UNKNOWN = 3
+
+def report_unknown_outcome(app_name):
+    """The job can no longer be tracked; the onboarding itself may still succeed"""
+    print(f"\n{Colors.WARNING}Lost track of the onboarding job for {app_name}; it may still be running.{Colors.ENDC}")
+    print(f"Check it with: {os.path.basename(sys.argv[0])} --status {app_name}")
+    sys.exit(EXIT_OUTCOME_UNKNOWN)
+
 def deploy_application(app_data):
     """Deploy the application"""
     print(Colors.HEADER + "\nDeploying Application..." + Colors.ENDC)
     
     try:
         # Show progress with tqdm
-        with tqdm(total=100) as pbar:
-            pbar.set_description("Creating GitLab project")
-            pbar.update(10)
-            time.sleep(0.5)
+        with tqdm(total=len(ONBOARDING_STEPS)) as pbar:
+            pbar.set_description("Submitting onboarding request")
             
             # Call the API
             response = requests.post(
@@ -225,34 +273,44 @@ def deploy_application(app_data):
                 json=app_data
             )
             
-            pbar.set_description("Generating CI/CD pipeline")
-            pbar.update(20)
-            time.sleep(0.5)
-            
-            pbar.set_description("Creating Kubernetes manifests")
-            pbar.update(30)
-            time.sleep(0.5)
-            
-            pbar.set_description("Setting up GitLab webhooks")
-            pbar.update(20)
-            time.sleep(0.5)
-            
-            pbar.set_description("Finalizing deployment")
-            pbar.update(20)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data["status"] == "success":
-                    pbar.update(20)  # Complete the progress bar
-                    return data
-                else:
-                    print(f"\n{Colors.RED}Error: {data.get('message', 'Unknown error')}{Colors.ENDC}")
-                    sys.exit(1)
-            else:
+            if response.status_code != 202:
                 print(f"\n{Colors.RED}Error: HTTP {response.status_code}{Colors.ENDC}")
                 print(response.text)
                 sys.exit(1)
+            
+            # Onboarding runs in the background; poll the job until it finishes
+            status_url = f"{PORTAL_URL}{response.json()['status_url']}"
+            lost_since = None
+            while True:
+                # An unknown job or a failed poll says nothing about the
+                # onboarding itself: keep polling for a while
+                try:
+                    response = requests.get(status_url)
+                except requests.exceptions.RequestException:
+                    response = None
+                if response is None or not response.ok:
+                    lost_since = lost_since or time.monotonic()
+                    if time.monotonic() - lost_since >= JOB_LOOKUP_GRACE:
+                        report_unknown_outcome(app_data['app_name'])
+                    time.sleep(1)
+                    continue
+                lost_since = None
+                job = response.json()
+                
+                completed = [step for step in job["steps"] if step["state"] == "succeeded"]
+                pbar.update(len(completed) - pbar.n)
+                if job["steps"]:
+                    pbar.set_description(ONBOARDING_STEPS.get(job["steps"][-1]["name"], job["steps"][-1]["name"]))
+                
+                if job["state"] == "succeeded":
+                    pbar.set_description("Finalizing deployment")
+                    return job["result"]
+                if job["state"] == "failed":
+                    print(f"\n{Colors.RED}Error: {job['error']['message']}{Colors.ENDC}")
+                    if job["error"].get("details"):
+                        print(job["error"]["details"])
+                    sys.exit(1)
+                time.sleep(1)
     except Exception as e:
         print(f"\n{Colors.RED}Error deploying application: {str(e)}{Colors.ENDC}")
         sys.exit(1)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Onboarding Job Queue for the 1-Click Onboarding Portal
+------------------------------------------------------
+Runs onboarding flows on a bounded background worker pool and records
+per-step progress so clients can poll for the outcome.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+logger = logging.getLogger("onboarding-portal.jobs")
+
+ONBOARDING_WORKERS = int(os.getenv('ONBOARDING_WORKERS', 4))
+ONBOARDING_MAX_PENDING = int(os.getenv('ONBOARDING_MAX_PENDING', 100))
+ONBOARDING_JOB_RETENTION = float(os.getenv('ONBOARDING_JOB_RETENTION', 3600))
+# Where job state lives, so that whichever worker answers a poll can find it:
+# memory:// keeps jobs in the worker process (single-process servers only),
+# file:///path shares them between the workers of one host and
+# redis://host:6379/0 between workers and replicas. gunicorn.conf.py
+# defaults to a file store when it starts several workers.
+ONBOARDING_JOB_STORE = os.getenv('ONBOARDING_JOB_STORE', 'memory://')
+# Minimum seconds between sweeps of expired jobs from a file store
+ONBOARDING_JOB_GC_INTERVAL = float(os.getenv('ONBOARDING_JOB_GC_INTERVAL', 60))
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+class JobQueueFull(Exception):
+    """Raised when too many onboarding jobs are already waiting"""
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+class MemoryJobStore:
+    """In-process job store; finished jobs are dropped after `retention` seconds"""
+
+    def __init__(self, retention=ONBOARDING_JOB_RETENTION):
+        self.retention = retention
+        self._jobs = OrderedDict()
+        self._batches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['job_id']] = (time.monotonic(), json.loads(json.dumps(job)))
+            self._jobs.move_to_end(job['job_id'])
+            self._prune()
+
+    def load(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return entry[1] if entry else None
+
+    def save_batch(self, batch_id, job_ids):
+        with self._lock:
+            self._batches[batch_id] = (time.monotonic(), list(job_ids))
+            self._prune()
+
+    def load_batch(self, batch_id):
+        with self._lock:
+            entry = self._batches.get(batch_id)
+            return list(entry[1]) if entry else None
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention
+        while self._jobs:
+            job_id, (saved_at, job) = next(iter(self._jobs.items()))
+            if saved_at > cutoff or job['state'] in (JOB_QUEUED, JOB_RUNNING):
+                break
+            del self._jobs[job_id]
+        while self._batches:
+            batch_id, (saved_at, job_ids) = next(iter(self._batches.items()))
+            if saved_at > cutoff:
+                break
+            del self._batches[batch_id]
+
+class FileJobStore:
+    """
+    Job store shared by the worker processes of one host through a directory.
+
+    Every save replaces the job's file atomically, so readers in other
+    processes see either the previous or the new state. Files of finished
+    jobs and batches are removed once older than `retention` seconds.
+    """
+
+    JOB_PREFIX = 'job-'
+    BATCH_PREFIX = 'batch-'
+    # Ids are generated with uuid4().hex; anything else cannot name a stored file
+    ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+    def __init__(self, root, retention=ONBOARDING_JOB_RETENTION, gc_interval=ONBOARDING_JOB_GC_INTERVAL):
+        self.root = root
+        self.retention = retention
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, prefix, key):
+        if not self.ID_PATTERN.fullmatch(key):
+            return None
+        return os.path.join(self.root, f"{prefix}{key}.json")
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if time.monotonic() - self._last_gc >= self.gc_interval:
+            self.gc()
+
+    def _read(self, path):
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, job):
+        self._write(self._path(self.JOB_PREFIX, job['job_id']), job)
+
+    def load(self, job_id):
+        return self._read(self._path(self.JOB_PREFIX, job_id))
+
+    def save_batch(self, batch_id, job_ids):
+        self._write(self._path(self.BATCH_PREFIX, batch_id), list(job_ids))
+
+    def load_batch(self, batch_id):
+        return self._read(self._path(self.BATCH_PREFIX, batch_id))
+
+    def gc(self):
+        """Remove finished jobs, batches and stray temporary files older than the retention"""
+        self._last_gc = time.monotonic()
+        cutoff = time.time() - self.retention
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                if name.startswith(self.JOB_PREFIX):
+                    job = self._read(path)
+                    if job and job['state'] in (JOB_QUEUED, JOB_RUNNING):
+                        continue
+                os.unlink(path)
+            except FileNotFoundError:
+                # Removed by another worker's sweep
+                continue
+
+class RedisJobStore:
+    """Job store shared by all workers and replicas through Redis"""
+
+    KEY_PREFIX = 'onboarding:job:'
+    BATCH_KEY_PREFIX = 'onboarding:batch:'
+
+    def __init__(self, url, retention=ONBOARDING_JOB_RETENTION):
+        import redis  # optional dependency, only needed for this store
+        self.retention = retention
+        self._redis = redis.Redis.from_url(url)
+
+    def save(self, job):
+        self._redis.set(self.KEY_PREFIX + job['job_id'], json.dumps(job), ex=int(self.retention))
+
+    def load(self, job_id):
+        data = self._redis.get(self.KEY_PREFIX + job_id)
+        return json.loads(data) if data else None
+
+    def save_batch(self, batch_id, job_ids):
+        self._redis.set(self.BATCH_KEY_PREFIX + batch_id, json.dumps(list(job_ids)), ex=int(self.retention))
+
+    def load_batch(self, batch_id):
+        data = self._redis.get(self.BATCH_KEY_PREFIX + batch_id)
+        return json.loads(data) if data else None
+
+def create_job_store(uri=ONBOARDING_JOB_STORE):
+    """Build the job store named by an ONBOARDING_JOB_STORE URI"""
+    if uri.startswith(('redis://', 'rediss://')):
+        return RedisJobStore(uri)
+    if uri.startswith('file://'):
+        return FileJobStore(uri[len('file://'):] or os.path.join(tempfile.gettempdir(), 'onboarding-jobs'))
+    if uri.startswith('memory://'):
+        return MemoryJobStore()
+    raise ValueError(f"Unsupported onboarding job store: {uri}")
+
+class OnboardingJob:
+    """State of one onboarding run, persisted to the store on every change"""
+
+    def __init__(self, app_name, store):
+        self.job_id = uuid.uuid4().hex
+        self.app_name = app_name
+        self.state = JOB_QUEUED
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.steps = []
+        self.result = None
+        self.error = None
+        self._store = store
+        self.save()
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "app_name": self.app_name,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    def save(self):
+        self._store.save(self.to_dict())
+
+    @contextmanager
+    def step(self, name):
+        """Record a named step with its outcome and duration"""
+        step = {"name": name, "state": JOB_RUNNING, "started_at": _now(), "duration_ms": None}
+        self.steps.append(step)
+        self.save()
+        started = time.monotonic()
+        try:
+            yield
+            step["state"] = JOB_SUCCEEDED
+        except Exception:
+            step["state"] = JOB_FAILED
+            raise
+        finally:
+            step["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+            self.save()
+
+    def start(self):
+        self.state = JOB_RUNNING
+        self.started_at = _now()
+        self.save()
+
+    def succeed(self, result):
+        self.state = JOB_SUCCEEDED
+        self.result = result
+        self.finished_at = _now()
+        self.save()
+
+    def fail(self, message, details=None):
+        self.state = JOB_FAILED
+        self.error = {"message": message, "details": details}
+        self.finished_at = _now()
+        self.save()
+
+class JobQueue:
+    """
+    Bounded pool of onboarding workers.
+
+    At most `max_workers` jobs run at once and at most `max_pending` may be
+    queued or running; beyond that submit() raises JobQueueFull so the API can
+    shed load instead of queueing without limit.
+    """
+
+    def __init__(self, store=None, max_workers=ONBOARDING_WORKERS, max_pending=ONBOARDING_MAX_PENDING):
+        self.store = store or create_job_store()
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="onboarding-job")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, count):
+        with self._lock:
+            if self._pending + count > self.max_pending:
+                raise JobQueueFull(f"{self._pending} onboarding jobs already pending")
+            self._pending += count
+
+    def _release(self, count):
+        with self._lock:
+            self._pending -= count
+
+    def _enqueue(self, app_name, func):
+        job = OnboardingJob(app_name, self.store)
+        self._executor.submit(self._run, job, func)
+        logger.info(f"Queued onboarding job {job.job_id} for {app_name}")
+        return job
+
+    def submit(self, app_name, func):
+        """
+        Queue `func(job)` and return the job. The value `func` returns becomes
+        the job result; an exception marks the job failed.
+        """
+        self._reserve(1)
+        try:
+            return self._enqueue(app_name, func)
+        except Exception:
+            self._release(1)
+            raise
+
+    def submit_batch(self, items):
+        """
+        Queue one job per `(app_name, func)` pair and return the batch id and
+        jobs. Capacity for the whole batch is reserved up front, so a batch is
+        either queued completely or rejected with JobQueueFull.
+        """
+        items = list(items)
+        self._reserve(len(items))
+        jobs = []
+        try:
+            for app_name, func in items:
+                jobs.append(self._enqueue(app_name, func))
+        except Exception:
+            # Queued jobs release their own reservation when they finish
+            self._release(len(items) - len(jobs))
+            raise
+        batch_id = uuid.uuid4().hex
+        self.store.save_batch(batch_id, [job.job_id for job in jobs])
+        return batch_id, jobs
+
+    def _run(self, job, func):
+        try:
+            job.start()
+            job.succeed(func(job))
+            logger.info(f"Onboarding job {job.job_id} for {job.app_name} succeeded")
+        except Exception as e:
+            logger.error(f"Onboarding job {job.job_id} for {job.app_name} failed: {str(e)}")
+            job.fail(getattr(e, 'message', str(e)), getattr(e, 'details', None))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id):
+        """Return the stored state of a job, or None if unknown or expired"""
+        return self.store.load(job_id)
+
+    def get_batch(self, batch_id):
+        """Return the stored jobs of a batch in submission order, or None if unknown"""
+        job_ids = self.store.load_batch(batch_id)
+        if job_ids is None:
+            return None
+        return [self.store.load(job_id) for job_id in job_ids]
@@ -9,20 +9,39 @@ import os
 import sys
 import json
 import time
+import gzip
 # import yaml  # Comment out until PyYAML is installed
-import subprocess
 import logging
 import traceback
 import secrets
+import hashlib
+import threading
+import queue
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, Response, make_response, flash
+from flask import Flask, Blueprint, g, jsonify, request, render_template, redirect, url_for, session, Response, make_response, flash
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from functools import wraps
+try:
+    import brotli  # optional dependency; without it large responses are gzip-compressed only
+except ImportError:
+    brotli = None
+from gitlab_client import (
+    GitLabClient, GitLabAPIError, DeadlineExceeded, CircuitOpenError, GITLAB_POOL_SIZE,
+    begin_deadline, end_deadline, deadline
+)
+from project_index import ProjectIndex
+from status_snapshot import StatusSnapshotter, STATUS_SNAPSHOT_INTERVAL
+import instrumentation
+import portal_logging
+from instrumentation import instrumented, gitlab_operation, span, traced
+from onboarding_jobs import JobQueue, JobQueueFull, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
 
-app = Flask(__name__, 
-            static_folder="static",
-            template_folder="templates")
+# All routes live on this blueprint; create_app() attaches it to an app
+portal = Blueprint('portal', __name__)
 
 # Authentication decorator
 def requires_auth(f):
@@ -40,27 +59,13 @@ def requires_auth(f):
                     "message": "Authentication required"
                 }), 401
             else:
-                return redirect(url_for('login', next=request.url))
+                return redirect(url_for('portal.login', next=request.url))
         return f(*args, **kwargs)
     return decorated_function
 
-# Configure secure session
-app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
-app.config['SESSION_COOKIE_SECURE'] = os.getenv('SECURE_COOKIES', 'True').lower() == 'true'
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
-# Uncomment when flask-wtf is installed
-# app.config['WTF_CSRF_ENABLED'] = True
-# app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
-
-# Configure CSRF protection (uncomment when flask-wtf is installed)
-# csrf = CSRFProtect(app)
-
-# Configure rate limiting
+# Configure rate limiting (bound to the app in create_app)
 limiter = Limiter(
     get_remote_address,
-    app=app,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="memory://",
 )
@@ -86,18 +91,127 @@ def add_security_headers(response):
     )
     return response
 
-# Apply security headers to all responses
-app.after_request(add_security_headers)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("onboarding.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+def negotiate_encoding():
+    """Preferred content coding the client accepts: 'br', 'gzip' or None"""
+    accepted = request.accept_encodings
+    encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+    encoding = max(encodings, key=lambda name: accepted[name])
+    return encoding if accepted[encoding] > 0 else None
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(COMPRESSION_LEVEL, 11))
+    return gzip.compress(body, compresslevel=COMPRESSION_LEVEL, mtime=0)
+
+def compress_response(response):
+    """Compress JSON responses of at least COMPRESSION_MIN_BYTES"""
+    if (response.mimetype != 'application/json' or response.direct_passthrough
+            or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    with span('compress'):
+        response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity body a strong ETag was computed on
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+class PrecomputedJSON:
+    """
+    A static JSON payload serialized, hashed and compressed once, then served
+    with a strong ETag per content coding. Requests whose If-None-Match
+    matches any coding's ETag get an empty 304.
+    """
+    
+    def __init__(self, payload, max_age):
+        self.max_age = max_age
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {None: body}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            for encoding in ('br', 'gzip') if brotli is not None else ('gzip',):
+                self.bodies[encoding] = compress_body(body, encoding)
+    
+    def _etag(self, encoding):
+        return self.etag if encoding is None else f"{self.etag}-{encoding}"
+    
+    def response(self):
+        encoding = negotiate_encoding() if len(self.bodies) > 1 else None
+        if any(request.if_none_match.contains_weak(self._etag(name)) for name in self.bodies):
+            response = Response(status=304)
+        else:
+            response = Response(self.bodies[encoding], mimetype='application/json')
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self._etag(encoding))
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        if len(self.bodies) > 1:
+            response.vary.add('Accept-Encoding')
+        return response
+
+def request_route():
+    """Route pattern of the current request, used as a low-cardinality metric label"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def start_request_timer():
+    g.request_started = time.monotonic()
+    g.request_trace = instrumentation.begin_trace(f"{request.method} {request_route()}")
+
+def observe_request(response):
+    """
+    Record the latency of the finished request for /metrics, report its
+    spans in a Server-Timing header and log its trace when it was slow
+    """
+    started = g.pop('request_started', None)
+    if started is not None:
+        instrumentation.HTTP_REQUEST_DURATION.observe(
+            time.monotonic() - started, request.method, request_route(), str(response.status_code)
+        )
+    trace = g.get('request_trace')
+    if trace is not None:
+        if SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = trace.server_timing()
+        instrumentation.log_trace(trace, method=request.method, path=request.path, status=response.status_code)
+    return response
+
+def end_request_trace(exc=None):
+    trace = g.pop('request_trace', None)
+    if trace is not None:
+        instrumentation.end_trace(trace)
+
+def request_deadline():
+    """Seconds this request may spend on GitLab calls"""
+    try:
+        requested = float(request.headers.get('X-Request-Timeout', REQUEST_DEADLINE))
+    except ValueError:
+        requested = REQUEST_DEADLINE
+    return min(max(requested, REQUEST_DEADLINE_MIN), REQUEST_DEADLINE)
+
+def start_request_deadline():
+    g.gitlab_deadline = begin_deadline(request_deadline())
+
+def end_request_deadline(exc=None):
+    token = g.pop('gitlab_deadline', None)
+    if token is not None:
+        end_deadline(token)
+
+def configure_logging():
+    """
+    Configure process logging; a no-op if logging is already configured.
+    Records are queued and written by a background thread (see portal_logging).
+    """
+    portal_logging.configure()
+
 logger = logging.getLogger("onboarding-portal")
 
 # Constants
@@ -108,6 +222,69 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TERRAFORM_DIR = os.path.join(PROJECT_ROOT, 'terraform')
 K8S_DIR = os.path.join(PROJECT_ROOT, 'k8s')
 
+# Dashboard fan-out configuration (per-project GitLab calls run concurrently)
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', GITLAB_POOL_SIZE))
+FANOUT_CALL_TIMEOUT = float(os.getenv('FANOUT_CALL_TIMEOUT', 5))
+FANOUT_DEADLINE = float(os.getenv('FANOUT_DEADLINE', 15))
+
+# Seconds an API request or an onboarding job may spend on GitLab calls; a
+# request may ask for less with an X-Request-Timeout header (seconds). Keep
+# REQUEST_DEADLINE below the gunicorn timeout so workers are never killed
+# waiting on GitLab.
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 25))
+# Lowest X-Request-Timeout honoured, so a client cannot make a call fail
+# at once (and with it every caller sharing that call)
+REQUEST_DEADLINE_MIN = float(os.getenv('REQUEST_DEADLINE_MIN', 1))
+ONBOARDING_JOB_DEADLINE = float(os.getenv('ONBOARDING_JOB_DEADLINE', 300))
+
+# Shared secret GitLab sends as X-Gitlab-Token to /api/webhooks/gitlab; empty
+# disables the endpoint. PORTAL_WEBHOOK_URL is the endpoint's public URL,
+# registered on newly onboarded projects when set, and on existing ones
+# through POST /api/webhooks/gitlab/register.
+GITLAB_WEBHOOK_SECRET = os.getenv('GITLAB_WEBHOOK_SECRET', '')
+PORTAL_WEBHOOK_URL = os.getenv('PORTAL_WEBHOOK_URL', '')
+# GitLab events (object_kind) that may change an application's environments
+STATUS_WEBHOOK_EVENTS = ('deployment', 'pipeline')
+# Job name under which the registration on existing projects runs
+WEBHOOK_REGISTRATION_JOB = 'portal-webhooks'
+
+# Server-Sent Events: keepalive comment interval and maximum stream lifetime
+# (browsers reconnect automatically, which recycles worker threads)
+SSE_KEEPALIVE_INTERVAL = float(os.getenv('SSE_KEEPALIVE_INTERVAL', 15))
+SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', 300))
+# Open streams per worker process, so dashboards cannot take every worker
+# thread; connections beyond it are told to reconnect after SSE_BUSY_RETRY_MS
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 8))
+SSE_BUSY_RETRY_MS = int(os.getenv('SSE_BUSY_RETRY_MS', 30000))
+# Replaces the default per-IP limits: every open tab reconnects at least
+# 3600 / SSE_MAX_STREAM_SECONDS times an hour
+SSE_CONNECT_RATE_LIMIT = os.getenv('SSE_CONNECT_RATE_LIMIT', '120 per minute')
+
+# Fields exposed for onboarded projects; everything else in GitLab's project
+# payload is dropped as each page arrives
+PROJECT_SUMMARY_FIELDS = ('id', 'name', 'description', 'web_url', 'created_at', 'last_activity_at', 'visibility')
+APPLICATIONS_MAX_LIMIT = 100
+
+# Statuses meaning the multi-action commits API is not offered at all, the
+# only failures after which per-file commits cannot duplicate a commit
+COMMITS_API_UNAVAILABLE = (404, 405)
+
+# Largest number of applications accepted by one batch onboarding request
+ONBOARDING_BATCH_MAX_SIZE = int(os.getenv('ONBOARDING_BATCH_MAX_SIZE', 100))
+
+# Bearer token required by /metrics when set
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# JSON responses at least this large are compressed for clients that accept it
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+# Seconds clients may reuse /api/templates before revalidating it
+TEMPLATES_MAX_AGE = int(os.getenv('TEMPLATES_MAX_AGE', 300))
+
+# Per-request span timings in a Server-Timing response header (visible to
+# clients, e.g. in the browser's network panel)
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+
 # Authentication credentials
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'changeme')
@@ -131,37 +308,258 @@ class OnboardingError(Exception):
         self.details = details
         super().__init__(self.message)
 
+def project_summary(project):
+    """Project a GitLab project payload down to PROJECT_SUMMARY_FIELDS"""
+    return {field: project.get(field) for field in PROJECT_SUMMARY_FIELDS}
+
+def application_status(project, environments):
+    """
+    Combine a project summary with its GitLab environments. `environments` is
+    None when they could not be fetched.
+    """
+    status = dict(project)
+    status["environments"] = {
+        env['name']: {
+            "status": env['state'],
+            "last_deployment": (env.get('last_deployment') or {}).get('created_at', 'Never'),
+            "url": env.get('external_url', '')
+        }
+        for env in environments or []
+    }
+    status["environments_unavailable"] = environments is None
+    return status
+
+# Shared GitLab client (one connection pool per worker process)
+_gitlab_client = None
+_gitlab_client_lock = threading.Lock()
+
+def get_gitlab_client():
+    """Return the process-wide pooled GitLab client, creating it on first use"""
+    global _gitlab_client
+    if _gitlab_client is None:
+        with _gitlab_client_lock:
+            if _gitlab_client is None:
+                client = GitLabClient(GITLAB_URL, GITLAB_TOKEN)
+                client.observer = instrumentation.observe_gitlab_request
+                _gitlab_client = client
+    return _gitlab_client
+
+# Compiled pipeline, Dockerfile and manifest templates
+_template_registry = None
+
+def get_template_registry():
+    """Return the process-wide artifact template registry, compiling it on first use"""
+    global _template_registry
+    if _template_registry is None:
+        with _gitlab_client_lock:
+            if _template_registry is None:
+                from template_registry import TemplateRegistry
+                _template_registry = TemplateRegistry()
+    return _template_registry
+
+# Optional copy of generated artifacts (disabled unless ARTIFACT_STORE is set)
+_artifact_store = None
+_artifact_store_created = False
+
+def get_artifact_store():
+    """Return the configured artifact store, or None when storing is disabled"""
+    global _artifact_store, _artifact_store_created
+    if not _artifact_store_created:
+        with _gitlab_client_lock:
+            if not _artifact_store_created:
+                from artifact_store import create_artifact_store
+                _artifact_store = create_artifact_store()
+                _artifact_store_created = True
+    return _artifact_store
+
+@traced('store_artifacts')
+def store_artifacts(app_name, files, merge=False):
+    """
+    Keep a copy of generated artifacts in the artifact store, if one is
+    configured. With `merge`, `files` replace only their own paths in the
+    stored set (partial regeneration on update).
+    """
+    store = get_artifact_store()
+    if store is None:
+        return
+    try:
+        if merge:
+            files = {**(store.load(app_name) or {}), **files}
+        store.save(app_name, files)
+    except Exception as e:
+        # The store is a convenience copy; GitLab remains the source of truth
+        logger.warning(f"Failed to store artifacts for {app_name}: {str(e)}")
+
+# Shared worker pool for concurrent per-project GitLab reads
+_fanout_executor = None
+
+def get_fanout_executor():
+    """Return the bounded thread pool used for per-project GitLab fan-out"""
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _gitlab_client_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(
+                    max_workers=FANOUT_WORKERS,
+                    thread_name_prefix="gitlab-fanout"
+                )
+    return _fanout_executor
+
+# Background onboarding jobs
+_job_queue = None
+
+def get_job_queue():
+    """Return the bounded onboarding job queue for this worker process"""
+    global _job_queue
+    if _job_queue is None:
+        with _gitlab_client_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
+
+_onboarding_service = None
+_onboarding_service_lock = threading.Lock()
+
+def get_onboarding_service():
+    """
+    Return the long-lived OnboardingService for this worker process.
+
+    Credentials are re-checked on every call, but that check is served from
+    the client's verified-credential cache, so it only reaches GitLab when
+    the TTL has lapsed or GitLab has rejected the token.
+    """
+    global _onboarding_service
+    if _onboarding_service is None:
+        with _onboarding_service_lock:
+            if _onboarding_service is None:
+                _onboarding_service = OnboardingService()
+                _onboarding_service.status_snapshotter.start()
+                return _onboarding_service
+    _onboarding_service._verify_credentials()
+    return _onboarding_service
+
+# Projects with a webhook-triggered status refresh waiting to run
+_pending_refreshes = set()
+_pending_refreshes_lock = threading.Lock()
+
+def schedule_status_refresh(service, project_id, app_name):
+    """
+    Refresh one application's status on the fan-out pool. Events for a
+    project whose refresh has not started yet are merged into it.
+    """
+    with _pending_refreshes_lock:
+        if project_id in _pending_refreshes:
+            return None
+        _pending_refreshes.add(project_id)
+    
+    def refresh():
+        # Leave the pending set first, so an event arriving during the fetch
+        # schedules another refresh that will see its change
+        with _pending_refreshes_lock:
+            _pending_refreshes.discard(project_id)
+        try:
+            service.refresh_application_status(project_id, app_name)
+        except GitLabAPIError as e:
+            logger.warning(f"Failed to refresh status of {app_name} after webhook: {e.message}")
+    
+    return get_fanout_executor().submit(refresh)
+
+# Hit/miss counters of the per-process caches, read at scrape time
+def _gitlab_response_cache_stats():
+    cache = _gitlab_client.cache if _gitlab_client is not None else None
+    return (cache.hits, cache.misses) if cache is not None else None
+
+def _gitlab_coalescing_stats():
+    # A "hit" is a GET answered by another caller's in-flight call
+    flight = _gitlab_client.singleflight if _gitlab_client is not None else None
+    return (flight.shared, flight.led) if flight is not None else None
+
+def _render_cache_stats():
+    cache = _template_registry.cache if _template_registry is not None else None
+    return (cache.hits, cache.misses) if cache is not None else None
+
+def _project_index_stats():
+    if _onboarding_service is None:
+        return None
+    index = _onboarding_service.project_index
+    return index.hits, index.misses
+
+instrumentation.register_cache('gitlab_response', _gitlab_response_cache_stats)
+instrumentation.register_cache('gitlab_coalesced_reads', _gitlab_coalescing_stats)
+instrumentation.register_cache('artifact_render', _render_cache_stats)
+instrumentation.register_cache('project_index', _project_index_stats)
+
+def _reset_after_fork():
+    """
+    Drop per-process state inherited from a parent process.
+    
+    With gunicorn --preload the app is built before the workers fork. Pooled
+    sockets, thread pools and background threads do not survive a fork, so
+    every worker builds its own on first use. The compiled template registry
+    is kept: it is read-only and stays shared copy-on-write.
+    """
+    global _gitlab_client, _gitlab_client_lock, _fanout_executor, _job_queue
+    global _onboarding_service, _onboarding_service_lock, _artifact_store, _artifact_store_created
+    _gitlab_client_lock = threading.Lock()
+    _onboarding_service_lock = threading.Lock()
+    _gitlab_client = _fanout_executor = _job_queue = _onboarding_service = _artifact_store = None
+    _artifact_store_created = False
+    _pending_refreshes.clear()
+    # Hits and misses so far were counted by the parent
+    if _template_registry is not None and _template_registry.cache is not None:
+        _template_registry.cache.hits = _template_registry.cache.misses = 0
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+@contextmanager
+def onboarding_step(job, name):
+    """
+    Time an onboarding step for /metrics and as a trace span, also recording
+    it on `job` when given
+    """
+    started = time.monotonic()
+    outcome = 'failed'
+    try:
+        with span(name), job.step(name) if job is not None else nullcontext():
+            yield
+        outcome = 'succeeded'
+    finally:
+        instrumentation.ONBOARDING_STEP_DURATION.observe(time.monotonic() - started, name, outcome)
+
 class OnboardingService:
     """Main service for application onboarding"""
     
     def __init__(self):
         self.gitlab_url = GITLAB_URL
         self.gitlab_token = GITLAB_TOKEN
+        self.gitlab = get_gitlab_client()
+        # Webhooks only reach the worker that receives them, so every worker
+        # keeps rebuilding at the normal interval
+        self.status_snapshotter = StatusSnapshotter(self.collect_application_status, STATUS_SNAPSHOT_INTERVAL)
+        # Each snapshot rebuild reloads the index from the same project
+        # listing, so the index only refreshes itself without the snapshotter
+        self.project_index = ProjectIndex(self.list_onboarded_projects)
+        if self.status_snapshotter.enabled:
+            self.project_index.refresh_interval = 0
         self._verify_credentials()
         
+    @instrumented('verify_credentials')
     def _verify_credentials(self):
         """Verify GitLab credentials are valid"""
         try:
-            # Test connection and token validity
-            cmd = [
-                'curl', '-s',
-                f"{self.gitlab_url}/api/v4/user",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}"
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0 or "error" in result.stdout.lower():
-                logger.error(f"GitLab credentials verification failed: {result.stderr or result.stdout}")
-                raise OnboardingError(
-                    ERROR_GITLAB_CONNECTION,
-                    status_code=401,
-                    details="Please check GitLab URL and token in environment variables"
-                )
-            
-            logger.info("GitLab credentials verified successfully")
+            # Test connection and token validity (cached process-wide for the TTL)
+            cached = self.gitlab.credentials.is_valid()
+            self.gitlab.verify_credentials()
+            if not cached:
+                logger.info("GitLab credentials verified successfully")
+        except GitLabAPIError as e:
+            logger.error(f"GitLab credentials verification failed: {e.message}")
+            raise OnboardingError(
+                ERROR_GITLAB_CONNECTION,
+                status_code=401 if e.status_code in (401, 403) else 500,
+                details="Please check GitLab URL and token in environment variables"
+            )
         except Exception as e:
-            if isinstance(e, OnboardingError):
-                raise
             logger.error(f"Error during credential verification: {str(e)}")
             logger.debug(traceback.format_exc())
             raise OnboardingError(
@@ -170,6 +568,7 @@ class OnboardingService:
                 details=f"Exception: {str(e)}"
             )
         
+    @instrumented('create_project')
     def create_project(self, app_data):
         """Create a new GitLab project with appropriate settings"""
         try:
@@ -183,32 +582,24 @@ class OnboardingService:
             logger.info(f"Creating GitLab project {app_data['app_name']}")
             
             # Use GitLab API to create project
-            cmd = [
-                'curl', '-s', '-X', 'POST',
-                f"{self.gitlab_url}/api/v4/projects",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}",
-                '-H', 'Content-Type: application/json',
-                '-d', json.dumps({
+            try:
+                project_data = self.gitlab.post('projects', {
                     'name': app_data['app_name'],
                     'description': app_data['description'],
                     'initialize_with_readme': True,
                     'visibility': 'private',
                     'tag_list': ['onboarded', app_data.get('framework', 'generic')],
                 })
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Failed to create GitLab project: {result.stderr}")
+            except GitLabAPIError as e:
+                logger.error(f"Failed to create GitLab project: {e.message}")
                 raise OnboardingError(
                     ERROR_PROJECT_CREATION,
                     status_code=500,
-                    details=f"GitLab API error: {result.stderr}"
+                    details=f"GitLab API error: {e.body or e.message}"
                 )
             
-            project_data = json.loads(result.stdout)
             logger.info(f"Project created: {project_data['web_url']}")
+            self.project_index.put(project_summary(project_data))
             return project_data
         except Exception as e:
             logger.error(f"Failed to create GitLab project: {str(e)}")
@@ -219,19 +610,14 @@ class OnboardingService:
                 details=f"Exception: {str(e)}"
             )
             
+    @traced('render_pipeline')
     def generate_ci_cd_pipeline(self, app_data):
         """Generate the GitLab CI/CD pipeline based on application type"""
         try:
             logger.info(f"Generating CI/CD pipeline for {app_data['app_name']}")
             
-            # Select template based on application framework
-            template_function = getattr(
-                self, 
-                f"_generate_{app_data['framework']}_pipeline", 
-                self._generate_generic_pipeline
-            )
-            
-            return template_function(app_data)
+            # Frameworks without their own pipeline template use the generic one
+            return get_template_registry().render_pipeline(app_data)
         except Exception as e:
             logger.error(f"Failed to generate CI/CD pipeline: {str(e)}")
             logger.debug(traceback.format_exc())
@@ -241,363 +627,14 @@ class OnboardingService:
                 details=f"Exception: {str(e)}"
             )
     
-    def _generate_nodejs_pipeline(self, app_data):
-        """Generate Node.js specific GitLab CI/CD pipeline"""
-        return f"""# GitLab CI/CD Pipeline for {app_data['app_name']}
-# Generated by DevOps Suite 1-Click Onboarding
-
-stages:
-  - validate
-  - test
-  - security-scan
-  - build
-  - deploy-dev
-  - deploy-prod
-
-variables:
-  NODE_VERSION: "{app_data.get('node_version', '18')}"
-  APP_NAME: "{app_data['app_name']}"
-  DOCKER_REGISTRY: "{app_data.get('registry_url', 'nexus.yourdomain.com:8082')}"
-
-cache:
-  paths:
-    - node_modules/
-
-validate:
-  stage: validate
-  image: node:$NODE_VERSION
-  script:
-    - npm ci
-    - npm run lint || echo "Linting step skipped"
-    - npm run type-check || echo "Type checking skipped"
-
-test:
-  stage: test
-  image: node:$NODE_VERSION
-  script:
-    - npm ci
-    - npm test || echo "No tests found"
-  coverage: '/Lines\\s*:\\s*(\\d+\\.?\\d*)%/'
-  artifacts:
-    reports:
-      coverage_report:
-        coverage_format: cobertura
-        path: coverage/cobertura-coverage.xml
-
-security-scan:
-  stage: security-scan
-  image: node:$NODE_VERSION
-  script:
-    - npm audit --audit-level high || echo "Vulnerabilities found"
-    - npx retire --severity high || echo "Outdated packages found"
-
-build:
-  stage: build
-  image: docker:24.0
-  services:
-    - docker:24.0-dind
-  script:
-    - echo "$DOCKER_PASSWORD" | docker login -u "$DOCKER_USERNAME" --password-stdin $DOCKER_REGISTRY
-    - docker build -t $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA .
-    - docker push $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA
-    - docker tag $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA $DOCKER_REGISTRY/$APP_NAME:latest
-    - docker push $DOCKER_REGISTRY/$APP_NAME:latest
-
-deploy-dev:
-  stage: deploy-dev
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-dev --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-dev apply -f -
-    - kubectl -n apps-dev apply -f deploy/service.yaml
-    - kubectl -n apps-dev apply -f deploy/ingress.yaml
-    - kubectl -n apps-dev rollout status deployment/$APP_NAME
-  environment:
-    name: development
-    url: https://$APP_NAME-dev.yourdomain.com
-  only:
-    - develop
-    - main
-
-deploy-prod:
-  stage: deploy-prod
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-prod --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-prod apply -f -
-    - kubectl -n apps-prod apply -f deploy/service.yaml
-    - kubectl -n apps-prod apply -f deploy/ingress.yaml
-    - kubectl -n apps-prod rollout status deployment/$APP_NAME
-  environment:
-    name: production
-    url: https://$APP_NAME.yourdomain.com
-  only:
-    - main
-  when: manual
-"""
-
-    def _generate_python_pipeline(self, app_data):
-        """Generate Python specific GitLab CI/CD pipeline"""
-        return f"""# GitLab CI/CD Pipeline for {app_data['app_name']}
-# Generated by DevOps Suite 1-Click Onboarding
-
-stages:
-  - validate
-  - test
-  - security-scan
-  - build
-  - deploy-dev
-  - deploy-prod
-
-variables:
-  PYTHON_VERSION: "{app_data.get('python_version', '3.11')}"
-  APP_NAME: "{app_data['app_name']}"
-  DOCKER_REGISTRY: "{app_data.get('registry_url', 'nexus.yourdomain.com:8082')}"
-
-validate:
-  stage: validate
-  image: python:$PYTHON_VERSION
-  script:
-    - pip install flake8 black
-    - flake8 . || echo "Linting issues found"
-    - black --check . || echo "Formatting issues found"
-
-test:
-  stage: test
-  image: python:$PYTHON_VERSION
-  script:
-    - pip install -r requirements.txt
-    - pip install pytest pytest-cov
-    - python -m pytest --cov=./ --cov-report=xml
-  coverage: '/TOTAL.+ ([0-9]{1,3}%)/'
-  artifacts:
-    reports:
-      coverage_report:
-        coverage_format: cobertura
-        path: coverage.xml
-
-security-scan:
-  stage: security-scan
-  image: python:$PYTHON_VERSION
-  script:
-    - pip install safety
-    - safety check || echo "Vulnerabilities found"
-
-build:
-  stage: build
-  image: docker:24.0
-  services:
-    - docker:24.0-dind
-  script:
-    - echo "$DOCKER_PASSWORD" | docker login -u "$DOCKER_USERNAME" --password-stdin $DOCKER_REGISTRY
-    - docker build -t $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA .
-    - docker push $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA
-    - docker tag $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA $DOCKER_REGISTRY/$APP_NAME:latest
-    - docker push $DOCKER_REGISTRY/$APP_NAME:latest
-
-deploy-dev:
-  stage: deploy-dev
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-dev --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-dev apply -f -
-    - kubectl -n apps-dev apply -f deploy/service.yaml
-    - kubectl -n apps-dev apply -f deploy/ingress.yaml
-    - kubectl -n apps-dev rollout status deployment/$APP_NAME
-  environment:
-    name: development
-    url: https://$APP_NAME-dev.yourdomain.com
-  only:
-    - develop
-    - main
-
-deploy-prod:
-  stage: deploy-prod
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-prod --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-prod apply -f -
-    - kubectl -n apps-prod apply -f deploy/service.yaml
-    - kubectl -n apps-prod apply -f deploy/ingress.yaml
-    - kubectl -n apps-prod rollout status deployment/$APP_NAME
-  environment:
-    name: production
-    url: https://$APP_NAME.yourdomain.com
-  only:
-    - main
-  when: manual
-"""
-
-    def _generate_java_pipeline(self, app_data):
-        """Generate Java/Spring specific GitLab CI/CD pipeline"""
-        return f"""# GitLab CI/CD Pipeline for {app_data['app_name']}
-# Generated by DevOps Suite 1-Click Onboarding
-
-stages:
-  - validate
-  - test
-  - security-scan
-  - build
-  - deploy-dev
-  - deploy-prod
-
-variables:
-  JAVA_VERSION: "{app_data.get('java_version', '17')}"
-  APP_NAME: "{app_data['app_name']}"
-  DOCKER_REGISTRY: "{app_data.get('registry_url', 'nexus.yourdomain.com:8082')}"
-
-validate:
-  stage: validate
-  image: gradle:jdk$JAVA_VERSION
-  script:
-    - gradle checkstyleMain || echo "Checkstyle issues found"
-    - gradle spotlessCheck || echo "Formatting issues found"
-
-test:
-  stage: test
-  image: gradle:jdk$JAVA_VERSION
-  script:
-    - gradle test jacocoTestReport
-  coverage: '/Total.*?([0-9]{1,3})%/'
-  artifacts:
-    reports:
-      junit: build/test-results/test/**/TEST-*.xml
-    paths:
-      - build/reports/jacoco/
-
-security-scan:
-  stage: security-scan
-  image: gradle:jdk$JAVA_VERSION
-  script:
-    - gradle dependencyCheckAnalyze || echo "Vulnerabilities found"
-
-build:
-  stage: build
-  image: docker:24.0
-  services:
-    - docker:24.0-dind
-  script:
-    - echo "$DOCKER_PASSWORD" | docker login -u "$DOCKER_USERNAME" --password-stdin $DOCKER_REGISTRY
-    - docker build -t $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA .
-    - docker push $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA
-    - docker tag $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA $DOCKER_REGISTRY/$APP_NAME:latest
-    - docker push $DOCKER_REGISTRY/$APP_NAME:latest
-
-deploy-dev:
-  stage: deploy-dev
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-dev --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-dev apply -f -
-    - kubectl -n apps-dev apply -f deploy/service.yaml
-    - kubectl -n apps-dev apply -f deploy/ingress.yaml
-    - kubectl -n apps-dev rollout status deployment/$APP_NAME
-  environment:
-    name: development
-    url: https://$APP_NAME-dev.yourdomain.com
-  only:
-    - develop
-    - main
-
-deploy-prod:
-  stage: deploy-prod
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-prod --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-prod apply -f -
-    - kubectl -n apps-prod apply -f deploy/service.yaml
-    - kubectl -n apps-prod apply -f deploy/ingress.yaml
-    - kubectl -n apps-prod rollout status deployment/$APP_NAME
-  environment:
-    name: production
-    url: https://$APP_NAME.yourdomain.com
-  only:
-    - main
-  when: manual
-"""
-    
-    def _generate_generic_pipeline(self, app_data):
-        """Generate a generic GitLab CI/CD pipeline"""
-        return f"""# GitLab CI/CD Pipeline for {app_data['app_name']}
-# Generated by DevOps Suite 1-Click Onboarding
-
-stages:
-  - validate
-  - build
-  - deploy-dev
-  - deploy-prod
-
-variables:
-  APP_NAME: "{app_data['app_name']}"
-  DOCKER_REGISTRY: "{app_data.get('registry_url', 'nexus.yourdomain.com:8082')}"
-
-build:
-  stage: build
-  image: docker:24.0
-  services:
-    - docker:24.0-dind
-  script:
-    - echo "$DOCKER_PASSWORD" | docker login -u "$DOCKER_USERNAME" --password-stdin $DOCKER_REGISTRY
-    - docker build -t $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA .
-    - docker push $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA
-    - docker tag $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA $DOCKER_REGISTRY/$APP_NAME:latest
-    - docker push $DOCKER_REGISTRY/$APP_NAME:latest
-
-deploy-dev:
-  stage: deploy-dev
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-dev --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-dev apply -f -
-    - kubectl -n apps-dev apply -f deploy/service.yaml
-    - kubectl -n apps-dev apply -f deploy/ingress.yaml
-    - kubectl -n apps-dev rollout status deployment/$APP_NAME
-  environment:
-    name: development
-    url: https://$APP_NAME-dev.yourdomain.com
-  only:
-    - develop
-    - main
-
-deploy-prod:
-  stage: deploy-prod
-  image: bitnami/kubectl:latest
-  script:
-    - kubectl create namespace apps-prod --dry-run=client -o yaml | kubectl apply -f -
-    - sed -e "s|__IMAGE__|$DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA|g" deploy/deployment.yaml | kubectl -n apps-prod apply -f -
-    - kubectl -n apps-prod apply -f deploy/service.yaml
-    - kubectl -n apps-prod apply -f deploy/ingress.yaml
-    - kubectl -n apps-prod rollout status deployment/$APP_NAME
-  environment:
-    name: production
-    url: https://$APP_NAME.yourdomain.com
-  only:
-    - main
-  when: manual
-"""
-    
+    @traced('render_manifests')
     def generate_kubernetes_manifests(self, app_data):
         """Generate Kubernetes deployment manifests"""
         logger.info(f"Generating Kubernetes manifests for {app_data['app_name']}")
         
         try:
-            # Create deploy directory in project
-            os.makedirs(f"templates/apps/{app_data['app_name']}/deploy", exist_ok=True)
-            
-            # Generate manifests
-            manifests = {
-                'deployment.yaml': self._generate_deployment_manifest(app_data),
-                'service.yaml': self._generate_service_manifest(app_data),
-                'ingress.yaml': self._generate_ingress_manifest(app_data),
-                'configmap.yaml': self._generate_configmap(app_data),
-            }
-            
-            # Save manifests to files
-            for filename, content in manifests.items():
-                with open(f"templates/apps/{app_data['app_name']}/deploy/{filename}", 'w') as f:
-                    f.write(content)
-                    
-            return manifests
+            # Rendered in memory only; the content is pushed straight to GitLab
+            return get_template_registry().render_manifests(app_data)
         except Exception as e:
             logger.error(f"Failed to generate Kubernetes manifests: {str(e)}")
             logger.debug(traceback.format_exc())
@@ -607,206 +644,43 @@ deploy-prod:
                 details=f"Exception: {str(e)}"
             )
     
-    def _generate_deployment_manifest(self, app_data):
-        """Generate Kubernetes deployment manifest"""
-        return f"""apiVersion: apps/v1
-kind: Deployment
-metadata:
-  name: {app_data['app_name']}
-  labels:
-    app: {app_data['app_name']}
-    environment: {{{{ .Release.Namespace }}}}
-spec:
-  replicas: {app_data.get('replicas', 3)}
-  selector:
-    matchLabels:
-      app: {app_data['app_name']}
-  template:
-    metadata:
-      labels:
-        app: {app_data['app_name']}
-    spec:
-      imagePullSecrets:
-      - name: regcred
-      containers:
-      - name: {app_data['app_name']}
-        image: __IMAGE__
-        ports:
-        - containerPort: {app_data.get('port', 8080)}
-        env:
-        - name: APP_ENV
-          value: {{{{ .Release.Namespace }}}}
-        - name: APP_PORT
-          value: "{app_data.get('port', 8080)}"
-        resources:
-          requests:
-            memory: "{app_data.get('memory_request', '256Mi')}"
-            cpu: "{app_data.get('cpu_request', '100m')}"
-          limits:
-            memory: "{app_data.get('memory_limit', '512Mi')}"
-            cpu: "{app_data.get('cpu_limit', '500m')}"
-        livenessProbe:
-          httpGet:
-            path: /health
-            port: {app_data.get('port', 8080)}
-          initialDelaySeconds: 30
-          periodSeconds: 10
-        readinessProbe:
-          httpGet:
-            path: /health
-            port: {app_data.get('port', 8080)}
-          initialDelaySeconds: 5
-          periodSeconds: 5
-"""
-    
-    def _generate_service_manifest(self, app_data):
-        """Generate Kubernetes service manifest"""
-        return f"""apiVersion: v1
-kind: Service
-metadata:
-  name: {app_data['app_name']}
-  labels:
-    app: {app_data['app_name']}
-spec:
-  selector:
-    app: {app_data['app_name']}
-  ports:
-  - port: 80
-    targetPort: {app_data.get('port', 8080)}
-    protocol: TCP
-  type: ClusterIP
-"""
-    
-    def _generate_ingress_manifest(self, app_data):
-        """Generate Kubernetes ingress manifest"""
-        return f"""apiVersion: networking.k8s.io/v1
-kind: Ingress
-metadata:
-  name: {app_data['app_name']}
-  annotations:
-    kubernetes.io/ingress.class: nginx
-    cert-manager.io/cluster-issuer: letsencrypt-prod
-spec:
-  tls:
-  - hosts:
-    - {app_data['app_name']}.{{{{ .Release.Namespace }}}}.yourdomain.com
-    secretName: {app_data['app_name']}-tls
-  rules:
-  - host: {app_data['app_name']}.{{{{ .Release.Namespace }}}}.yourdomain.com
-    http:
-      paths:
-      - path: /
-        pathType: Prefix
-        backend:
-          service:
-            name: {app_data['app_name']}
-            port:
-              number: 80
-"""
-    
-    def _generate_configmap(self, app_data):
-        """Generate Kubernetes configmap for application"""
-        return f"""apiVersion: v1
-kind: ConfigMap
-metadata:
-  name: {app_data['app_name']}-config
-data:
-  app.env: |
-    APP_NAME={app_data['app_name']}
-    APP_ENVIRONMENT={{{{ .Release.Namespace }}}}
-    APP_VERSION={{{{ .Values.image.tag }}}}
-"""
-    
+    @traced('render_dockerfile')
     def _generate_dockerfile(self, app_data):
         """Generate Dockerfile based on application type"""
-        template_function = getattr(
-            self, 
-            f"_generate_{app_data['framework']}_dockerfile", 
-            self._generate_generic_dockerfile
-        )
-        
-        return template_function(app_data)
-    
-    def _generate_nodejs_dockerfile(self, app_data):
-        """Generate Node.js Dockerfile"""
-        return f"""FROM node:{app_data.get('node_version', '18')}-alpine
-
-WORKDIR /app
-
-COPY package*.json ./
-RUN npm ci --only=production
-
-COPY . .
-
-EXPOSE {app_data.get('port', 8080)}
-CMD ["npm", "start"]
-"""
-    
-    def _generate_python_dockerfile(self, app_data):
-        """Generate Python Dockerfile"""
-        return f"""FROM python:{app_data.get('python_version', '3.11')}-slim
-
-WORKDIR /app
-
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
-
-COPY . .
-
-EXPOSE {app_data.get('port', 8080)}
-CMD ["python", "app.py"]
-"""
-    
-    def _generate_java_dockerfile(self, app_data):
-        """Generate Java Dockerfile"""
-        return f"""FROM gradle:{app_data.get('java_version', '17')}-jdk AS build
-WORKDIR /app
-COPY . .
-RUN gradle build --no-daemon
-
-FROM openjdk:{app_data.get('java_version', '17')}-slim
-WORKDIR /app
-COPY --from=build /app/build/libs/*.jar app.jar
-EXPOSE {app_data.get('port', 8080)}
-CMD ["java", "-jar", "app.jar"]
-"""
-
-    def _generate_generic_dockerfile(self, app_data):
-        """Generate a generic Dockerfile"""
-        return f"""FROM alpine:latest
-
-WORKDIR /app
-COPY . .
-
-EXPOSE {app_data.get('port', 8080)}
-CMD ["echo", "Replace with your application start command"]
-"""
+        try:
+            return get_template_registry().render_dockerfile(app_data)
+        except Exception as e:
+            logger.error(f"Failed to generate Dockerfile: {str(e)}")
+            logger.debug(traceback.format_exc())
+            raise OnboardingError(
+                ERROR_DOCKERFILE_CREATION,
+                status_code=500,
+                details=f"Exception: {str(e)}"
+            )
 
-    def add_file_to_project(self, project_id, file_path, content):
-        """Add a file to a GitLab project"""
+    @instrumented('add_file_to_project')
+    def add_file_to_project(self, project_id, file_path, content, action='create'):
+        """Add (or with action='update', replace) a file in a GitLab project"""
         try:
-            file_path_encoded = file_path.replace('/', '%2F')
-            
-            cmd = [
-                'curl', '-s', '-X', 'POST',
-                f"{self.gitlab_url}/api/v4/projects/{project_id}/repository/files/{file_path_encoded}",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}",
-                '-H', 'Content-Type: application/json',
-                '-d', json.dumps({
-                    'branch': 'main',
-                    'content': content,
-                    'commit_message': f"Add {file_path} via 1-click onboarding"
-                })
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            file_path_encoded = self.gitlab.encode(file_path)
+            verb = 'Update' if action == 'update' else 'Add'
+            payload = {
+                'branch': 'main',
+                'content': content,
+                'commit_message': f"{verb} {file_path} via 1-click onboarding"
+            }
             
-            if result.returncode != 0:
-                logger.error(f"Failed to add file {file_path}: {result.stderr}")
+            try:
+                if action == 'update':
+                    self.gitlab.put(f"projects/{project_id}/repository/files/{file_path_encoded}", payload)
+                else:
+                    self.gitlab.post(f"projects/{project_id}/repository/files/{file_path_encoded}", payload)
+            except GitLabAPIError as e:
+                logger.error(f"Failed to add file {file_path}: {e.message}")
                 raise OnboardingError(
                     ERROR_FILE_CREATION,
                     status_code=500,
-                    details=f"GitLab API error: {result.stderr}"
+                    details=f"GitLab API error: {e.body or e.message}"
                 )
                 
             return True
@@ -819,33 +693,154 @@ CMD ["echo", "Replace with your application start command"]
                 details=f"Exception: {str(e)}"
             )
     
+    @instrumented('commit_files')
+    def commit_files(self, project_id, files, commit_message, action='create'):
+        """
+        Commit several files to a GitLab project as one atomic commit.
+        
+        Uses the multi-action commits API so the whole set lands in a single
+        commit (and triggers a single pipeline). Only when GitLab does not
+        offer that endpoint (404/405) does it fall back to one commit per
+        file; any other failure, including timeouts and 5xx responses after
+        which the commit may already have landed, is raised unchanged.
+        `action` is either one action for every file or a mapping of file
+        path to action.
+        """
+        action_for = action.get if isinstance(action, dict) else (lambda file_path: action)
+        actions = [
+            {'action': action_for(file_path), 'file_path': file_path, 'content': content}
+            for file_path, content in files.items()
+        ]
+        
+        try:
+            self.gitlab.post(f"projects/{project_id}/repository/commits", {
+                'branch': 'main',
+                'commit_message': commit_message,
+                'actions': actions
+            })
+            logger.info(f"Committed {len(actions)} files to project {project_id} in one commit")
+            return True
+        except GitLabAPIError as e:
+            if e.status_code not in COMMITS_API_UNAVAILABLE:
+                raise
+            logger.warning(f"Multi-file commit unavailable ({e.message}), falling back to per-file commits")
+        
+        for file_path, content in files.items():
+            self.add_file_to_project(project_id, file_path, content, action=action_for(file_path))
+        return True
+    
+    @staticmethod
+    def git_blob_sha(content):
+        """SHA-1 git assigns to a blob with this content (as in `git hash-object`)"""
+        data = content.encode('utf-8')
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+    
+    @instrumented('repository_tree')
+    def get_repository_blob_shas(self, project_id, ref='main'):
+        """Map every file path in the repository to its blob SHA, from the recursive tree listing"""
+        tree = self.gitlab.paginate(
+            f"projects/{project_id}/repository/tree",
+            {'recursive': True, 'ref': ref}
+        )
+        return {item['path']: item['id'] for item in tree if item.get('type') == 'blob'}
+    
+    def commit_changed_files(self, project_id, files, commit_message):
+        """
+        Commit only the files whose content differs from the repository.
+        
+        The current blob SHAs come from one tree listing and are compared with
+        the git blob hash of the new content, so unchanged files cost no write
+        and an update that changes nothing makes no commit (and starts no
+        pipeline). Returns the paths that were committed.
+        """
+        try:
+            current = self.get_repository_blob_shas(project_id)
+        except GitLabAPIError as e:
+            # Without the tree we cannot tell what changed; write everything
+            logger.warning(f"Could not list repository of project {project_id} ({e.message}), committing all files")
+            current = {file_path: None for file_path in files}
+        
+        actions = {}
+        for file_path, content in files.items():
+            if file_path not in current:
+                actions[file_path] = 'create'
+            elif current[file_path] != self.git_blob_sha(content):
+                actions[file_path] = 'update'
+        
+        if not actions:
+            logger.info(f"All {len(files)} files of project {project_id} are up to date, nothing to commit")
+            return []
+        
+        self.commit_files(
+            project_id,
+            {file_path: files[file_path] for file_path in actions},
+            commit_message,
+            action=actions
+        )
+        return list(actions)
+    
+    def add_portal_webhook(self, project_id):
+        """Register the portal's /api/webhooks/gitlab endpoint on a project"""
+        self.gitlab.post(f"projects/{project_id}/hooks", {
+            'url': PORTAL_WEBHOOK_URL,
+            'token': GITLAB_WEBHOOK_SECRET,
+            'push_events': True,
+            'pipeline_events': True,
+            'deployment_events': True,
+            'enable_ssl_verification': True
+        })
+    
+    @instrumented('register_portal_webhooks')
+    def register_portal_webhooks(self):
+        """
+        Add the portal's webhook to every onboarded project that does not
+        have it yet, e.g. projects onboarded before PORTAL_WEBHOOK_URL was
+        set. A project that fails is reported and the rest still processed.
+        """
+        result = {"registered": [], "already_registered": 0, "failed": []}
+        for project in self.iter_onboarded_projects():
+            try:
+                hooks = self.gitlab.paginate(f"projects/{project['id']}/hooks")
+                if any(hook.get('url') == PORTAL_WEBHOOK_URL for hook in hooks):
+                    result["already_registered"] += 1
+                    continue
+                self.add_portal_webhook(project['id'])
+                result["registered"].append(project['name'])
+            except (DeadlineExceeded, CircuitOpenError):
+                raise
+            except GitLabAPIError as e:
+                logger.warning(f"Failed to register the portal webhook on {project['name']}: {e.message}")
+                result["failed"].append({"app_name": project['name'], "message": e.message})
+        logger.info(
+            f"Portal webhook registered on {len(result['registered'])} projects, "
+            f"{result['already_registered']} already had it, {len(result['failed'])} failed"
+        )
+        return result
+    
+    @instrumented('setup_project_webhooks')
     def setup_project_webhooks(self, project_id, app_data):
         """Set up webhooks for the project"""
         try:
             webhook_url = f"{app_data.get('webhook_url', 'https://cicd-webhook.yourdomain.com/gitlab-webhook')}"
             
-            cmd = [
-                'curl', '-s', '-X', 'POST',
-                f"{self.gitlab_url}/api/v4/projects/{project_id}/hooks",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}",
-                '-H', 'Content-Type: application/json',
-                '-d', json.dumps({
+            try:
+                self.gitlab.post(f"projects/{project_id}/hooks", {
                     'url': webhook_url,
                     'push_events': True,
                     'merge_requests_events': True,
                     'tag_push_events': True,
                     'enable_ssl_verification': True
                 })
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Failed to set up webhook: {result.stderr}")
+                
+                # The portal's own hook keeps its status data current
+                if PORTAL_WEBHOOK_URL and GITLAB_WEBHOOK_SECRET:
+                    self.add_portal_webhook(project_id)
+            except GitLabAPIError as e:
+                logger.error(f"Failed to set up webhook: {e.message}")
                 raise OnboardingError(
                     ERROR_UNKNOWN,
                     status_code=500,
-                    details=f"GitLab API error: {result.stderr}"
+                    details=f"GitLab API error: {e.body or e.message}"
                 )
                 
             return True
@@ -858,26 +853,30 @@ CMD ["echo", "Replace with your application start command"]
                 details=f"Exception: {str(e)}"
             )
     
+    @instrumented('find_project')
     def _get_project_by_name(self, app_name):
-        """Get a GitLab project by name"""
+        """
+        Get a GitLab project by name
+        
+        Served from the in-memory project index; only names missing from the
+        index fall back to a GitLab search.
+        """
         try:
-            cmd = [
-                'curl', '-s',
-                f"{self.gitlab_url}/api/v4/projects?search={app_name}",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            project = self.project_index.get(app_name)
+            if project:
+                return project
             
-            if result.returncode != 0:
-                logger.error(f"Failed to search for project: {result.stderr}")
+            try:
+                projects = self.gitlab.get('projects', params={'search': app_name})
+            except GitLabAPIError as e:
+                logger.error(f"Failed to search for project: {e.message}")
                 return None
             
-            projects = json.loads(result.stdout)
-            
             # Find exact match
             for project in projects:
                 if project['name'].lower() == app_name.lower():
+                    project = project_summary(project)
+                    self.project_index.put(project)
                     return project
             
             return None
@@ -885,28 +884,104 @@ CMD ["echo", "Replace with your application start command"]
             logger.error(f"Failed to get project by name: {str(e)}")
             return None
     
+    def iter_onboarded_projects(self, id_after=None, per_page=100):
+        """
+        Iterate over all onboarded projects, walking every page of the GitLab
+        listing and keeping only PROJECT_SUMMARY_FIELDS from each project.
+        """
+        params = {'tag_list': 'onboarded'}
+        if id_after is not None:
+            params['id_after'] = id_after
+        
+        for project in self.gitlab.paginate('projects', params=params, per_page=per_page):
+            yield project_summary(project)
+    
+    @instrumented('list_projects')
+    def list_onboarded_projects(self):
+        """Every onboarded project summary, as a list"""
+        return list(self.iter_onboarded_projects())
+    
+    @instrumented('get_environments')
+    def fetch_environments(self, project_id, timeout=None):
+        """Fetch the GitLab environments of one project"""
+        return self.gitlab.get(f"projects/{project_id}/environments", timeout=timeout)
+    
+    def get_project_environments(self, project_ids, timeout=FANOUT_CALL_TIMEOUT, deadline=FANOUT_DEADLINE):
+        """
+        Fetch environments for many projects concurrently.
+        
+        Returns {project_id: [environments]}. Projects whose call failed, timed
+        out, or had not finished by the deadline are left out so callers can
+        render partial results.
+        """
+        executor = get_fanout_executor()
+        # Each call runs in a copy of this context so its spans land on the caller's trace
+        futures = {
+            executor.submit(copy_context().run, self.fetch_environments, project_id, timeout): project_id
+            for project_id in project_ids
+        }
+        done, pending = wait(futures, timeout=deadline)
+        
+        for future in pending:
+            future.cancel()
+        if pending:
+            logger.warning(f"Environment fetch deadline exceeded for {len(pending)} of {len(futures)} projects")
+        
+        environments = {}
+        for future in done:
+            project_id = futures[future]
+            try:
+                environments[project_id] = future.result() or []
+            except GitLabAPIError as e:
+                logger.warning(f"Failed to fetch environments for project {project_id}: {e.message}")
+        return environments
+    
+    def collect_application_status(self):
+        """
+        Fetch every onboarded project and its environments from GitLab.
+        
+        Returns {lower-cased app name: application status}. The project
+        listing also refreshes the project index.
+        """
+        projects = self.list_onboarded_projects()
+        self.project_index.load(projects)
+        project_environments = self.get_project_environments([project['id'] for project in projects])
+        
+        return {
+            project['name'].lower(): application_status(project, project_environments.get(project['id']))
+            for project in projects
+        }
+    
+    def refresh_application_status(self, project_id, app_name):
+        """
+        Re-read one application's environments and swap them into the status
+        snapshot. Returns False when the application is not in the snapshot
+        (not onboarded, or no snapshot built yet).
+        """
+        snapshot = self.status_snapshotter.snapshot
+        app = snapshot.get(app_name) if snapshot else None
+        if app is None or app['id'] != project_id:
+            return False
+        environments = self.fetch_environments(project_id, timeout=FANOUT_CALL_TIMEOUT)
+        return self.status_snapshotter.update(application_status(app, environments))
+    
+    @instrumented('update_project')
     def _update_project_description(self, project_id, description):
         """Update a GitLab project description"""
         try:
-            cmd = [
-                'curl', '-s', '-X', 'PUT',
-                f"{self.gitlab_url}/api/v4/projects/{project_id}",
-                '-H', f"PRIVATE-TOKEN: {self.gitlab_token}",
-                '-H', 'Content-Type: application/json',
-                '-d', json.dumps({'description': description})
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Failed to update project description: {result.stderr}")
+            try:
+                self.gitlab.put(f"projects/{project_id}", {'description': description})
+            except GitLabAPIError as e:
+                logger.error(f"Failed to update project description: {e.message}")
                 raise OnboardingError(
                     "Failed to update project description",
                     status_code=500,
-                    details=f"GitLab API error: {result.stderr}"
+                    details=f"GitLab API error: {e.body or e.message}"
                 )
             
             return True
+        except OnboardingError:
+            raise
         except Exception as e:
             logger.error(f"Failed to update project description: {str(e)}")
             raise OnboardingError(
@@ -915,36 +990,46 @@ CMD ["echo", "Replace with your application start command"]
                 details=f"Exception: {str(e)}"
             )
     
-    def onboard_application(self, app_data):
-        """Complete application onboarding process"""
+    def onboard_application(self, app_data, job=None):
+        """
+        Complete application onboarding process
+        
+        When `job` is given, each step's progress and timing is recorded on it.
+        """
+        step = lambda name: onboarding_step(job, name)
         try:
             # Create GitLab project
-            project = self.create_project(app_data)
+            with step('project_created'):
+                project = self.create_project(app_data)
             if not project:
                 return {"status": "error", "message": "Failed to create GitLab project"}
                 
             project_id = project['id']
             project_url = project['web_url']
             
-            # Generate CI/CD pipeline
-            pipeline_content = self.generate_ci_cd_pipeline(app_data)
-            if not self.add_file_to_project(project_id, '.gitlab-ci.yml', pipeline_content):
-                return {"status": "error", "message": "Failed to add CI/CD pipeline"}
-                
-            # Generate Dockerfile
-            dockerfile_content = self._generate_dockerfile(app_data)
-            if not self.add_file_to_project(project_id, 'Dockerfile', dockerfile_content):
-                return {"status": "error", "message": "Failed to add Dockerfile"}
-                
-            # Generate K8s manifests
-            manifests = self.generate_kubernetes_manifests(app_data)
+            # Generate CI/CD pipeline, Dockerfile and K8s manifests
+            with step('artifacts_rendered'):
+                files = {
+                    '.gitlab-ci.yml': self.generate_ci_cd_pipeline(app_data),
+                    'Dockerfile': self._generate_dockerfile(app_data),
+                }
+                manifests = self.generate_kubernetes_manifests(app_data)
+                for filename, content in manifests.items():
+                    files[f"deploy/{filename}"] = content
+                store_artifacts(app_data['app_name'], files)
             
-            # Add K8s manifests to project
-            for filename, content in manifests.items():
-                self.add_file_to_project(project_id, f"deploy/{filename}", content)
+            # Add all generated artifacts to the project in a single commit
+            with step('files_committed'):
+                committed = self.commit_files(
+                    project_id, files,
+                    f"Add {app_data['app_name']} pipeline, Dockerfile and manifests via 1-click onboarding"
+                )
+            if not committed:
+                return {"status": "error", "message": "Failed to add generated files"}
                 
             # Set up webhooks
-            self.setup_project_webhooks(project_id, app_data)
+            with step('webhook_set'):
+                self.setup_project_webhooks(project_id, app_data)
             
             # Return success response
             return {
@@ -964,145 +1049,391 @@ CMD ["echo", "Replace with your application start command"]
                 details=f"Exception: {str(e)}"
             )
 
+# Application templates offered by the portal and the CLI
+APPLICATION_TEMPLATES = [
+    {
+        "id": "nodejs",
+        "name": "Node.js Application",
+        "description": "JavaScript runtime for server-side applications",
+        "icon": "fab fa-node-js",
+        "color": "green",
+        "default_port": 3000,
+        "languages": ["JavaScript", "TypeScript"],
+        "frameworks": ["Express", "Koa", "NestJS", "React (SSR)"]
+    },
+    {
+        "id": "python",
+        "name": "Python Application",
+        "description": "Python-based backend service or API",
+        "icon": "fab fa-python",
+        "color": "blue",
+        "default_port": 8000,
+        "languages": ["Python"],
+        "frameworks": ["FastAPI", "Flask", "Django"]
+    },
+    {
+        "id": "java",
+        "name": "Java Application",
+        "description": "Enterprise Java service with Spring Boot",
+        "icon": "fab fa-java",
+        "color": "orange",
+        "default_port": 8080,
+        "languages": ["Java"],
+        "frameworks": ["Spring Boot", "Quarkus", "Micronaut"]
+    },
+    {
+        "id": "react",
+        "name": "React Frontend",
+        "description": "React single page application",
+        "icon": "fab fa-react",
+        "color": "blue",
+        "default_port": 3000,
+        "languages": ["JavaScript", "TypeScript"],
+        "frameworks": ["React", "Next.js"]
+    }
+]
+
+TEMPLATES_RESPONSE = PrecomputedJSON(APPLICATION_TEMPLATES, max_age=TEMPLATES_MAX_AGE)
+
 # REST API endpoints
-@app.route('/api/templates', methods=['GET'])
+@portal.route('/api/templates', methods=['GET'])
 @limiter.limit("30 per minute")
 def get_templates():
-    """Get available application templates"""
-    templates = [
-        {
-            "id": "nodejs",
-            "name": "Node.js Application",
-            "description": "JavaScript runtime for server-side applications",
-            "icon": "fab fa-node-js",
-            "color": "green",
-            "default_port": 3000,
-            "languages": ["JavaScript", "TypeScript"],
-            "frameworks": ["Express", "Koa", "NestJS", "React (SSR)"]
-        },
-        {
-            "id": "python",
-            "name": "Python Application",
-            "description": "Python-based backend service or API",
-            "icon": "fab fa-python",
-            "color": "blue",
-            "default_port": 8000,
-            "languages": ["Python"],
-            "frameworks": ["FastAPI", "Flask", "Django"]
-        },
-        {
-            "id": "java",
-            "name": "Java Application",
-            "description": "Enterprise Java service with Spring Boot",
-            "icon": "fab fa-java",
-            "color": "orange",
-            "default_port": 8080,
-            "languages": ["Java"],
-            "frameworks": ["Spring Boot", "Quarkus", "Micronaut"]
-        },
-        {
-            "id": "react",
-            "name": "React Frontend",
-            "description": "React single page application",
-            "icon": "fab fa-react",
-            "color": "blue",
-            "default_port": 3000,
-            "languages": ["JavaScript", "TypeScript"],
-            "frameworks": ["React", "Next.js"]
-        }
-    ]
+    """
+    Get available application templates
     
-    return jsonify(templates)
+    The payload is static, so it is served precomputed with an ETag; clients
+    revalidate with If-None-Match and get an empty 304 when unchanged.
+    """
+    return TEMPLATES_RESPONSE.response()
 
-@app.route('/api/onboard', methods=['POST'])
-@limiter.limit("10 per minute")
-def onboard_application():
-    """Onboard a new application"""
-    app_data = request.json
+def validate_onboarding_request(app_data):
+    """
+    Check the required onboarding fields and sanitize the application name
+    in place. Returns an error message, or None when the request is valid.
+    """
+    if not isinstance(app_data, dict):
+        return "Application spec must be a JSON object"
     
     # Validate required fields
     required_fields = ['app_name', 'framework', 'description', 'team_email']
     for field in required_fields:
         if field not in app_data or not app_data[field]:
-            return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
+            return f"Missing required field: {field}"
     
     # Sanitize app name (lowercase, alphanumeric with dashes)
-    app_name = app_data['app_name'].lower()
-    sanitized_name = ''.join(c if c.isalnum() or c == '-' else '-' for c in app_name)
-    app_data['app_name'] = sanitized_name
+    app_name = str(app_data['app_name']).lower()
+    app_data['app_name'] = ''.join(c if c.isalnum() or c == '-' else '-' for c in app_name)
+    return None
+
+def onboarding_job(service, app_data):
+    """Build the job function that runs the onboarding flow for `app_data`"""
+    def run_onboarding(job):
+        try:
+            with deadline(ONBOARDING_JOB_DEADLINE), \
+                    instrumentation.traced_block('onboarding_job', job_id=job.job_id, app_name=job.app_name):
+                result = service.onboard_application(app_data, job=job)
+            if result["status"] == "error":
+                raise OnboardingError(result["message"])
+        except Exception:
+            instrumentation.ONBOARDING_JOBS.inc('failed')
+            raise
+        instrumentation.ONBOARDING_JOBS.inc('succeeded')
+        return result
+    return run_onboarding
+
+def job_reference(job):
+    """Summary of a queued job as returned by the onboarding endpoints"""
+    return {
+        "app_name": job.app_name,
+        "job_id": job.job_id,
+        "status_url": url_for('portal.get_job_status', job_id=job.job_id)
+    }
+
+@portal.route('/api/onboard', methods=['POST'])
+@limiter.limit("10 per minute")
+def onboard_application():
+    """Onboard a new application"""
+    app_data = request.json
     
-    # Initialize onboarding service
-    service = OnboardingService()
+    error = validate_onboarding_request(app_data)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+    sanitized_name = app_data['app_name']
     
-    # Start onboarding process
-    result = service.onboard_application(app_data)
+    # Initialize onboarding service (fails fast if GitLab credentials are bad)
+    service = get_onboarding_service()
     
-    if result["status"] == "error":
-        return jsonify(result), 500
+    # Start onboarding process in the background
+    try:
+        job = get_job_queue().submit(sanitized_name, onboarding_job(service, app_data))
+    except JobQueueFull:
+        logger.warning(f"Onboarding queue full, rejecting {sanitized_name}")
+        return jsonify({
+            "status": "error",
+            "message": "Too many onboarding requests in progress. Please try again later."
+        }), 503
     
-    return jsonify(result)
+    reference = job_reference(job)
+    return jsonify({
+        "status": "accepted",
+        "job_id": job.job_id,
+        "status_url": reference['status_url']
+    }), 202, {'Location': reference['status_url']}
 
-@app.route('/api/status/<app_name>', methods=['GET'])
+@portal.route('/api/onboard/batch', methods=['POST'])
+@limiter.limit("5 per minute")
+def onboard_application_batch():
+    """
+    Onboard several applications in one request.
+    
+    Every spec is validated before anything is queued; one invalid spec
+    rejects the whole batch. The apps then run as ordinary onboarding jobs on
+    the shared worker pool, so ONBOARDING_WORKERS bounds how many onboarding
+    flows talk to GitLab at once across single and batch requests.
+    """
+    payload = request.json
+    applications = payload.get('applications') if isinstance(payload, dict) else payload
+    if not isinstance(applications, list) or not applications:
+        return jsonify({"status": "error", "message": "Expected a non-empty 'applications' list"}), 400
+    if len(applications) > ONBOARDING_BATCH_MAX_SIZE:
+        return jsonify({
+            "status": "error",
+            "message": f"At most {ONBOARDING_BATCH_MAX_SIZE} applications per batch"
+        }), 400
+    
+    errors = []
+    seen = set()
+    for position, app_data in enumerate(applications):
+        error = validate_onboarding_request(app_data)
+        if not error and app_data['app_name'] in seen:
+            error = f"Duplicate application name in batch: {app_data['app_name']}"
+        if error:
+            errors.append({
+                "index": position,
+                "app_name": app_data.get('app_name') if isinstance(app_data, dict) else None,
+                "message": error
+            })
+        else:
+            seen.add(app_data['app_name'])
+    if errors:
+        return jsonify({"status": "error", "message": "Invalid applications in batch", "errors": errors}), 400
+    
+    service = get_onboarding_service()
+    
+    try:
+        batch_id, jobs = get_job_queue().submit_batch(
+            (app_data['app_name'], onboarding_job(service, app_data)) for app_data in applications
+        )
+    except JobQueueFull:
+        logger.warning(f"Onboarding queue full, rejecting batch of {len(applications)} applications")
+        return jsonify({
+            "status": "error",
+            "message": "Too many onboarding requests in progress. Please try again later."
+        }), 503
+    
+    logger.info(f"Queued onboarding batch {batch_id} with {len(jobs)} applications")
+    status_url = url_for('portal.get_batch_status', batch_id=batch_id)
+    return jsonify({
+        "status": "accepted",
+        "batch_id": batch_id,
+        "status_url": status_url,
+        "jobs": [job_reference(job) for job in jobs]
+    }), 202, {'Location': status_url}
+
+@portal.route('/api/onboard/batch/<batch_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def get_batch_status(batch_id):
+    """Get per-application progress and results of an onboarding batch"""
+    jobs = get_job_queue().get_batch(batch_id)
+    if jobs is None:
+        return jsonify({"status": "error", "message": f"Batch {batch_id} not found"}), 404
+    
+    results = []
+    summary = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+    for job in jobs:
+        if job is None:
+            continue
+        summary[job['state']] += 1
+        results.append({
+            "app_name": job['app_name'],
+            "job_id": job['job_id'],
+            "state": job['state'],
+            "result": job['result'],
+            "error": job['error']
+        })
+    
+    return jsonify({
+        "status": "success",
+        "batch_id": batch_id,
+        "state": JOB_RUNNING if summary[JOB_QUEUED] or summary[JOB_RUNNING] else "completed",
+        "summary": summary,
+        "applications": results
+    })
+
+@portal.route('/api/jobs/<job_id>', methods=['GET'])
+@limiter.limit("120 per minute")
+def get_job_status(job_id):
+    """Get progress and outcome of a background onboarding job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} not found"}), 404
+    
+    return jsonify({"status": "success", **job})
+
+@portal.route('/api/status/<app_name>', methods=['GET'])
 @limiter.limit("30 per minute")
 def get_application_status(app_name):
     """Get the status of an application"""
     try:
-        # Check if app exists in GitLab
-        cmd = [
-            'curl', '-s',
-            f"{GITLAB_URL}/api/v4/projects?search={app_name}",
-            '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-        ]
+        service = get_onboarding_service()
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        projects = json.loads(result.stdout)
+        # Serve from the background status snapshot when it has this app
+        snapshot = service.status_snapshotter.snapshot
+        app_status = snapshot.get(app_name) if snapshot else None
+        if app_status and not app_status["environments_unavailable"]:
+            return jsonify({
+                "status": "success",
+                "app_name": app_name,
+                "project_id": app_status['id'],
+                "environments": app_status["environments"],
+                "snapshot_age": round(snapshot.age, 1)
+            })
         
-        app_exists = False
-        for project in projects:
-            if project['name'].lower() == app_name.lower():
-                app_exists = True
-                project_id = project['id']
-                break
-                
-        if not app_exists:
+        # Check if app exists in GitLab
+        project = service._get_project_by_name(app_name)
+        if not project:
             return jsonify({"status": "error", "message": f"Application {app_name} not found"}), 404
+        project_id = project['id']
             
         # Get deployment status
-        cmd = [
-            'curl', '-s',
-            f"{GITLAB_URL}/api/v4/projects/{project_id}/environments",
-            '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        environments = json.loads(result.stdout)
+        environments = service.fetch_environments(project_id)
         
-        env_status = {}
-        for env in environments:
-            env_status[env['name']] = {
-                "status": env['state'],
-                "last_deployment": env.get('last_deployment', {}).get('created_at', 'Never'),
-                "url": env.get('external_url', '')
-            }
-            
         return jsonify({
             "status": "success", 
             "app_name": app_name,
             "project_id": project_id,
-            "environments": env_status
+            "environments": application_status(project, environments)["environments"],
+            "snapshot_age": None
         })
         
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-@app.route('/api/applications/<app_name>', methods=['PUT'])
+_sse_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+@portal.route('/api/events', methods=['GET'])
+@limiter.limit(SSE_CONNECT_RATE_LIMIT)
+@requires_auth
+def status_events():
+    """Stream environment status changes to the dashboard as Server-Sent Events"""
+    snapshotter = get_onboarding_service().status_snapshotter
+    streams = _sse_streams
+    
+    def stream():
+        # Claimed when the stream starts, so a response that is never
+        # iterated cannot leak a slot or a subscription
+        if not streams.acquire(blocking=False):
+            yield f"retry: {SSE_BUSY_RETRY_MS}\n\n"
+            return
+        subscription = snapshotter.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            snapshotter.unsubscribe(subscription)
+            streams.release()
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@portal.route('/api/webhooks/gitlab', methods=['POST'])
+@limiter.exempt
+def gitlab_webhook():
+    """
+    Receive GitLab push, pipeline and deployment events for onboarded projects.
+    
+    For pipeline and deployment events the project's environments are re-read
+    in the background, so the status snapshot and /api/events subscribers see
+    the change within seconds. Cached GitLab reads need no invalidation: every
+    cache hit is revalidated with GitLab before it is served.
+    """
+    if not GITLAB_WEBHOOK_SECRET:
+        return jsonify({"status": "error", "message": "Webhooks are not enabled"}), 404
+    if not secrets.compare_digest(request.headers.get('X-Gitlab-Token', ''), GITLAB_WEBHOOK_SECRET):
+        return jsonify({"status": "error", "message": "Invalid webhook token"}), 401
+    
+    event = request.get_json(silent=True) or {}
+    kind = event.get('object_kind')
+    project = event.get('project') or {}
+    project_id = project.get('id') or event.get('project_id')
+    if project_id is None:
+        return jsonify({"status": "ignored", "object_kind": kind})
+    
+    try:
+        service = get_onboarding_service()
+    except OnboardingError as e:
+        # GitLab redelivers failed webhooks
+        return jsonify({"status": "error", "message": e.message}), 503
+    
+    if kind in STATUS_WEBHOOK_EVENTS and project.get('name'):
+        schedule_status_refresh(service, project_id, project['name'])
+    
+    return jsonify({"status": "accepted", "object_kind": kind}), 202
+
+@portal.route('/api/webhooks/gitlab/register', methods=['POST'])
+@limiter.limit("2 per minute")
+@requires_auth
+def register_gitlab_webhooks():
+    """
+    Register the portal's webhook on every already onboarded project that
+    lacks it, as a background job polled through /api/jobs/<job_id>
+    """
+    if not (PORTAL_WEBHOOK_URL and GITLAB_WEBHOOK_SECRET):
+        return jsonify({
+            "status": "error",
+            "message": "PORTAL_WEBHOOK_URL and GITLAB_WEBHOOK_SECRET must be set"
+        }), 400
+    service = get_onboarding_service()
+    
+    def run_registration(job):
+        with deadline(ONBOARDING_JOB_DEADLINE), \
+                instrumentation.traced_block('webhook_registration_job', job_id=job.job_id):
+            return service.register_portal_webhooks()
+    
+    try:
+        job = get_job_queue().submit(WEBHOOK_REGISTRATION_JOB, run_registration)
+    except JobQueueFull:
+        return jsonify({
+            "status": "error",
+            "message": "Too many onboarding requests in progress. Please try again later."
+        }), 503
+    
+    reference = job_reference(job)
+    return jsonify({
+        "status": "accepted",
+        "job_id": job.job_id,
+        "status_url": reference['status_url']
+    }), 202, {'Location': reference['status_url']}
+
+@portal.route('/api/applications/<app_name>', methods=['PUT'])
 @limiter.limit("5 per minute")
 @requires_auth
 def update_application(app_name):
     """Update an existing application configuration"""
     try:
         app_data = request.json
-        service = OnboardingService()
+        app_data.setdefault('app_name', app_name)
+        service = get_onboarding_service()
         
         # Get existing project
         project = service._get_project_by_name(app_name)
@@ -1114,16 +1445,26 @@ def update_application(app_name):
         
         project_id = project['id']
         
+        files = {}
+        
         # Update CI/CD pipeline if framework changed
         if 'framework' in app_data:
-            pipeline_content = service.generate_ci_cd_pipeline(app_data)
-            service.add_file_to_project(project_id, '.gitlab-ci.yml', pipeline_content)
+            files['.gitlab-ci.yml'] = service.generate_ci_cd_pipeline(app_data)
         
         # Update Kubernetes manifests if configuration changed
         if any(key in app_data for key in ['replicas', 'memory_request', 'memory_limit', 'cpu_request', 'cpu_limit']):
             manifests = service.generate_kubernetes_manifests(app_data)
             for filename, content in manifests.items():
-                service.add_file_to_project(project_id, f"deploy/{filename}", content)
+                files[f"deploy/{filename}"] = content
+        
+        # Push only the artifacts whose content changed, in a single commit
+        changed_files = []
+        if files:
+            store_artifacts(app_name, files, merge=True)
+            changed_files = service.commit_changed_files(
+                project_id, files,
+                f"Update {app_name} configuration via 1-click onboarding"
+            )
         
         # Update project description if provided
         if 'description' in app_data:
@@ -1133,7 +1474,8 @@ def update_application(app_name):
         return jsonify({
             "status": "success",
             "message": f"Application {app_name} updated successfully",
-            "project_url": project['web_url']
+            "project_url": project['web_url'],
+            "changed_files": changed_files
         })
         
     except OnboardingError as e:
@@ -1151,13 +1493,13 @@ def update_application(app_name):
             "details": str(e)
         }), 500
 
-@app.route('/api/applications/<app_name>', methods=['DELETE'])
+@portal.route('/api/applications/<app_name>', methods=['DELETE'])
 @limiter.limit("3 per minute")
 @requires_auth
 def delete_application(app_name):
     """Delete an application and its GitLab project"""
     try:
-        service = OnboardingService()
+        service = get_onboarding_service()
         
         # Get project details
         project = service._get_project_by_name(app_name)
@@ -1178,22 +1520,21 @@ def delete_application(app_name):
             }), 400
         
         # Delete the GitLab project
-        cmd = [
-            'curl', '-s', '-X', 'DELETE',
-            f"{GITLAB_URL}/api/v4/projects/{project_id}",
-            '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"Failed to delete GitLab project: {result.stderr}")
+        try:
+            with gitlab_operation('delete_project'):
+                service.gitlab.delete(f"projects/{project_id}")
+        except GitLabAPIError as e:
+            logger.error(f"Failed to delete GitLab project: {e.message}")
             raise OnboardingError(
                 "Failed to delete GitLab project",
                 status_code=500,
-                details=f"GitLab API error: {result.stderr}"
+                details=f"GitLab API error: {e.body or e.message}"
             )
         
+        service.project_index.remove(app_name)
+        service.status_snapshotter.discard(app_name)
+        if get_artifact_store() is not None:
+            get_artifact_store().delete(app_name)
         logger.info(f"Application {app_name} deleted successfully")
         return jsonify({
             "status": "success",
@@ -1215,48 +1556,69 @@ def delete_application(app_name):
             "details": str(e)
         }), 500
 
-@app.route('/api/applications', methods=['GET'])
+@portal.route('/api/applications', methods=['GET'])
 @limiter.limit("30 per minute")
 @requires_auth
 def list_applications():
-    """List all applications created through the onboarding portal"""
+    """
+    List all applications created through the onboarding portal
+    
+    Optional cursor pagination: ?limit=N returns at most N applications plus
+    a next_cursor to pass back as ?cursor= for the following page.
+    """
     try:
-        # Get all projects from GitLab with onboarding tag
-        cmd = [
-            'curl', '-s',
-            f"{GITLAB_URL}/api/v4/projects?tag_list=onboarded&per_page=100",
-            '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-        ]
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit')
+        try:
+            cursor = int(cursor) if cursor else None
+            limit = int(limit) if limit else None
+        except ValueError:
+            return jsonify({"status": "error", "message": "cursor and limit must be integers"}), 400
+        if limit is not None and not 1 <= limit <= APPLICATIONS_MAX_LIMIT:
+            return jsonify({
+                "status": "error",
+                "message": f"limit must be between 1 and {APPLICATIONS_MAX_LIMIT}"
+            }), 400
+        
+        service = get_onboarding_service()
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # Get all projects from GitLab with onboarding tag, page by page
+        per_page = min(limit + 1, APPLICATIONS_MAX_LIMIT) if limit else APPLICATIONS_MAX_LIMIT
+        projects = service.iter_onboarded_projects(id_after=cursor, per_page=per_page)
         
-        if result.returncode != 0:
-            logger.error(f"Failed to list projects: {result.stderr}")
+        applications = []
+        next_cursor = None
+        try:
+            with gitlab_operation('list_projects'):
+                for project in projects:
+                    if limit is not None and len(applications) == limit:
+                        next_cursor = str(applications[-1]['id'])
+                        break
+                    applications.append(project)
+        except GitLabAPIError as e:
+            logger.error(f"Failed to list projects: {e.message}")
             raise OnboardingError(
                 "Failed to list applications",
                 status_code=500,
-                details=f"GitLab API error: {result.stderr}"
+                details=f"GitLab API error: {e.body or e.message}"
             )
+        finally:
+            projects.close()
         
-        projects = json.loads(result.stdout)
-        
-        applications = []
-        for project in projects:
-            applications.append({
-                "id": project['id'],
-                "name": project['name'],
-                "description": project['description'],
-                "web_url": project['web_url'],
-                "created_at": project['created_at'],
-                "last_activity_at": project['last_activity_at'],
-                "visibility": project['visibility']
-            })
-        
-        return jsonify({
+        response = {
             "status": "success",
             "applications": applications,
             "total": len(applications)
-        })
+        }
+        if limit is not None:
+            response["next_cursor"] = next_cursor
+        
+        # Clients revalidate with If-None-Match and get an empty 304 when the listing is unchanged
+        response = jsonify(response)
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
         
     except OnboardingError as e:
         return jsonify({
@@ -1273,17 +1635,18 @@ def list_applications():
             "details": str(e)
         }), 500
 
-@app.errorhandler(429)
+@portal.app_errorhandler(429)
 def rate_limit_handler(e):
     """Handle rate limit exceeded errors"""
     logger.warning(f"Rate limit exceeded: {get_remote_address()}")
+    instrumentation.RATE_LIMIT_REJECTIONS.inc(request_route())
     return jsonify({
         "status": "error",
         "message": "Rate limit exceeded. Please try again later.",
         "retry_after": getattr(e, 'retry_after', 60)
     }), 429
 
-@app.errorhandler(400)
+@portal.app_errorhandler(400)
 def bad_request(error):
     """Handle 400 errors"""
     return jsonify({
@@ -1291,7 +1654,7 @@ def bad_request(error):
         "message": "Bad request. Please check your input and try again."
     }), 400
 
-@app.errorhandler(401)
+@portal.app_errorhandler(401)
 def unauthorized(error):
     """Handle 401 errors"""
     return jsonify({
@@ -1299,7 +1662,7 @@ def unauthorized(error):
         "message": "Unauthorized. Please log in and try again."
     }), 401
 
-@app.errorhandler(403)
+@portal.app_errorhandler(403)
 def forbidden(error):
     """Handle 403 errors"""
     return jsonify({
@@ -1307,7 +1670,7 @@ def forbidden(error):
         "message": "Forbidden. You don't have permission to perform this action."
     }), 403
 
-@app.errorhandler(404)
+@portal.app_errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
     if request.path.startswith('/api/'):
@@ -1317,7 +1680,7 @@ def not_found(error):
                              error_code=404, 
                              error_message="Page not found"), 404
 
-@app.errorhandler(500)
+@portal.app_errorhandler(500)
 def server_error(error):
     """Handle 500 errors"""
     error_id = f"ERR-{int(time.time())}"
@@ -1336,7 +1699,7 @@ def server_error(error):
                              error_message="Internal server error",
                              error_id=error_id), 500
 
-@app.errorhandler(Exception)
+@portal.app_errorhandler(Exception)
 def handle_unexpected_error(error):
     """Handle any unexpected errors"""
     error_id = f"ERR-{int(time.time())}"
@@ -1355,8 +1718,19 @@ def handle_unexpected_error(error):
                              error_message="An unexpected error occurred",
                              error_id=error_id), 500
 
+# Monitoring endpoints
+@portal.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Prometheus metrics, combined across worker processes when METRICS_MULTIPROC_DIR is set"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"
+    ):
+        return jsonify({"status": "error", "message": "Authentication required"}), 401
+    return Response(instrumentation.render_metrics(), mimetype=instrumentation.Registry.CONTENT_TYPE)
+
 # CSRF token generation endpoints
-@app.route('/api/csrf-token', methods=['GET'])
+@portal.route('/api/csrf-token', methods=['GET'])
 def get_csrf_token():
     """Get CSRF token for forms"""
     # For now, generate a simple token (in production, use proper CSRF protection)
@@ -1365,12 +1739,12 @@ def get_csrf_token():
     return jsonify({"csrf_token": csrf_token})
 
 # Web Routes (User Interface)
-@app.route('/')
+@portal.route('/')
 def index():
     """Main onboarding interface"""
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@portal.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
     if request.method == 'POST':
@@ -1387,75 +1761,112 @@ def login():
             next_page = request.args.get('next')
             if next_page:
                 return redirect(next_page)
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('portal.dashboard'))
         else:
             flash('Please enter both username and password', 'error')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@portal.route('/logout')
 def logout():
     """Logout and clear session"""
     session.clear()
     flash('You have been logged out successfully', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('portal.index'))
 
-@app.route('/dashboard')
+@portal.route('/dashboard')
 @requires_auth
 def dashboard():
     """User dashboard showing onboarded applications"""
     try:
         # Get user's applications
-        service = OnboardingService()
-        
-        # Get all projects from GitLab with onboarding tag
-        cmd = [
-            'curl', '-s',
-            f"{GITLAB_URL}/api/v4/projects?tag_list=onboarded&per_page=100",
-            '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-        ]
+        service = get_onboarding_service()
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        projects = json.loads(result.stdout) if result.returncode == 0 else []
+        # Serve from the background status snapshot, or fetch live until the first one is built
+        snapshot = service.status_snapshotter.snapshot
+        if snapshot is not None:
+            applications = list(snapshot.applications.values())
+            snapshot_age = snapshot.age
+        else:
+            try:
+                applications = list(service.collect_application_status().values())
+            except GitLabAPIError as e:
+                logger.error(f"Failed to list projects: {e.message}")
+                applications = []
+            snapshot_age = None
         
-        # Get environment status for each project
-        applications = []
-        for project in projects:
-            app_info = {
-                "id": project['id'],
-                "name": project['name'],
-                "description": project['description'],
-                "web_url": project['web_url'],
-                "created_at": project['created_at'],
-                "environments": {}
-            }
-            
-            # Get environments for this project
-            env_cmd = [
-                'curl', '-s',
-                f"{GITLAB_URL}/api/v4/projects/{project['id']}/environments",
-                '-H', f"PRIVATE-TOKEN: {GITLAB_TOKEN}"
-            ]
-            
-            env_result = subprocess.run(env_cmd, capture_output=True, text=True)
-            if env_result.returncode == 0:
-                environments = json.loads(env_result.stdout)
-                for env in environments:
-                    app_info["environments"][env['name']] = {
-                        "status": env['state'],
-                        "url": env.get('external_url', '')
-                    }
-            
-            applications.append(app_info)
+        if any(app_info["environments_unavailable"] for app_info in applications):
+            flash('Some environment statuses could not be loaded from GitLab', 'warning')
         
-        return render_template('dashboard.html', 
-                             applications=applications,
-                             username=session.get('username', 'User'))
+        with span('render_template'):
+            return render_template('dashboard.html', 
+                                 applications=applications,
+                                 snapshot_age=snapshot_age,
+                                 username=session.get('username', 'User'))
         
     except Exception as e:
         logger.error(f"Failed to load dashboard: {str(e)}")
         flash('Error loading dashboard', 'error')
-        return render_template('dashboard.html', applications=[], username=session.get('username', 'User'))
+        return render_template('dashboard.html', applications=[], snapshot_age=None, username=session.get('username', 'User'))
+
+def warm_up():
+    """
+    Build the read-only shared state ahead of the first request. Called in
+    the gunicorn master when preloading, so workers inherit it copy-on-write.
+    """
+    get_template_registry()
+
+def create_app(config=None):
+    """
+    Build the onboarding portal Flask app.
+    
+    `config` is a mapping of Flask config keys overriding the settings read
+    from the environment. Only cheap, fork-safe setup happens here: the GitLab
+    client, OnboardingService, caches and worker pools are created once per
+    worker process on first use, so the app can be built in a gunicorn
+    --preload master and shared by its workers.
+    """
+    configure_logging()
+    
+    app = Flask(__name__, 
+                static_folder="static",
+                template_folder="templates")
+    
+    # Configure secure session
+    app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
+    app.config['SESSION_COOKIE_SECURE'] = os.getenv('SECURE_COOKIES', 'True').lower() == 'true'
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+    # Uncomment when flask-wtf is installed
+    # app.config['WTF_CSRF_ENABLED'] = True
+    # app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
+    app.config.update(config or {})
+    
+    # Configure CSRF protection (uncomment when flask-wtf is installed)
+    # csrf = CSRFProtect(app)
+    
+    limiter.init_app(app)
+    
+    # Apply security headers to all responses
+    app.after_request(add_security_headers)
+    
+    # Per-route latency for /metrics, Server-Timing and slow-request traces
+    app.before_request(start_request_timer)
+    app.after_request(observe_request)
+    app.teardown_request(end_request_trace)
+    
+    # Runs before observe_request (after_request hooks run in reverse), so it is traced
+    app.after_request(compress_response)
+    
+    # Bound the GitLab calls made while handling each request
+    app.before_request(start_request_deadline)
+    app.teardown_request(end_request_deadline)
+    
+    app.register_blueprint(portal)
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
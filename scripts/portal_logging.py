@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Logging for the 1-Click Onboarding Portal
+-----------------------------------------
+Request threads only put log records on a bounded in-memory queue; a
+background listener thread formats them and does the file and stdout I/O,
+so log writes never sit on the request latency path.
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Empty logs to stdout only
+LOG_FILE = os.getenv('LOG_FILE', 'onboarding.log')
+# Give every process its own file (onboarding.<pid>.log): processes sharing
+# one file would each rotate it underneath the others. gunicorn.conf.py sets
+# this, and logs to stdout only unless LOG_FILE is set, with several workers.
+LOG_FILE_PER_PROCESS = os.getenv('LOG_FILE_PER_PROCESS', 'False').lower() == 'true'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+# text or json
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# Records waiting for the writer thread; beyond this new records are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# Fraction of DEBUG records kept
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep every record above `level`, and records at or below it with probability `rate`"""
+
+    def __init__(self, rate=LOG_DEBUG_SAMPLE_RATE, level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno > self.level or self.rate >= 1 or random.random() < self.rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def process_log_file(log_file=None, per_process=None):
+    """
+    The file this process logs to: `log_file` (default LOG_FILE), with the
+    process id before its extension when per process
+    """
+    log_file = LOG_FILE if log_file is None else log_file
+    per_process = LOG_FILE_PER_PROCESS if per_process is None else per_process
+    if not log_file or not per_process:
+        return log_file
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext}"
+
+def build_handlers(log_file=LOG_FILE, log_format=LOG_FORMAT, max_bytes=LOG_MAX_BYTES,
+                   backup_count=LOG_BACKUP_COUNT):
+    """The handlers run by the writer thread: stdout, plus a size-rotated file when `log_file` is set"""
+    formatter = JSONFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def create_log_pipeline(handlers, queue_size=LOG_QUEUE_SIZE, debug_sample_rate=LOG_DEBUG_SAMPLE_RATE):
+    """
+    Build a (queue handler, listener) pair: records given to the queue
+    handler are written to `handlers` by the listener's thread once it is
+    started.
+    """
+    log_queue = queue.Queue(queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(debug_sample_rate))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    return queue_handler, listener
+
+_queue_handler = None
+_listener = None
+
+def configure(level=LOG_LEVEL):
+    """
+    Route the root logger through the queue and start the writer thread.
+    A no-op if logging is already configured.
+    """
+    global _queue_handler, _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return False
+    _queue_handler, _listener = create_log_pipeline(build_handlers(process_log_file()))
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+    atexit.register(shutdown)
+    return True
+
+def shutdown():
+    """Write out the queued records and stop the writer thread"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except queue.Full:
+        # No room for the stop sentinel: the queued records are lost anyway
+        pass
+    for handler in listener.handlers:
+        handler.close()
+
+def _restart_after_fork():
+    """
+    The writer thread does not survive a fork: give the child its own queue
+    and thread, and with per-process files its own log file
+    """
+    global _listener
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    if LOG_FILE_PER_PROCESS:
+        # Closes only the child's copy of the parent's file
+        for handler in handlers:
+            handler.close()
+        handlers = build_handlers(process_log_file())
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+os.register_at_fork(after_in_child=_restart_after_fork)
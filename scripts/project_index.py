@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Project Index for the 1-Click Onboarding Portal
+-----------------------------------------------
+In-memory map of application name to onboarded GitLab project, so name
+lookups do not need a GitLab search call.
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger("onboarding-portal.index")
+
+PROJECT_INDEX_REFRESH_INTERVAL = float(os.getenv('PROJECT_INDEX_REFRESH_INTERVAL', 300))
+
+class ProjectIndex:
+    """
+    Thread-safe index of onboarded projects keyed by normalized name.
+
+    The index is loaded from `loader` (a callable returning project summaries)
+    on first use, kept current by put()/remove() as the portal creates and
+    deletes projects, and rebuilt by a background thread every
+    `refresh_interval` seconds to pick up changes made outside the portal.
+    """
+
+    def __init__(self, loader, refresh_interval=PROJECT_INDEX_REFRESH_INTERVAL):
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self._projects = {}
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._stop = threading.Event()
+        self._refresh_thread = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(name):
+        """Normalize an application name for lookups"""
+        return str(name).strip().lower()
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def __len__(self):
+        return len(self._projects)
+
+    def refresh(self):
+        """Rebuild the index from GitLab and swap it in atomically"""
+        self.load(self._loader())
+
+    def load(self, projects):
+        """Replace the index contents with `projects` (e.g. from a full listing)"""
+        projects = {self.normalize(project['name']): project for project in projects}
+        with self._lock:
+            self._projects = projects
+            self._loaded_at = time.monotonic()
+        logger.debug(f"Project index refreshed with {len(projects)} projects")
+        self._start_background_refresh()
+
+    def get(self, name):
+        """
+        Return the indexed project for `name`, or None. The first call loads
+        the index; if that load fails the lookup simply misses.
+        """
+        if not self.loaded:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to load project index: {str(e)}")
+                self.misses += 1
+                return None
+        project = self._projects.get(self.normalize(name))
+        if project is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return project
+
+    def put(self, project):
+        """Add or replace a project in the index"""
+        with self._lock:
+            self._projects[self.normalize(project['name'])] = project
+
+    def remove(self, name):
+        """Drop a project from the index"""
+        with self._lock:
+            self._projects.pop(self.normalize(name), None)
+
+    def _start_background_refresh(self):
+        if self.refresh_interval <= 0 or self._refresh_thread is not None:
+            return
+        with self._lock:
+            if self._refresh_thread is not None:
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop,
+                name="project-index-refresh",
+                daemon=True
+            )
+        self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Background project index refresh failed: {str(e)}")
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
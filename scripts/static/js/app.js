@@ -33,6 +33,7 @@ const deploymentSpinner = document.getElementById('deploymentSpinner');
 const deploymentSuccess = document.getElementById('deploymentSuccess');
 const deploymentError = document.getElementById('deploymentError');
 const errorMessage = document.getElementById('errorMessage');
+const deploymentUnknown = document.getElementById('deploymentUnknown');
 const projectURL = document.getElementById('projectURL');
 const devURL = document.getElementById('devURL');
 const prodURL = document.getElementById('prodURL');
@@ -246,6 +247,7 @@ function deployApplication() {
     deploymentSpinner.style.display = 'block';
     deploymentSuccess.style.display = 'none';
     deploymentError.style.display = 'none';
+    deploymentUnknown.style.display = 'none';
     
     // Collect all the form data
     const appData = {
@@ -272,23 +274,11 @@ function deployApplication() {
     })
     .then(response => response.json())
     .then(data => {
-        deploymentSpinner.style.display = 'none';
-        
-        if (data.status === 'success') {
-            // Store deployment data
-            deploymentData = data;
-            
-            // Update success section
-            projectURL.href = data.project_url;
-            devURL.href = data.dev_url;
-            prodURL.href = data.prod_url;
-            
-            // Show success section
-            deploymentSuccess.style.display = 'block';
+        if (data.status === 'accepted') {
+            // Onboarding runs in the background; follow the job until it finishes
+            pollOnboardingJob(data.status_url);
         } else {
-            // Show error section
-            errorMessage.textContent = data.message || 'An error occurred during deployment';
-            deploymentError.style.display = 'block';
+            showDeploymentResult(data);
         }
     })
     .catch(error => {
@@ -299,6 +289,83 @@ function deployApplication() {
     });
 }
 
+/**
+ * Poll an onboarding job until it succeeds or fails
+ *
+ * An unknown job (404) or a failed poll says nothing about the onboarding
+ * itself, so polling continues for JOB_LOOKUP_GRACE_MS before the outcome
+ * is reported as unknown rather than failed.
+ */
+const JOB_LOOKUP_GRACE_MS = 30000;
+
+function pollOnboardingJob(statusUrl, lostSince = null) {
+    const retryOrGiveUp = () => {
+        const since = lostSince || Date.now();
+        if (Date.now() - since >= JOB_LOOKUP_GRACE_MS) {
+            showDeploymentUnknown();
+        } else {
+            setTimeout(() => pollOnboardingJob(statusUrl, since), 1000);
+        }
+    };
+    fetch(statusUrl)
+    .then(response => {
+        if (!response.ok) {
+            return null;
+        }
+        return response.json();
+    })
+    .then(job => {
+        if (job === null) {
+            retryOrGiveUp();
+        } else if (job.state === 'succeeded') {
+            showDeploymentResult(job.result);
+        } else if (job.state === 'failed') {
+            showDeploymentResult({
+                status: 'error',
+                message: (job.error && job.error.message) || job.message
+            });
+        } else {
+            setTimeout(() => pollOnboardingJob(statusUrl), 1000);
+        }
+    })
+    .catch(error => {
+        console.error('Error checking onboarding progress:', error);
+        retryOrGiveUp();
+    });
+}
+
+/**
+ * Report that the outcome of an onboarding run could not be determined
+ */
+function showDeploymentUnknown() {
+    deploymentSpinner.style.display = 'none';
+    deploymentUnknown.style.display = 'block';
+}
+
+/**
+ * Show the outcome of an onboarding run
+ */
+function showDeploymentResult(data) {
+    deploymentSpinner.style.display = 'none';
+    
+    if (data.status === 'success') {
+        // Store deployment data
+        deploymentData = data;
+        
+        // Update success section
+        projectURL.href = data.project_url;
+        devURL.href = data.dev_url;
+        prodURL.href = data.prod_url;
+        
+        // Show success section
+        deploymentSuccess.style.display = 'block';
+    } else {
+        // Show error section
+        errorMessage.textContent = data.message || 'An error occurred during deployment';
+        deploymentError.style.display = 'block';
+    }
+}
+
 /**
  * Reset the form and start over
  */
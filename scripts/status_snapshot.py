@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Status Snapshots for the 1-Click Onboarding Portal
+--------------------------------------------------
+Background refresher that keeps an in-memory snapshot of every onboarded
+application and its environment states, so read routes do not call GitLab.
+Subscribers receive the per-application changes between snapshots.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger("onboarding-portal.snapshot")
+
+STATUS_SNAPSHOT_INTERVAL = float(os.getenv('STATUS_SNAPSHOT_INTERVAL', 30))
+STATUS_SUBSCRIBER_QUEUE_SIZE = int(os.getenv('STATUS_SUBSCRIBER_QUEUE_SIZE', 256))
+
+class StatusSnapshot:
+    """
+    Point-in-time view of all onboarded applications.
+
+    `applications` maps the lower-cased application name to a dict holding the
+    project summary plus an `environments` mapping of environment name to
+    {status, url, last_deployment}. Snapshots are never mutated once built;
+    changes produce a new snapshot.
+    """
+
+    def __init__(self, applications, built_at=None):
+        self.applications = applications
+        self.built_at = built_at if built_at is not None else time.time()
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was built"""
+        return max(0.0, time.time() - self.built_at)
+
+    def get(self, app_name):
+        return self.applications.get(app_name.lower())
+
+    def with_application(self, app):
+        """Return a copy of this snapshot with `app` added or replaced"""
+        applications = dict(self.applications)
+        applications[app['name'].lower()] = app
+        return StatusSnapshot(applications, self.built_at)
+
+    def without(self, app_name):
+        """Return a copy of this snapshot with `app_name` removed"""
+        applications = dict(self.applications)
+        applications.pop(app_name.lower(), None)
+        return StatusSnapshot(applications, self.built_at)
+
+def diff_snapshots(previous, current):
+    """
+    Return the change events between two snapshots.
+
+    Events only carry what changed: for an existing application, just the
+    environments whose state differs and the names of environments that went
+    away. Nothing is reported against a missing previous snapshot, and an
+    application whose environments could not be fetched is left untouched.
+    """
+    if previous is None:
+        return []
+
+    events = []
+    for key, app in current.applications.items():
+        old = previous.applications.get(key)
+        if old is None:
+            events.append({"type": "app_added", "app": app['name'], "environments": app['environments']})
+            continue
+        if app['environments_unavailable']:
+            continue
+
+        changed = {
+            name: env for name, env in app['environments'].items()
+            if old['environments'].get(name) != env
+        }
+        removed = [name for name in old['environments'] if name not in app['environments']]
+        if changed or removed:
+            events.append({"type": "status", "app": app['name'], "environments": changed, "removed": removed})
+
+    for key, old in previous.applications.items():
+        if key not in current.applications:
+            events.append({"type": "app_removed", "app": old['name']})
+    return events
+
+class StatusSnapshotter:
+    """
+    Rebuilds a StatusSnapshot every `interval` seconds on a daemon thread.
+
+    `builder` is a callable returning the applications mapping. A failed build
+    keeps serving the previous snapshot. New snapshots replace the old one with
+    a single reference assignment, so readers never see a half-built state.
+
+    subscribe() hands out a bounded queue that receives the diff_snapshots()
+    events of every swap. A subscriber that falls behind has its backlog
+    replaced by a single {"type": "resync"} event.
+    """
+
+    def __init__(self, builder, interval=STATUS_SNAPSHOT_INTERVAL):
+        self._builder = builder
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._subscribers = set()
+
+    @property
+    def snapshot(self):
+        """The current snapshot, or None before the first successful build"""
+        return self._snapshot
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def refresh(self):
+        """Build a new snapshot and swap it in"""
+        started = time.monotonic()
+        snapshot = StatusSnapshot(self._builder())
+        self._swap(snapshot)
+        logger.debug(
+            f"Status snapshot rebuilt with {len(snapshot.applications)} applications "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return snapshot
+
+    def _swap(self, snapshot):
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+        self._publish(diff_snapshots(previous, snapshot))
+
+    def update(self, app):
+        """
+        Replace one application in the current snapshot (e.g. after a webhook)
+        without rebuilding the rest. Returns False if there is no snapshot yet.
+        """
+        with self._lock:
+            previous = self._snapshot
+            if previous is None:
+                return False
+            self._snapshot = current = previous.with_application(app)
+        self._publish(diff_snapshots(previous, current))
+        return True
+
+    def discard(self, app_name):
+        """Remove an application from the current snapshot (e.g. after deletion)"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self._swap(snapshot.without(app_name))
+
+    def subscribe(self):
+        """Register for change events; returns the subscriber's queue"""
+        subscription = queue.Queue(maxsize=STATUS_SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _publish(self, events):
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                for event in events:
+                    subscription.put_nowait(event)
+            except queue.Full:
+                # Too far behind for deltas to be useful: ask for a full reload
+                while True:
+                    try:
+                        subscription.get_nowait()
+                    except queue.Empty:
+                        break
+                subscription.put_nowait({"type": "resync"})
+
+    def reset(self):
+        """Drop the current snapshot so reads go live until the next rebuild"""
+        with self._lock:
+            self._snapshot = None
+
+    def start(self):
+        """Start the background refresher; a no-op if disabled or already running"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="status-snapshotter",
+                daemon=True
+            )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Status snapshot refresh failed, keeping previous snapshot: {str(e)}")
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        """Stop the background refresher"""
+        self._stop.set()
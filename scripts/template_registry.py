@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Artifact Template Registry for the 1-Click Onboarding Portal
+------------------------------------------------------------
+Compiles the Jinja2 templates for generated CI/CD pipelines, Dockerfiles and
+Kubernetes manifests once per process and renders them on demand.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, StrictUndefined
+
+logger = logging.getLogger("onboarding-portal.templates")
+
+ARTIFACT_TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'templates', 'artifacts'
+)
+# Compiled template bytecode is shared by every worker through this directory;
+# empty means Jinja2's per-user temp directory
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR', '')
+# Rendered artifacts kept per process; 0 disables the render cache
+TEMPLATE_RENDER_CACHE_SIZE = int(os.getenv('TEMPLATE_RENDER_CACHE_SIZE', 256))
+
+GENERIC_FRAMEWORK = 'generic'
+
+def normalize_app_data(app_data):
+    """
+    Canonical form of an application spec for hashing: keys sorted, string
+    values stripped and unset (None) values dropped, so equivalent specs
+    produce the same fingerprint.
+    """
+    return {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in sorted(app_data.items())
+        if value is not None
+    }
+
+class RenderCache:
+    """
+    LRU cache of rendered artifacts keyed by content fingerprint.
+
+    Keys are derived from the normalized application spec and the template
+    version, so a hit is always byte-identical to a fresh render and entries
+    never need invalidating; the least recently used entry is evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries=TEMPLATE_RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class TemplateRegistry:
+    """
+    Precompiled artifact templates.
+
+    Pipelines live in pipelines/<framework>.yml.j2 and extend
+    pipelines/base.yml.j2, which holds the build and deploy jobs shared by all
+    frameworks. Dockerfiles live in dockerfiles/<framework>.j2 and manifests
+    in manifests/<name>.j2. A framework without its own template falls back
+    to the generic one, so supporting a new framework means adding its
+    template files only.
+
+    Every template is compiled when the registry is built and kept for the
+    life of the process; templates are not re-checked on disk. `version` is a
+    digest of all template sources, and rendered output is memoized under
+    fingerprint(app_data), which includes it.
+    """
+
+    MANIFESTS = ('deployment.yaml', 'service.yaml', 'ingress.yaml', 'configmap.yaml')
+
+    def __init__(self, template_dir=ARTIFACT_TEMPLATE_DIR, bytecode_cache_dir=TEMPLATE_BYTECODE_CACHE_DIR,
+                 render_cache_size=TEMPLATE_RENDER_CACHE_SIZE):
+        self.environment = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir or None),
+            undefined=StrictUndefined,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self._templates = {
+            name: self.environment.get_template(name)
+            for name in self.environment.list_templates(extensions=['j2'])
+        }
+        self.version = self._digest_sources()
+        self.cache = RenderCache(render_cache_size) if render_cache_size > 0 else None
+        logger.debug(
+            f"Compiled {len(self._templates)} artifact templates from {template_dir} "
+            f"(version {self.version[:12]})"
+        )
+
+    def _digest_sources(self):
+        digest = hashlib.sha256()
+        for name in sorted(self._templates):
+            source, _, _ = self.environment.loader.get_source(self.environment, name)
+            digest.update(name.encode())
+            digest.update(b'\0')
+            digest.update(source.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def fingerprint(self, app_data):
+        """
+        Stable hash of the normalized spec and the template version. Two specs
+        with the same fingerprint render identical artifacts, so it also
+        serves as a cheap change detector.
+        """
+        payload = json.dumps(normalize_app_data(app_data), sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f"{self.version}:{payload}".encode()).hexdigest()
+
+    def _memoized(self, kind, app_data, render):
+        # Render from the normalized spec too, so every spec sharing a
+        # fingerprint really does produce the cached output
+        app_data = normalize_app_data(app_data)
+        if self.cache is None:
+            return render(app_data)
+        key = f"{kind}:{self.fingerprint(app_data)}"
+        value = self.cache.get(key)
+        if value is None:
+            value = render(app_data)
+            self.cache.put(key, value)
+        return value
+
+    def __contains__(self, name):
+        return name in self._templates
+
+    def render(self, name, app_data):
+        """Render the template `name` with the application spec as context"""
+        return self._templates[name].render(app_data)
+
+    def _framework_template(self, pattern, framework):
+        name = pattern.format(framework)
+        return name if name in self._templates else pattern.format(GENERIC_FRAMEWORK)
+
+    def render_pipeline(self, app_data):
+        """Render the .gitlab-ci.yml for the application's framework"""
+        name = self._framework_template('pipelines/{}.yml.j2', app_data.get('framework'))
+        return self._memoized('pipeline', app_data, lambda data: self.render(name, data))
+
+    def render_dockerfile(self, app_data):
+        """Render the Dockerfile for the application's framework"""
+        name = self._framework_template('dockerfiles/{}.j2', app_data.get('framework'))
+        return self._memoized('dockerfile', app_data, lambda data: self.render(name, data))
+
+    def render_manifests(self, app_data):
+        """Render every Kubernetes manifest, keyed by file name"""
+        manifests = self._memoized('manifests', app_data, lambda data: {
+            filename: self.render(f"manifests/{filename}.j2", data)
+            for filename in self.MANIFESTS
+        })
+        # Callers get their own dict so the cached entry cannot be modified
+        return dict(manifests)
@@ -9,8 +9,11 @@ import os
 import sys
 import json
 import time
+import gzip
 import requests
 import unittest
+import logging
+import threading
 from unittest.mock import patch, MagicMock
 import tempfile
 import shutil
@@ -18,7 +21,27 @@ import shutil
 # Add the scripts directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from onboarding_portal import app, OnboardingService, OnboardingError
+# Background status refresh is driven explicitly by the tests
+os.environ['STATUS_SNAPSHOT_INTERVAL'] = '0'
+
+import onboarding_portal
+import instrumentation
+import portal_logging
+from onboarding_portal import app, create_app, OnboardingService, OnboardingError, get_gitlab_client, get_onboarding_service
+from gitlab_client import GitLabClient, GitLabAPIError, ResponseCache, CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline
+from status_snapshot import StatusSnapshot, diff_snapshots, STATUS_SNAPSHOT_INTERVAL
+from template_registry import TemplateRegistry
+from gitlab_simulator import GitLabSimulator, LatencyModel
+from onboarding_jobs import JobQueue, FileJobStore, MemoryJobStore, create_job_store
+from artifact_store import MemoryArtifactStore, LocalArtifactStore, create_artifact_store
+
+def gitlab_response(body=None, status_code=200, headers=None):
+    """Build a GitLab API response as returned by the pooled HTTP session"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode() if body is not None else b''
+    response.headers.update(headers or {})
+    return response
 
 class TestOnboardingPortal(unittest.TestCase):
     """Test cases for the onboarding portal"""
@@ -38,17 +61,31 @@ class TestOnboardingPortal(unittest.TestCase):
         # Create temporary directory for test files
         self.test_dir = tempfile.mkdtemp()
         
+        # Start every test with an unverified GitLab token and a closed circuit breaker
+        get_gitlab_client().credentials.invalidate()
+        get_gitlab_client().breaker.reset()
+        
     def tearDown(self):
         """Clean up test environment"""
         # Remove temporary directory
         shutil.rmtree(self.test_dir, ignore_errors=True)
         
-    def login(self):
+    def login(self, follow_redirects=True):
         """Helper method to log in for authenticated tests"""
         return self.app.post('/login', data={
             'username': 'test-admin',
             'password': 'test-password'
-        }, follow_redirects=True)
+        }, follow_redirects=follow_redirects)
+        
+    def wait_for_job(self, job_id, timeout=5):
+        """Poll the job status endpoint until the job has finished"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = json.loads(self.app.get(f'/api/jobs/{job_id}').data)
+            if job['state'] in ('succeeded', 'failed'):
+                return job
+            time.sleep(0.02)
+        self.fail(f"Job {job_id} did not finish within {timeout}s")
         
     def test_login_page_loads(self):
         """Test that login page loads correctly"""
@@ -108,26 +145,24 @@ class TestOnboardingPortal(unittest.TestCase):
         self.assertEqual(data['status'], 'error')
         self.assertIn('Missing required field', data['message'])
         
-    @patch('onboarding_portal.subprocess.run')
-    def test_onboard_application_success(self, mock_subprocess):
+    def test_onboard_application_success(self):
         """Test successful application onboarding"""
-        self.login()
+        # Log in without following the redirect to the dashboard
+        self.login(follow_redirects=False)
         
         # Mock GitLab API responses
-        mock_subprocess.side_effect = [
+        patcher = patch('gitlab_client.requests.Session.request')
+        mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_request.side_effect = [
             # Credential verification
-            MagicMock(returncode=0, stdout='{"username": "test"}'),
+            gitlab_response({"username": "test"}),
             # Project creation
-            MagicMock(returncode=0, stdout='{"id": 123, "web_url": "https://test.com/project"}'),
-            # File additions (CI/CD, Dockerfile, manifests)
-            MagicMock(returncode=0, stdout='{"file_path": ".gitlab-ci.yml"}'),
-            MagicMock(returncode=0, stdout='{"file_path": "Dockerfile"}'),
-            MagicMock(returncode=0, stdout='{"file_path": "deploy/deployment.yaml"}'),
-            MagicMock(returncode=0, stdout='{"file_path": "deploy/service.yaml"}'),
-            MagicMock(returncode=0, stdout='{"file_path": "deploy/ingress.yaml"}'),
-            MagicMock(returncode=0, stdout='{"file_path": "deploy/configmap.yaml"}'),
+            gitlab_response({"id": 123, "web_url": "https://test.com/project"}, 201),
+            # Single commit with CI/CD, Dockerfile and manifests
+            gitlab_response({"id": "abc123"}, 201),
             # Webhook setup
-            MagicMock(returncode=0, stdout='{"id": 1}'),
+            gitlab_response({"id": 1}, 201),
         ]
         
         app_data = {
@@ -140,11 +175,451 @@ class TestOnboardingPortal(unittest.TestCase):
         response = self.app.post('/api/onboard', 
                                json=app_data,
                                content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        
+        accepted = json.loads(response.data)
+        self.assertEqual(accepted['status'], 'accepted')
+        self.assertEqual(response.headers['Location'], accepted['status_url'])
+        
+        job = self.wait_for_job(accepted['job_id'])
+        self.assertEqual(job['state'], 'succeeded')
+        self.assertIn('project_url', job['result'])
+        self.assertEqual(
+            [step['name'] for step in job['steps']],
+            ['project_created', 'artifacts_rendered', 'files_committed', 'webhook_set']
+        )
+        self.assertTrue(all(step['duration_ms'] is not None for step in job['steps']))
+        
+        # All generated files go through one multi-action commit
+        commit_call = mock_request.call_args_list[2]
+        self.assertTrue(commit_call.args[1].endswith('/projects/123/repository/commits'))
+        file_paths = [a['file_path'] for a in commit_call.kwargs['json']['actions']]
+        self.assertEqual(file_paths, [
+            '.gitlab-ci.yml', 'Dockerfile',
+            'deploy/deployment.yaml', 'deploy/service.yaml',
+            'deploy/ingress.yaml', 'deploy/configmap.yaml'
+        ])
+        
+    def test_dashboard_renders_partial_environment_results(self):
+        """Test that a failed environment fetch does not break the dashboard"""
+        self.login(follow_redirects=False)
+        
+        def fake_gitlab(method, url, **kwargs):
+            if url.endswith('/user'):
+                return gitlab_response({"username": "test"})
+            if url.endswith('/projects'):
+                return gitlab_response([
+                    {"id": project_id, "name": name, "description": "", "web_url": "https://test.com/" + name,
+                     "created_at": "2025-06-08T08:00:00Z"}
+                    for project_id, name in [(1, 'app-one'), (2, 'app-two')]
+                ])
+            if url.endswith('/projects/1/environments'):
+                return gitlab_response([{"name": "production", "state": "available", "external_url": ""}])
+            return gitlab_response({"message": "500 Internal Server Error"}, 500)
+        
+        with patch('gitlab_client.requests.Session.request', side_effect=fake_gitlab):
+            response = self.app.get('/dashboard')
+        
         self.assertEqual(response.status_code, 200)
+        self.assertIn(b'app-one', response.data)
+        self.assertIn(b'Running', response.data)
+        self.assertIn(b'app-two', response.data)
+        self.assertIn(b'Status unavailable', response.data)
+        
+        # Fan-out calls report to the request's trace from the executor threads
+        server_timing = response.headers['Server-Timing']
+        self.assertIn('get_environments;dur=', server_timing)
+        self.assertIn('get_environments;dur=', server_timing.split('desc="2 calls"')[0])
+        self.assertIn('render_template;dur=', server_timing)
+        self.assertTrue(server_timing.split(', ')[-1].startswith('total;dur='))
+        
+    def test_request_deadline_propagates_to_gitlab_calls(self):
+        """Test that GitLab calls made for a request are bounded by its X-Request-Timeout"""
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [gitlab_response({"username": "test"}), gitlab_response([])]
+            response = self.app.get('/api/status/missing-app', headers={'X-Request-Timeout': '3'})
+        
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(all(call.kwargs['timeout'] <= 3 for call in mock_request.call_args_list))
+        
+        # A client cannot ask for less than REQUEST_DEADLINE_MIN
+        with app.test_request_context(headers={'X-Request-Timeout': '0'}):
+            self.assertEqual(onboarding_portal.request_deadline(), onboarding_portal.REQUEST_DEADLINE_MIN)
+        
+    def test_slow_request_trace_logged(self):
+        """Test that requests above the trace threshold log their spans as JSON"""
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
+            service = get_onboarding_service()
+        # A loaded index, so the unknown name goes straight to the GitLab search
+        service.project_index.load([])
+        get_gitlab_client().credentials.invalidate()
+        
+        with patch('instrumentation.TRACE_LOG_THRESHOLD_MS', 0), \
+                patch('gitlab_client.requests.Session.request') as mock_request, \
+                self.assertLogs('onboarding-portal.trace', level='INFO') as logs:
+            mock_request.side_effect = [
+                gitlab_response({"username": "test"}),
+                gitlab_response([]),
+            ]
+            response = self.app.get('/api/status/missing-app')
+        
+        self.assertEqual(response.status_code, 404)
+        trace = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(trace['name'], 'GET /api/status/<app_name>')
+        self.assertEqual(trace['path'], '/api/status/missing-app')
+        self.assertEqual(trace['status'], 404)
+        gitlab_spans = [span for span in trace['spans'] if span['name'] == 'gitlab']
+        self.assertEqual([span['operation'] for span in gitlab_spans], ['verify_credentials', 'find_project'])
+        self.assertIn('find_project', [span['name'] for span in trace['spans']])
+        
+    def test_list_applications_cursor_pagination(self):
+        """Test cursor/limit pagination of the applications listing"""
+        self.login(follow_redirects=False)
+        projects = [
+            {"id": project_id, "name": f"app-{project_id}", "description": "", "web_url": "",
+             "created_at": "", "last_activity_at": "", "visibility": "private", "star_count": 0}
+            for project_id in (11, 12, 13)
+        ]
+        
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [gitlab_response({"username": "test"}), gitlab_response(projects)]
+            response = self.app.get('/api/applications?cursor=10&limit=2')
         
         data = json.loads(response.data)
-        self.assertEqual(data['status'], 'success')
-        self.assertIn('project_url', data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a['id'] for a in data['applications']], [11, 12])
+        self.assertEqual(data['next_cursor'], '12')
+        self.assertNotIn('star_count', data['applications'][0])
+        self.assertEqual(mock_request.call_args.kwargs['params']['id_after'], 10)
+        
+        response = self.app.get('/api/applications?limit=500')
+        self.assertEqual(response.status_code, 400)
+        
+    def test_status_served_from_snapshot(self):
+        """Test that status lookups are answered from the background snapshot"""
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [
+                gitlab_response({"username": "test"}),
+                gitlab_response([{"id": 5, "name": "snap-app", "web_url": "https://test.com/snap-app"}]),
+                gitlab_response([{"name": "production", "state": "available", "external_url": "https://snap-app",
+                                  "last_deployment": {"created_at": "2025-06-08T09:15:00Z"}}]),
+            ]
+            service = get_onboarding_service()
+            self.addCleanup(service.status_snapshotter.reset)
+            service.status_snapshotter.refresh()
+            
+            response = self.app.get('/api/status/Snap-App')
+            
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['project_id'], 5)
+        self.assertEqual(data['environments']['production']['last_deployment'], '2025-06-08T09:15:00Z')
+        self.assertIsNotNone(data['snapshot_age'])
+        # Only the credential check and the snapshot build reached GitLab
+        self.assertEqual(mock_request.call_count, 3)
+        
+    def test_webhook_updates_status_snapshot(self):
+        """Test that an authenticated deployment webhook refreshes one application's status"""
+        available = {"name": "production", "state": "available", "external_url": "https://hook-app",
+                     "last_deployment": {"created_at": "2025-06-08T09:15:00Z"}}
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [
+                gitlab_response({"username": "test"}),
+                gitlab_response([{"id": 7, "name": "hook-app", "web_url": "https://test.com/hook-app"}]),
+                gitlab_response([{**available, "state": "stopped"}]),
+            ]
+            service = get_onboarding_service()
+            self.addCleanup(service.status_snapshotter.reset)
+            service.status_snapshotter.refresh()
+        subscription = service.status_snapshotter.subscribe()
+        self.addCleanup(service.status_snapshotter.unsubscribe, subscription)
+        event = {"object_kind": "deployment", "status": "success", "environment": "production",
+                 "project": {"id": 7, "name": "hook-app"}}
+        
+        with patch('onboarding_portal.GITLAB_WEBHOOK_SECRET', 'hook-secret'), \
+                patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response([available])
+            
+            response = self.app.post('/api/webhooks/gitlab', json=event, headers={'X-Gitlab-Token': 'wrong'})
+            self.assertEqual(response.status_code, 401)
+            
+            response = self.app.post('/api/webhooks/gitlab', json=event, headers={'X-Gitlab-Token': 'hook-secret'})
+            self.assertEqual(response.status_code, 202)
+            change = subscription.get(timeout=5)
+        
+        self.assertEqual(change["type"], "status")
+        self.assertEqual(change["environments"]["production"]["status"], "available")
+        self.assertEqual(service.status_snapshotter.snapshot.get('hook-app')["environments"]["production"]["status"],
+                         "available")
+        self.assertTrue(mock_request.call_args.args[1].endswith('/projects/7/environments'))
+        
+        # Without a configured secret the endpoint is disabled
+        response = self.app.post('/api/webhooks/gitlab', json=event, headers={'X-Gitlab-Token': ''})
+        self.assertEqual(response.status_code, 404)
+        
+    def test_register_webhooks_on_existing_projects(self):
+        """Test that the portal webhook is added to onboarded projects that lack it"""
+        simulator = GitLabSimulator(projects=3, seed=7).start()
+        self.addCleanup(simulator.stop)
+        client = GitLabClient(simulator.url, 'test-token')
+        self.addCleanup(client.close)
+        hook_url = 'https://portal.test/api/webhooks/gitlab'
+        simulator.dataset.add_hook(simulator.dataset.project('1'), {'url': hook_url})
+        for name, value in (('_gitlab_client', client), ('_onboarding_service', None),
+                            ('PORTAL_WEBHOOK_URL', hook_url), ('GITLAB_WEBHOOK_SECRET', 'hook-secret')):
+            patcher = patch(f'onboarding_portal.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.login(follow_redirects=False)
+        
+        # Webhooks do not slow down the status rebuild of the workers they never reach
+        self.assertEqual(get_onboarding_service().status_snapshotter.interval, STATUS_SNAPSHOT_INTERVAL)
+        
+        response = self.app.post('/api/webhooks/gitlab/register')
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for_job(json.loads(response.data)['job_id'])
+        
+        self.assertEqual(job['state'], 'succeeded')
+        self.assertEqual(len(job['result']['registered']), 2)
+        self.assertEqual(job['result']['already_registered'], 1)
+        for hooks in simulator.dataset.hooks.values():
+            self.assertEqual([hook['url'] for hook in hooks], [hook_url])
+        
+    def test_onboard_and_update_against_simulator(self):
+        """Test the onboarding and update flows end to end against the GitLab simulator"""
+        simulator = GitLabSimulator(projects=3, seed=7).start()
+        self.addCleanup(simulator.stop)
+        client = GitLabClient(simulator.url, 'test-token')
+        self.addCleanup(client.close)
+        for name, value in (('_gitlab_client', client), ('_onboarding_service', None)):
+            patcher = patch(f'onboarding_portal.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.login(follow_redirects=False)
+        
+        response = self.app.post('/api/onboard', json={
+            'app_name': 'sim-onboarded', 'framework': 'python',
+            'description': 'Simulated onboarding', 'team_email': 'test@example.com'
+        })
+        job = self.wait_for_job(json.loads(response.data)['job_id'])
+        self.assertEqual(job['state'], 'succeeded')
+        project = simulator.dataset.project(str(job['result']['project_id']))
+        self.assertIn('deploy/deployment.yaml', simulator.dataset.files[project['id']])
+        
+        response = self.app.put('/api/applications/sim-onboarded', json={'replicas': 5, 'framework': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['changed_files'], ['deploy/deployment.yaml'])
+        
+        response = self.app.get('/api/applications')
+        self.assertEqual(json.loads(response.data)['total'], 4)
+        
+    def test_status_events_stream(self):
+        """Test that status changes are pushed over the SSE endpoint"""
+        self.login(follow_redirects=False)
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
+            response = self.app.get('/api/events', buffered=False)
+        
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        stream = response.response
+        self.assertEqual(next(stream), b'retry: 5000\n\n')
+        
+        event = {"type": "status", "app": "my-app", "environments": {"production": {"status": "stopped"}}, "removed": []}
+        get_onboarding_service().status_snapshotter._publish([event])
+        self.assertEqual(next(stream), f"event: status\ndata: {json.dumps(event)}\n\n".encode())
+        response.close()
+        
+    def test_status_events_over_stream_cap(self):
+        """Test that streams beyond the per-worker cap are told to reconnect later"""
+        self.login(follow_redirects=False)
+        with patch('gitlab_client.requests.Session.request') as mock_request, \
+                patch('onboarding_portal._sse_streams', threading.BoundedSemaphore(1)):
+            mock_request.return_value = gitlab_response({"username": "test"})
+            first = self.app.get('/api/events', buffered=False)
+            self.assertEqual(next(first.response), b'retry: 5000\n\n')
+            
+            second = self.app.get('/api/events', buffered=False)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(list(second.response), [f"retry: {onboarding_portal.SSE_BUSY_RETRY_MS}\n\n".encode()])
+            
+            first.close()
+            third = self.app.get('/api/events', buffered=False)
+            self.assertEqual(next(third.response), b'retry: 5000\n\n')
+            third.close()
+        
+    def test_status_events_not_bound_by_default_rate_limit(self):
+        """Test that dashboard reconnects are not limited by the default per-IP limits"""
+        self.login(follow_redirects=False)
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
+            for _ in range(60):
+                response = self.app.get('/api/events', buffered=False)
+                self.assertEqual(response.status_code, 200)
+                response.close()
+        
+    def test_failed_onboarding_job_reports_error(self):
+        """Test that a failing onboarding step marks the job as failed"""
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [
+                gitlab_response({"username": "test"}),
+                gitlab_response({"message": "has already been taken"}, 400),
+            ]
+            response = self.app.post('/api/onboard', json={
+                'app_name': 'taken-app',
+                'framework': 'python',
+                'description': 'Test application',
+                'team_email': 'test@example.com'
+            })
+            job = self.wait_for_job(json.loads(response.data)['job_id'])
+        
+        self.assertEqual(job['state'], 'failed')
+        self.assertEqual(job['steps'][0]['name'], 'project_created')
+        self.assertEqual(job['steps'][0]['state'], 'failed')
+        self.assertIsNotNone(job['error']['message'])
+        
+        response = self.app.get('/api/jobs/does-not-exist')
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_onboarding_validates_every_spec_first(self):
+        """Test that one invalid spec rejects the whole batch before any GitLab call"""
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            response = self.app.post('/api/onboard/batch', json={'applications': [
+                {'app_name': 'good-app', 'framework': 'python',
+                 'description': 'Test application', 'team_email': 'test@example.com'},
+                {'app_name': 'bad-app', 'framework': 'python'},
+                {'app_name': 'Good_App', 'framework': 'nodejs',
+                 'description': 'Test application', 'team_email': 'test@example.com'},
+            ]})
+            mock_request.assert_not_called()
+
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertEqual([error['index'] for error in data['errors']], [1, 2])
+        self.assertIn('Missing required field', data['errors'][0]['message'])
+        self.assertIn('Duplicate application name', data['errors'][1]['message'])
+
+    def test_batch_onboarding_reports_per_app_results(self):
+        """Test that batch apps run as separate jobs with individual outcomes"""
+        def fake_gitlab(method, url, **kwargs):
+            if url.endswith('/user'):
+                return gitlab_response({"username": "test"})
+            if method == 'POST' and url.endswith('/projects'):
+                name = kwargs['json']['name']
+                if name == 'taken-app':
+                    return gitlab_response({"message": "has already been taken"}, 400)
+                project_id = 200 + len(name)
+                return gitlab_response({"id": project_id, "web_url": f"https://test.com/{name}"}, 201)
+            return gitlab_response({"id": 1}, 201)
+
+        # The batch is accepted by one worker and polled through another
+        store_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_root, True)
+        accepting, polling = JobQueue(FileJobStore(store_root)), JobQueue(FileJobStore(store_root))
+        
+        names = ['batch-app', 'taken-app', 'another-batch-app']
+        with patch('gitlab_client.requests.Session.request', side_effect=fake_gitlab), \
+                patch('onboarding_portal._job_queue', accepting):
+            response = self.app.post('/api/onboard/batch', json={'applications': [
+                {'app_name': name, 'framework': 'python',
+                 'description': 'Test application', 'team_email': 'test@example.com'}
+                for name in names
+            ]})
+            self.assertEqual(response.status_code, 202)
+            accepted = json.loads(response.data)
+            self.assertEqual([job['app_name'] for job in accepted['jobs']], names)
+            accepting._executor.shutdown(wait=True)
+
+        with patch('onboarding_portal._job_queue', polling):
+            batch = json.loads(self.app.get(accepted['status_url']).data)
+            self.assertEqual(batch['state'], 'completed')
+            self.assertEqual(batch['summary']['succeeded'], 2)
+            self.assertEqual(batch['summary']['failed'], 1)
+            results = {result['app_name']: result for result in batch['applications']}
+            self.assertEqual(results['batch-app']['result']['project_url'], 'https://test.com/batch-app')
+            self.assertEqual(results['taken-app']['state'], 'failed')
+
+            response = self.app.get('/api/onboard/batch/does-not-exist')
+            self.assertEqual(response.status_code, 404)
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics reports route, GitLab operation and rejection metrics"""
+        self.app.get('/login')
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.side_effect = [
+                gitlab_response({"username": "test"}),
+                gitlab_response({"message": "boom"}, 503),
+            ]
+            with self.assertRaises(OnboardingError):
+                get_onboarding_service().create_project({
+                    'app_name': 'metrics-app', 'description': 'Test application'
+                })
+        instrumentation.RATE_LIMIT_REJECTIONS.inc('/api/templates')
+        
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.data.decode()
+        self.assertIn('portal_http_request_duration_seconds_count{method="GET",route="/login",status="200"}', body)
+        self.assertIn('portal_gitlab_request_duration_seconds_count{operation="create_project",method="POST"}', body)
+        self.assertIn('portal_gitlab_request_errors_total{operation="create_project",method="POST",status="503"} 1', body)
+        self.assertIn('portal_rate_limit_rejections_total{route="/api/templates"}', body)
+        self.assertIn('# TYPE portal_cache_hit_ratio gauge', body)
+        
+    def test_templates_revalidation(self):
+        """Test that the templates payload is cacheable and revalidates with a 304"""
+        # Served directly, as /api/templates is rate limited and shared with test_rate_limiting
+        with onboarding_portal.app.test_request_context('/api/templates'):
+            response = onboarding_portal.TEMPLATES_RESPONSE.response()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data()), onboarding_portal.APPLICATION_TEMPLATES)
+        self.assertIn('public', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        
+        with onboarding_portal.app.test_request_context('/api/templates', headers={'If-None-Match': etag}):
+            response = onboarding_portal.TEMPLATES_RESPONSE.response()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        
+    def test_precomputed_json_negotiates_encoding(self):
+        """Test that large precomputed payloads are served gzip-compressed with a per-coding ETag"""
+        payload = onboarding_portal.PrecomputedJSON([{"id": i, "name": f"template-{i}"} for i in range(200)], max_age=60)
+        with onboarding_portal.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = payload.response()
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.get_data()))[199]['name'], 'template-199')
+        self.assertEqual(response.headers['ETag'], f'"{payload.etag}-gzip"')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        
+        # A client that switched codings still revalidates
+        with onboarding_portal.app.test_request_context(headers={'If-None-Match': response.headers['ETag']}):
+            self.assertEqual(payload.response().status_code, 304)
+        
+    def test_list_applications_compressed_and_conditional(self):
+        """Test that large listings are gzip-compressed and revalidate with a 304"""
+        self.login(follow_redirects=False)
+        projects = [
+            {"id": project_id, "name": f"app-{project_id}", "description": "Test application", "web_url": "",
+             "created_at": "", "last_activity_at": "", "visibility": "private"}
+            for project_id in range(1, 31)
+        ]
+        
+        def fake_gitlab(method, url, **kwargs):
+            if url.endswith('/user'):
+                return gitlab_response({"username": "test"})
+            return gitlab_response(projects)
+        
+        with patch('gitlab_client.requests.Session.request', side_effect=fake_gitlab):
+            response = self.app.get('/api/applications', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(gzip.decompress(response.data))['total'], 30)
+            
+            response = self.app.get('/api/applications', headers={'If-None-Match': response.headers['ETag']})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
         
     def test_rate_limiting(self):
         """Test API rate limiting"""
@@ -160,6 +635,7 @@ class TestOnboardingPortal(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data['status'], 'error')
         self.assertIn('Rate limit exceeded', data['message'])
+        self.assertGreater(instrumentation.RATE_LIMIT_REJECTIONS.value('/api/templates'), 0)
         
     def test_security_headers(self):
         """Test that security headers are present"""
@@ -193,37 +669,160 @@ class TestOnboardingService(unittest.TestCase):
         """Set up test environment"""
         os.environ['GITLAB_URL'] = 'https://test-gitlab.com'
         os.environ['GITLAB_TOKEN'] = 'test-token'
+        get_gitlab_client().credentials.invalidate()
         
-    @patch('onboarding_portal.subprocess.run')
-    def test_verify_credentials_success(self, mock_subprocess):
+    @patch('gitlab_client.requests.Session.request')
+    def test_verify_credentials_success(self, mock_request):
         """Test successful credential verification"""
-        mock_subprocess.return_value = MagicMock(
-            returncode=0, 
-            stdout='{"username": "test"}'
-        )
+        mock_request.return_value = gitlab_response({"username": "test"})
         
         service = OnboardingService()
         # If no exception is raised, credentials are valid
         self.assertIsInstance(service, OnboardingService)
         
-    @patch('onboarding_portal.subprocess.run')
-    def test_verify_credentials_failure(self, mock_subprocess):
+    @patch('gitlab_client.requests.Session.request')
+    def test_verify_credentials_failure(self, mock_request):
         """Test failed credential verification"""
-        mock_subprocess.return_value = MagicMock(
-            returncode=1, 
-            stderr='Unauthorized'
-        )
+        mock_request.return_value = gitlab_response({"message": "401 Unauthorized"}, 401)
         
         with self.assertRaises(OnboardingError):
             OnboardingService()
             
+    @patch('gitlab_client.requests.Session.request')
+    def test_snapshotter_is_the_only_index_refresher(self, mock_request):
+        """Test that the project listing is not polled twice when the status snapshot runs"""
+        mock_request.return_value = gitlab_response({"username": "test"})
+        
+        with patch('onboarding_portal.STATUS_SNAPSHOT_INTERVAL', 30):
+            service = OnboardingService()
+        self.assertEqual(service.project_index.refresh_interval, 0)
+        self.assertGreater(OnboardingService().project_index.refresh_interval, 0)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_verified_credentials_are_cached(self, mock_request):
+        """Test that token verification is reused within the TTL"""
+        mock_request.return_value = gitlab_response({"username": "test"})
+        
+        OnboardingService()
+        OnboardingService()
+        
+        self.assertEqual(mock_request.call_count, 1)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_unauthorized_response_invalidates_credentials(self, mock_request):
+        """Test that a 401 from GitLab drops the cached verification"""
+        mock_request.return_value = gitlab_response({"username": "test"})
+        service = OnboardingService()
+        self.assertTrue(service.gitlab.credentials.is_valid())
+        
+        mock_request.return_value = gitlab_response({"message": "401 Unauthorized"}, 401)
+        self.assertIsNone(service._get_project_by_name('test-app'))
+        
+        self.assertFalse(service.gitlab.credentials.is_valid())
+        with self.assertRaises(OnboardingError):
+            service._verify_credentials()
+            
+    @patch('gitlab_client.requests.Session.request')
+    def test_commit_files_falls_back_to_per_file(self, mock_request):
+        """Test that a rejected multi-action commit falls back to per-file commits"""
+        mock_request.side_effect = [
+            gitlab_response({"username": "test"}),
+            gitlab_response({"message": "404 Not Found"}, 404),
+            gitlab_response({"file_path": "Dockerfile"}, 200),
+            gitlab_response({"file_path": "deploy/service.yaml"}, 200),
+        ]
+        
+        service = OnboardingService()
+        service.commit_files(123, {
+            'Dockerfile': 'FROM alpine',
+            'deploy/service.yaml': 'kind: Service',
+        }, 'Update files', action='update')
+        
+        self.assertEqual(mock_request.call_count, 4)
+        self.assertEqual(mock_request.call_args_list[2].args[0], 'PUT')
+        self.assertTrue(mock_request.call_args_list[3].args[1].endswith('/repository/files/deploy%2Fservice.yaml'))
+
+    @patch('gitlab_client.requests.Session.request')
+    def test_commit_files_does_not_fall_back_after_ambiguous_failure(self, mock_request):
+        """Test that a failed multi-action commit that may have landed is not retried per file"""
+        mock_request.side_effect = [
+            gitlab_response({"username": "test"}),
+            gitlab_response({"message": "502 Bad Gateway"}, 502),
+        ]
+        
+        service = OnboardingService()
+        with self.assertRaises(GitLabAPIError) as ctx:
+            service.commit_files(123, {'Dockerfile': 'FROM alpine'}, 'Add files')
+        
+        self.assertEqual(ctx.exception.status_code, 502)
+        self.assertEqual(mock_request.call_count, 2)
+        
+        mock_request.side_effect = requests.exceptions.ReadTimeout("read timed out")
+        with self.assertRaises(GitLabAPIError):
+            service.commit_files(123, {'Dockerfile': 'FROM alpine'}, 'Add files')
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch('gitlab_client.requests.Session.request')
+    def test_commit_changed_files_skips_identical_blobs(self, mock_request):
+        """Test that only files whose git blob hash differs are committed"""
+        tree = [
+            {"path": ".gitlab-ci.yml", "type": "blob", "id": OnboardingService.git_blob_sha('stages: []\n')},
+            {"path": "Dockerfile", "type": "blob", "id": OnboardingService.git_blob_sha('FROM alpine\n')},
+            {"path": "deploy", "type": "tree", "id": "0" * 40},
+        ]
+        mock_request.side_effect = [
+            gitlab_response({"username": "test"}),
+            gitlab_response(tree),
+            gitlab_response({"id": "abc123"}, 201),
+            gitlab_response(tree),
+        ]
+
+        service = OnboardingService()
+        files = {
+            '.gitlab-ci.yml': 'stages: []\n',
+            'Dockerfile': 'FROM python:3.11-slim\n',
+            'deploy/service.yaml': 'kind: Service\n',
+        }
+        changed = service.commit_changed_files(123, files, 'Update files')
+
+        self.assertEqual(changed, ['Dockerfile', 'deploy/service.yaml'])
+        self.assertEqual(mock_request.call_args_list[1].kwargs['params']['recursive'], True)
+        commit = mock_request.call_args_list[2].kwargs['json']
+        self.assertEqual(
+            [(a['action'], a['file_path']) for a in commit['actions']],
+            [('update', 'Dockerfile'), ('create', 'deploy/service.yaml')]
+        )
+
+        # Nothing differs: no commit at all
+        changed = service.commit_changed_files(123, {'.gitlab-ci.yml': 'stages: []\n'}, 'Update files')
+        self.assertEqual(changed, [])
+        self.assertEqual(mock_request.call_count, 4)
+
+    @patch('gitlab_client.requests.Session.request')
+    def test_project_lookup_uses_index(self, mock_request):
+        """Test that name lookups are served from the project index"""
+        mock_request.side_effect = [
+            gitlab_response({"username": "test"}),
+            gitlab_response([{"id": 7, "name": "My-App", "web_url": "https://test.com/my-app"}]),
+        ]
+        
+        service = OnboardingService()
+        self.assertEqual(service._get_project_by_name('my-app')['id'], 7)
+        self.assertEqual(service._get_project_by_name('MY-APP')['id'], 7)
+        
+        # One listing call loads the index; no search calls are made
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertNotIn('search', mock_request.call_args.kwargs['params'])
+        
+        service.project_index.remove('my-app')
+        mock_request.side_effect = [gitlab_response([])]
+        self.assertIsNone(service._get_project_by_name('my-app'))
+        self.assertEqual(mock_request.call_args.kwargs['params'], {'search': 'my-app'})
+        
     def test_generate_ci_cd_pipeline_nodejs(self):
         """Test Node.js CI/CD pipeline generation"""
-        with patch('onboarding_portal.subprocess.run') as mock_subprocess:
-            mock_subprocess.return_value = MagicMock(
-                returncode=0, 
-                stdout='{"username": "test"}'
-            )
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
             
             service = OnboardingService()
             app_data = {
@@ -242,11 +841,8 @@ class TestOnboardingService(unittest.TestCase):
             
     def test_generate_ci_cd_pipeline_python(self):
         """Test Python CI/CD pipeline generation"""
-        with patch('onboarding_portal.subprocess.run') as mock_subprocess:
-            mock_subprocess.return_value = MagicMock(
-                returncode=0, 
-                stdout='{"username": "test"}'
-            )
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
             
             service = OnboardingService()
             app_data = {
@@ -265,11 +861,8 @@ class TestOnboardingService(unittest.TestCase):
             
     def test_generate_kubernetes_manifests(self):
         """Test Kubernetes manifest generation"""
-        with patch('onboarding_portal.subprocess.run') as mock_subprocess:
-            mock_subprocess.return_value = MagicMock(
-                returncode=0, 
-                stdout='{"username": "test"}'
-            )
+        with patch('gitlab_client.requests.Session.request') as mock_request:
+            mock_request.return_value = gitlab_response({"username": "test"})
             
             service = OnboardingService()
             app_data = {
@@ -279,8 +872,14 @@ class TestOnboardingService(unittest.TestCase):
                 'replicas': 2
             }
             
-            with patch('os.makedirs'):
-                manifests = service.generate_kubernetes_manifests(app_data)
+            # Rendering is purely in memory: nothing appears in the working
+            # directory, where manifests used to be written
+            workdir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, workdir, True)
+            self.addCleanup(os.chdir, os.getcwd())
+            os.chdir(workdir)
+            manifests = service.generate_kubernetes_manifests(app_data)
+            self.assertEqual(os.listdir(workdir), [])
                 
             self.assertIn('deployment.yaml', manifests)
             self.assertIn('service.yaml', manifests)
@@ -293,6 +892,715 @@ class TestOnboardingService(unittest.TestCase):
             self.assertIn('containerPort: 3000', deployment)
 
 
+class TestTemplateRegistry(unittest.TestCase):
+    """Test cases for the precompiled artifact templates"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.registry = TemplateRegistry(bytecode_cache_dir=tempfile.mkdtemp())
+        
+    def test_pipelines_share_base_jobs(self):
+        """Test that framework pipelines extend the shared build and deploy jobs"""
+        app_data = {'app_name': 'test-app', 'framework': 'java', 'java_version': '21'}
+        pipeline = self.registry.render_pipeline(app_data)
+        
+        self.assertIn('JAVA_VERSION: "21"', pipeline)
+        self.assertIn("coverage: '/Total.*?([0-9]{1,3})%/'", pipeline)
+        self.assertIn('docker build -t $DOCKER_REGISTRY/$APP_NAME:$CI_COMMIT_SHA .', pipeline)
+        self.assertIn('kubectl -n apps-dev rollout status deployment/$APP_NAME', pipeline)
+        self.assertTrue(pipeline.endswith('  when: manual\n'))
+        
+    def test_unknown_framework_falls_back_to_generic(self):
+        """Test that frameworks without templates get the generic artifacts"""
+        app_data = {'app_name': 'test-app', 'framework': 'react', 'port': 3000}
+        
+        pipeline = self.registry.render_pipeline(app_data)
+        self.assertNotIn('security-scan', pipeline)
+        self.assertIn('EXPOSE 3000', self.registry.render_dockerfile(app_data))
+        
+        manifests = self.registry.render_manifests(app_data)
+        self.assertIn('environment: {{ .Release.Namespace }}', manifests['deployment.yaml'])
+        self.assertIn('APP_VERSION={{ .Values.image.tag }}', manifests['configmap.yaml'])
+        
+    def test_render_cache_reuses_equivalent_specs(self):
+        """Test that re-rendering an equivalent spec is served from the render cache"""
+        registry = TemplateRegistry(bytecode_cache_dir=tempfile.mkdtemp(), render_cache_size=2)
+        app_data = {'app_name': 'test-app', 'framework': 'python', 'port': 8000}
+        
+        first = registry.render_pipeline(app_data)
+        with patch.object(registry, 'render') as mock_render:
+            again = registry.render_pipeline({'framework': 'python ', 'port': 8000,
+                                              'app_name': 'test-app', 'replicas': None})
+            mock_render.assert_not_called()
+        self.assertEqual(again, first)
+        self.assertEqual((registry.cache.hits, registry.cache.misses), (1, 1))
+        
+        # Any change to the spec is a different fingerprint
+        changed = dict(app_data, port=9000)
+        self.assertNotEqual(registry.fingerprint(changed), registry.fingerprint(app_data))
+        self.assertIn('EXPOSE 9000', registry.render_dockerfile(changed))
+        
+        # Least recently used entries are evicted beyond the bound
+        registry.render_dockerfile(app_data)
+        self.assertEqual(len(registry.cache), 2)
+
+
+class TestArtifactStore(unittest.TestCase):
+    """Test cases for the optional generated-artifact stores"""
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        
+    def test_memory_store_evicts_oldest_beyond_size_limit(self):
+        """Test that the memory store keeps within its byte budget"""
+        store = MemoryArtifactStore(max_bytes=20)
+        store.save('app-a', {'Dockerfile': 'x' * 10})
+        store.save('app-b', {'Dockerfile': 'y' * 10})
+        store.save('app-c', {'Dockerfile': 'z' * 10})
+        
+        self.assertIsNone(store.load('app-a'))
+        self.assertEqual(store.load('app-c'), {'Dockerfile': 'z' * 10})
+        self.assertEqual(store.size, 20)
+        self.assertFalse(store.save('app-d', {'Dockerfile': 'w' * 21}))
+        
+    def test_local_store_replaces_sets_and_collects_garbage(self):
+        """Test that the directory store swaps whole sets in and applies its limits"""
+        store = LocalArtifactStore(self.root, max_bytes=30, gc_interval=0)
+        store.save('app-a', {'Dockerfile': 'FROM alpine', 'deploy/service.yaml': 'kind: Service'})
+        store.save('app-a', {'Dockerfile': 'FROM python'})
+        self.assertEqual(store.load('app-a'), {'Dockerfile': 'FROM python'})
+        self.assertEqual(os.listdir(self.root), ['app-a'])
+        
+        # Oldest set goes once the directory exceeds its byte budget
+        os.utime(os.path.join(self.root, 'app-a'), (time.time() - 60,) * 2)
+        store.save('app-b', {'Dockerfile': 'x' * 25})
+        self.assertIsNone(store.load('app-a'))
+        self.assertIsNotNone(store.load('app-b'))
+        
+        with self.assertRaises(ValueError):
+            store.save('../escape', {'Dockerfile': 'FROM alpine'})
+        
+    def test_store_is_disabled_by_default(self):
+        """Test that no store is created without ARTIFACT_STORE"""
+        self.assertIsNone(create_artifact_store(''))
+        self.assertIsInstance(create_artifact_store(f"file://{self.root}"), LocalArtifactStore)
+
+
+class TestJobStore(unittest.TestCase):
+    """Test cases for the onboarding job stores"""
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        
+    def test_file_store_shares_jobs_between_workers(self):
+        """Test that a job queued by one worker can be polled through another"""
+        accepting, polling = JobQueue(FileJobStore(self.root)), JobQueue(FileJobStore(self.root))
+        job = accepting.submit('app-a', lambda job: {"status": "success"})
+        accepting._executor.shutdown(wait=True)
+        
+        stored = polling.get(job.job_id)
+        self.assertEqual(stored['state'], 'succeeded')
+        self.assertEqual(stored['result'], {"status": "success"})
+        self.assertIsNone(polling.get('../' + job.job_id))
+        
+    def test_file_store_collects_finished_jobs(self):
+        """Test that expired finished jobs are removed and running ones kept"""
+        store = FileJobStore(self.root, retention=60, gc_interval=3600)
+        store.save({"job_id": "a" * 32, "state": "succeeded"})
+        store.save({"job_id": "b" * 32, "state": "running"})
+        for name in os.listdir(self.root):
+            os.utime(os.path.join(self.root, name), (time.time() - 120,) * 2)
+        
+        store.gc()
+        self.assertIsNone(store.load("a" * 32))
+        self.assertEqual(store.load("b" * 32)['state'], 'running')
+        
+    def test_store_failure_releases_reservations(self):
+        """Test that jobs the store could not save do not keep holding queue capacity"""
+        queue = JobQueue(MemoryJobStore(), max_pending=2)
+        with patch.object(queue.store, 'save', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                queue.submit('app-a', lambda job: None)
+            with self.assertRaises(OSError):
+                queue.submit_batch([('app-a', lambda job: None), ('app-b', lambda job: None)])
+        self.assertEqual(queue._pending, 0)
+        
+        batch_id, jobs = queue.submit_batch([('app-a', lambda job: None), ('app-b', lambda job: None)])
+        self.assertEqual(len(jobs), 2)
+        
+    def test_store_from_uri(self):
+        """Test that ONBOARDING_JOB_STORE URIs select the store"""
+        self.assertIsInstance(create_job_store('memory://'), MemoryJobStore)
+        self.assertIsInstance(create_job_store(f"file://{self.root}"), FileJobStore)
+        with self.assertRaises(ValueError):
+            create_job_store('sqlite:///jobs.db')
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for the Prometheus text exposition"""
+    
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test that histogram buckets are cumulative and end with +Inf"""
+        registry = instrumentation.Registry()
+        histogram = registry.histogram('test_seconds', 'Test latency', ('route',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, '/a')
+        histogram.observe(0.5, '/a')
+        histogram.observe(5, '/a')
+        
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ['# HELP test_seconds Test latency', '# TYPE test_seconds histogram'])
+        self.assertEqual(lines[2:7], [
+            'test_seconds_bucket{route="/a",le="0.1"} 1',
+            'test_seconds_bucket{route="/a",le="1"} 2',
+            'test_seconds_bucket{route="/a",le="+Inf"} 3',
+            'test_seconds_sum{route="/a"} 5.55',
+            'test_seconds_count{route="/a"} 3',
+        ])
+        
+    def test_snapshots_from_worker_processes_are_combined(self):
+        """Test that counters and histograms are summed across processes and gauges kept apart"""
+        registry = instrumentation.Registry()
+        counter = registry.counter('test_total', 'Test count', ('route',))
+        histogram = registry.histogram('test_seconds', 'Test latency', (), buckets=(1.0,))
+        registry.collected('test_ratio', 'Test gauge', ('cache',), lambda: [(('a',), 0.5)])
+        counter.inc('/a', amount=2)
+        histogram.observe(0.5)
+        first = json.loads(json.dumps(registry.snapshot()))
+        registry.reset()
+        counter.inc('/a')
+        counter.inc('/b')
+        histogram.observe(5)
+        second = json.loads(json.dumps(registry.snapshot()))
+        
+        lines = registry.render([(100, True, first), (101, False, second)]).splitlines()
+        self.assertIn('test_total{route="/a"} 3', lines)
+        self.assertIn('test_total{route="/b"} 1', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 1', lines)
+        self.assertIn('test_seconds_count 2', lines)
+        # Gauges of exited workers are dropped
+        self.assertIn('test_ratio{cache="a",pid="100"} 0.5', lines)
+        self.assertNotIn('pid="101"', '\n'.join(lines))
+        
+    def test_metrics_endpoint_reports_every_worker(self):
+        """Test that /metrics includes metrics written by other worker processes"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        other_worker = {'portal_rate_limit_rejections_total': [[['/api/other'], 7]]}
+        with open(os.path.join(directory, 'metrics-1.json'), 'w') as f:
+            json.dump(other_worker, f)
+        
+        with patch('instrumentation.METRICS_MULTIPROC_DIR', directory):
+            response = app.test_client().get('/metrics')
+        
+        self.assertIn('portal_rate_limit_rejections_total{route="/api/other"} 7', response.get_data(as_text=True))
+        self.assertIn(f"metrics-{os.getpid()}.json", os.listdir(directory))
+        
+    def test_gitlab_calls_are_attributed_to_operations(self):
+        """Test that client calls are labelled with the enclosing operation"""
+        with instrumentation.gitlab_operation('test_operation'):
+            instrumentation.observe_gitlab_request('GET', 404, 0.2)
+        instrumentation.observe_gitlab_request('GET', None, 0.2)
+        
+        self.assertEqual(instrumentation.GITLAB_REQUEST_DURATION.count('test_operation', 'GET'), 1)
+        self.assertEqual(instrumentation.GITLAB_REQUEST_ERRORS.value('test_operation', 'GET', '404'), 1)
+        self.assertGreaterEqual(instrumentation.GITLAB_REQUEST_ERRORS.value('other', 'GET', '0'), 1)
+
+
+    def test_trace_aggregates_spans_by_name(self):
+        """Test that Server-Timing totals repeated spans and the span list is capped"""
+        with patch('instrumentation.TRACE_MAX_SPANS', 2), instrumentation.traced_block('test') as trace:
+            for _ in range(3):
+                with instrumentation.span('step'):
+                    pass
+        
+        self.assertEqual(len(trace.spans), 2)
+        self.assertEqual(trace.dropped_spans, 1)
+        self.assertIn('step;dur=', trace.server_timing())
+        self.assertIn('desc="3 calls"', trace.server_timing())
+        self.assertIsNone(instrumentation.current_trace())
+
+
+class TestPortalLogging(unittest.TestCase):
+    """Test cases for queued, rotated log output"""
+    
+    def setUp(self):
+        """Set up an isolated logger"""
+        self.logger = logging.getLogger(f"test-portal-logging-{self.id()}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        
+    def test_records_are_written_by_listener_with_rotation(self):
+        """Test that queued records reach a size-rotated JSON log file"""
+        log_file = os.path.join(self.log_dir, 'portal.log')
+        handlers = portal_logging.build_handlers(log_file, 'json', max_bytes=2000, backup_count=2)[1:]
+        queue_handler, listener = portal_logging.create_log_pipeline(handlers)
+        self.logger.addHandler(queue_handler)
+        listener.start()
+        for i in range(50):
+            self.logger.info("request %d handled", i)
+        listener.stop()
+        for handler in handlers:
+            handler.close()
+        
+        self.assertTrue(os.path.exists(f"{log_file}.1"))
+        self.assertFalse(os.path.exists(f"{log_file}.3"))
+        with open(log_file) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(entries[-1]["message"], "request 49 handled")
+        self.assertEqual(entries[-1]["level"], "INFO")
+        self.assertLessEqual(os.path.getsize(log_file), 2000)
+        
+    def test_forked_worker_logs_to_its_own_file(self):
+        """Test that per-process log files are reopened under the worker's pid after a fork"""
+        log_file = os.path.join(self.log_dir, 'portal.log')
+        self.assertEqual(portal_logging.process_log_file(log_file, per_process=False), log_file)
+        self.assertEqual(portal_logging.process_log_file(log_file, per_process=True),
+                         os.path.join(self.log_dir, f"portal.{os.getpid()}.log"))
+        
+        queue_handler, listener = portal_logging.create_log_pipeline(portal_logging.build_handlers(
+            os.path.join(self.log_dir, 'portal.parent.log')
+        ))
+        with patch('portal_logging.LOG_FILE', log_file), patch('portal_logging.LOG_FILE_PER_PROCESS', True), \
+                patch('portal_logging._queue_handler', queue_handler), patch('portal_logging._listener', listener):
+            portal_logging._restart_after_fork()
+            child_listener = portal_logging._listener
+        
+        self.logger.addHandler(queue_handler)
+        self.logger.info("handled in the child")
+        child_listener.stop()
+        for handler in child_listener.handlers:
+            handler.close()
+        
+        with open(os.path.join(self.log_dir, f"portal.{os.getpid()}.log")) as f:
+            self.assertIn("handled in the child", f.read())
+        self.assertTrue(listener.handlers[1].stream is None)
+        
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that logging never blocks on a full queue and debug records are sampled"""
+        queue_handler, _ = portal_logging.create_log_pipeline([], queue_size=2, debug_sample_rate=0)
+        self.logger.addHandler(queue_handler)
+        
+        for i in range(5):
+            self.logger.debug("sampled out %d", i)
+        self.assertEqual(queue_handler.queue.qsize(), 0)
+        
+        for i in range(5):
+            self.logger.warning("burst %d", i)
+        self.assertEqual(queue_handler.queue.qsize(), 2)
+        self.assertEqual(queue_handler.dropped, 3)
+
+
+class TestGitLabSimulator(unittest.TestCase):
+    """Test cases for the local GitLab API simulator"""
+    
+    def setUp(self):
+        """Start a simulator with a generated dataset"""
+        self.simulator = GitLabSimulator(projects=250, environments=3, seed=1).start()
+        self.addCleanup(self.simulator.stop)
+        self.client = GitLabClient(self.simulator.url, 'test-token', retry_attempts=2, breaker_threshold=0)
+        self.addCleanup(self.client.close)
+        
+    def test_listing_pages_and_repository_round_trip(self):
+        """Test keyset-paginated listings and commits visible in the repository tree"""
+        projects = list(self.client.paginate('projects', params={'tag_list': 'onboarded'}))
+        self.assertEqual(len(projects), 250)
+        self.assertEqual(len({project['id'] for project in projects}), 250)
+        self.assertEqual(len(self.client.get('projects/1/environments')), 3)
+        
+        project = self.client.post('projects', {'name': 'round-trip', 'description': '', 'tag_list': ['onboarded']})
+        self.client.post(f"projects/{project['id']}/repository/commits", {
+            'branch': 'main', 'commit_message': 'Add manifest',
+            'actions': [{'action': 'create', 'file_path': 'deploy/service.yaml', 'content': 'kind: Service\n'}]
+        })
+        tree = list(self.client.paginate(f"projects/{project['id']}/repository/tree", {'recursive': True}))
+        self.assertIn(
+            {'path': 'deploy/service.yaml', 'id': OnboardingService.git_blob_sha('kind: Service\n')},
+            [{'path': item['path'], 'id': item['id']} for item in tree]
+        )
+        
+        with self.assertRaises(GitLabAPIError) as ctx:
+            self.client.post('projects', {'name': 'round-trip'})
+        self.assertEqual(ctx.exception.status_code, 400)
+        
+    def test_injected_errors_and_latency(self):
+        """Test that configured error rates and latency apply to API requests"""
+        self.simulator.error_rate = 1.0
+        self.simulator.error_statuses = (503,)
+        with self.assertRaises(GitLabAPIError) as ctx:
+            self.client.get('user')
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(self.simulator.injected_errors, 2)
+        
+        self.simulator.error_rate = 0.0
+        self.simulator.latency = LatencyModel('fixed:50')
+        started = time.monotonic()
+        self.client.get('user')
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        
+        stats = requests.get(f"{self.simulator.url}/_simulator/stats").json()
+        self.assertEqual(stats['requests']['GET /user'], 3)
+        with self.assertRaises(ValueError):
+            LatencyModel('lognormal:80')
+
+
+class TestStatusSnapshot(unittest.TestCase):
+    """Test cases for status snapshot change detection"""
+    
+    def app_status(self, name, environments, unavailable=False):
+        return {"id": 1, "name": name, "environments": environments, "environments_unavailable": unavailable}
+    
+    def test_diff_reports_only_changed_environments(self):
+        """Test that diffs carry only the environments whose state changed"""
+        running = {"status": "available", "url": "", "last_deployment": "Never"}
+        stopped = {"status": "stopped", "url": "", "last_deployment": "Never"}
+        previous = StatusSnapshot({
+            "app-a": self.app_status("app-a", {"production": running, "development": running, "review": running}),
+            "app-b": self.app_status("app-b", {"production": running}),
+            "app-c": self.app_status("app-c", {"production": running}),
+        })
+        current = StatusSnapshot({
+            "app-a": self.app_status("app-a", {"production": running, "development": stopped}),
+            "app-b": self.app_status("app-b", {}, unavailable=True),
+            "app-d": self.app_status("app-d", {"production": running}),
+        })
+        
+        events = diff_snapshots(previous, current)
+        
+        self.assertEqual(events, [
+            {"type": "status", "app": "app-a", "environments": {"development": stopped}, "removed": ["review"]},
+            {"type": "app_added", "app": "app-d", "environments": {"production": running}},
+            {"type": "app_removed", "app": "app-c"},
+        ])
+        self.assertEqual(diff_snapshots(None, current), [])
+
+
+class TestGitLabClient(unittest.TestCase):
+    """Test cases for the pooled GitLab API client"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.client = GitLabClient('https://test-gitlab.com/', 'test-token', pool_size=5)
+
+    def tearDown(self):
+        """Close pooled connections"""
+        self.client.close()
+
+    def test_session_is_pooled_and_authenticated(self):
+        """Test that requests share one bounded keep-alive pool"""
+        adapter = self.client.session.get_adapter('https://test-gitlab.com/api/v4/user')
+        self.assertEqual(adapter._pool_maxsize, 5)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(self.client.session.headers['PRIVATE-TOKEN'], 'test-token')
+
+    @patch('gitlab_client.requests.Session.request')
+    def test_get_builds_api_url(self, mock_request):
+        """Test that paths are resolved against the v4 API"""
+        mock_request.return_value = gitlab_response([{"id": 1}])
+
+        projects = self.client.get('projects', params={'search': 'test-app'})
+
+        self.assertEqual(projects, [{"id": 1}])
+        args, kwargs = mock_request.call_args
+        self.assertEqual(args[:2], ('GET', 'https://test-gitlab.com/api/v4/projects'))
+        self.assertEqual(kwargs['params'], {'search': 'test-app'})
+
+    @patch('gitlab_client.requests.Session.request')
+    def test_http_error_raises(self, mock_request):
+        """Test that GitLab error statuses raise GitLabAPIError"""
+        mock_request.return_value = gitlab_response({"message": "404 Not found"}, 404)
+
+        with self.assertRaises(GitLabAPIError) as ctx:
+            self.client.get('projects/999')
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    @patch('gitlab_client.time.sleep')
+    @patch('gitlab_client.requests.Session.request')
+    def test_get_retries_transient_errors(self, mock_request, mock_sleep):
+        """Test that GETs are retried with backoff, honoring Retry-After, and writes are not"""
+        mock_request.side_effect = [
+            gitlab_response({"message": "502 Bad Gateway"}, 502),
+            gitlab_response({"message": "429 Too Many Requests"}, 429, {'Retry-After': '2'}),
+            gitlab_response([{"id": 1}]),
+        ]
+        self.assertEqual(self.client.get('projects'), [{"id": 1}])
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertLessEqual(mock_sleep.call_args_list[0].args[0], 0.25)
+        self.assertEqual(mock_sleep.call_args_list[1].args[0], 2.0)
+        
+        mock_request.reset_mock(side_effect=True)
+        mock_request.return_value = gitlab_response({"message": "503 Service Unavailable"}, 503)
+        with self.assertRaises(GitLabAPIError):
+            self.client.post('projects', {'name': 'test-app'})
+        self.assertEqual(mock_request.call_count, 1)
+        
+        # A Retry-After beyond the maximum wait fails immediately
+        mock_request.reset_mock()
+        mock_request.return_value = gitlab_response({}, 429, {'Retry-After': '120'})
+        with self.assertRaises(GitLabAPIError):
+            self.client.get('projects')
+        self.assertEqual(mock_request.call_count, 1)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_circuit_breaker_fails_fast_and_serves_cache(self, mock_request):
+        """Test that an open breaker stops GitLab calls but still serves cached reads"""
+        client = GitLabClient('https://test-gitlab.com/', 'test-token', retry_attempts=1, breaker_threshold=2)
+        self.addCleanup(client.close)
+        mock_request.return_value = gitlab_response([{"id": 1}], headers={'ETag': 'W/"projects-v1"'})
+        client.get('projects')
+        
+        mock_request.side_effect = requests.ConnectionError("connection refused")
+        for _ in range(2):
+            with self.assertRaises(GitLabAPIError):
+                client.get('user')
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        
+        mock_request.reset_mock()
+        with self.assertRaises(CircuitOpenError):
+            client.get('user')
+        self.assertEqual(client.get('projects'), [{"id": 1}])
+        mock_request.assert_not_called()
+        
+        # After the cooldown one probe is let through and closes the breaker on success
+        client.breaker.cooldown = 0
+        mock_request.side_effect = None
+        mock_request.return_value = gitlab_response({"username": "test"})
+        self.assertEqual(client.get('user'), {"username": "test"})
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_concurrent_identical_gets_are_coalesced(self, mock_request):
+        """Test that identical GETs in flight together share one GitLab call"""
+        release = threading.Event()
+        
+        def slow_gitlab(method, url, **kwargs):
+            release.wait(5)
+            return gitlab_response([{"id": 1}])
+        mock_request.side_effect = slow_gitlab
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.client.get('projects', params={'tag_list': 'onboarded'})))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        deadline_at = time.monotonic() + 5
+        while self.client.singleflight.shared < 4 and time.monotonic() < deadline_at:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(results, [[{"id": 1}]] * 5)
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(self.client.singleflight.shared, 4)
+        
+        # Once the call has finished, the next read goes to GitLab again
+        self.client.get('projects', params={'tag_list': 'onboarded'})
+        self.assertEqual(mock_request.call_count, 2)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_leader_deadline_does_not_fail_waiters(self, mock_request):
+        """Test that a waiter with time left calls again when the shared call ran out of the leader's time"""
+        leader_started, release = threading.Event(), threading.Event()
+        
+        def gitlab(method, url, **kwargs):
+            if mock_request.call_count == 1:
+                leader_started.set()
+                release.wait(5)
+                raise requests.exceptions.ReadTimeout("read timed out")
+            return gitlab_response([{"id": 1}])
+        mock_request.side_effect = gitlab
+        
+        errors = []
+        def lead():
+            with deadline(0.05):
+                try:
+                    self.client.get('projects')
+                except GitLabAPIError as e:
+                    errors.append(e)
+        leader = threading.Thread(target=lead)
+        leader.start()
+        leader_started.wait(5)
+        
+        results = []
+        def wait():
+            with deadline(10):
+                results.append(self.client.get('projects'))
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        deadline_at = time.monotonic() + 5
+        while self.client.singleflight.shared < 1 and time.monotonic() < deadline_at:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+        
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(results, [[{"id": 1}]])
+        self.assertEqual(mock_request.call_count, 2)
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_deadline_bounds_timeouts(self, mock_request):
+        """Test that calls inherit the remaining deadline and are not sent past it"""
+        mock_request.return_value = gitlab_response([])
+        with deadline(2):
+            self.client.get('projects')
+        self.assertLessEqual(mock_request.call_args.kwargs['timeout'], 2)
+        
+        mock_request.reset_mock()
+        with deadline(0), self.assertRaises(DeadlineExceeded):
+            self.client.get('projects')
+        mock_request.assert_not_called()
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_paginate_follows_next_links(self, mock_request):
+        """Test that pagination walks every page via the Link header"""
+        next_url = 'https://test-gitlab.com/api/v4/projects?id_after=2&pagination=keyset'
+        mock_request.side_effect = [
+            gitlab_response([{"id": 1}, {"id": 2}], headers={'Link': f'<{next_url}>; rel="next"'}),
+            gitlab_response([{"id": 3}]),
+        ]
+        
+        ids = [project['id'] for project in self.client.paginate('projects', per_page=2)]
+        
+        self.assertEqual(ids, [1, 2, 3])
+        first, second = mock_request.call_args_list
+        self.assertEqual(first.kwargs['params']['pagination'], 'keyset')
+        self.assertEqual(first.kwargs['params']['per_page'], 2)
+        self.assertEqual(second.args[1], next_url)
+        self.assertIsNone(second.kwargs['params'])
+        
+    @patch('gitlab_client.requests.Session.request')
+    def test_conditional_get_serves_304_from_cache(self, mock_request):
+        """Test that cached GETs revalidate with If-None-Match and reuse the body on 304"""
+        mock_request.side_effect = [
+            gitlab_response([{"name": "production"}], headers={'ETag': 'W/"abc"'}),
+            gitlab_response(status_code=304, headers={'ETag': 'W/"abc"'}),
+        ]
+        
+        first = self.client.get('projects/1/environments')
+        second = self.client.get('projects/1/environments')
+        
+        self.assertEqual(first, second)
+        self.assertEqual(mock_request.call_args.kwargs['headers'], {'If-None-Match': 'W/"abc"'})
+        self.assertEqual((self.client.cache.hits, self.client.cache.misses), (1, 1))
+        
+    def test_response_cache_lru_and_ttl(self):
+        """Test that the response cache evicts least recently used and expired entries"""
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+        
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'A')
+        
+        cache.ttl = 0
+        self.assertIsNone(cache.get('c'))
+        self.assertEqual(len(cache), 1)
+        
+    def test_encode_file_path(self):
+        """Test that repository file paths are fully URL-encoded"""
+        self.assertEqual(GitLabClient.encode('deploy/service.yaml'), 'deploy%2Fservice.yaml')
+
+
+class TestServingConfig(unittest.TestCase):
+    """Test cases for the gunicorn serving modes"""
+    
+    CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, True)
+        
+    def load_config(self, **env):
+        import runpy
+        env.setdefault('METRICS_MULTIPROC_DIR', self.metrics_dir)
+        with patch.dict(os.environ, env):
+            config = runpy.run_path(self.CONFIG)
+            return config, dict(os.environ)
+        
+    def test_sync_mode_uses_threaded_workers(self):
+        """Test that the default mode keeps the threaded workers"""
+        config, _ = self.load_config(PORTAL_SERVER_MODE='sync')
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual(config['threads'], 16)
+        
+    def test_async_workers_follow_usable_cpus(self):
+        """Test that async mode does not start a worker per node CPU"""
+        with patch('os.sched_getaffinity', return_value=set(range(64))):
+            config, _ = self.load_config(PORTAL_SERVER_MODE='async')
+        self.assertEqual(config['worker_class'], 'gevent')
+        self.assertLessEqual(config['workers'], 4)
+        config, _ = self.load_config(PORTAL_SERVER_MODE='async', GUNICORN_WORKERS='3')
+        self.assertEqual(config['workers'], 3)
+        
+    def test_preload_defaults_follow_serving_mode(self):
+        """Test that only sync mode preloads the app in the master by default"""
+        self.assertTrue(self.load_config(PORTAL_SERVER_MODE='sync')[0]['preload_app'])
+        self.assertFalse(self.load_config(PORTAL_SERVER_MODE='async')[0]['preload_app'])
+        
+    def test_create_app_applies_config(self):
+        """Test that the app factory builds an independent app with overrides"""
+        portal_app = create_app({'SECRET_KEY': 'factory-secret', 'TESTING': True})
+        self.assertIsNot(portal_app, app)
+        self.assertEqual(portal_app.secret_key, 'factory-secret')
+        self.assertIn('portal.onboard_application', portal_app.view_functions)
+        
+        response = portal_app.test_client().get('/login')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Frame-Options'], 'DENY')
+        
+    def test_forked_worker_rebuilds_gitlab_client(self):
+        """Test that per-process GitLab state is not reused after a fork"""
+        parent_client = get_gitlab_client()
+        onboarding_portal._reset_after_fork()
+        self.assertIsNot(get_gitlab_client(), parent_client)
+        
+    def test_multiple_workers_share_jobs_and_metrics(self):
+        """Test that jobs and metrics are not kept per worker when gunicorn starts several"""
+        _, env = self.load_config(PORTAL_SERVER_MODE='sync')
+        self.assertTrue(env['ONBOARDING_JOB_STORE'].startswith('file://'))
+        self.assertTrue(env['METRICS_MULTIPROC_DIR'])
+        _, env = self.load_config(PORTAL_SERVER_MODE='sync', ONBOARDING_JOB_STORE='redis://redis:6379/0')
+        self.assertEqual(env['ONBOARDING_JOB_STORE'], 'redis://redis:6379/0')
+        
+    def test_stale_metrics_removed_when_server_starts(self):
+        """Test that metrics files of a previous run are removed by the master, not on import"""
+        stale = os.path.join(self.metrics_dir, 'metrics-1.json')
+        with open(stale, 'w') as f:
+            f.write('{}')
+        config, env = self.load_config(PORTAL_SERVER_MODE='sync')
+        self.assertTrue(os.path.exists(stale))
+        
+        with patch.dict(os.environ, env):
+            config['on_starting'](None)
+        self.assertFalse(os.path.exists(stale))
+        
+    def test_multiple_workers_do_not_share_a_log_file(self):
+        """Test that several workers log to stdout, or to a file each when LOG_FILE is set"""
+        _, env = self.load_config(PORTAL_SERVER_MODE='sync')
+        self.assertEqual(env['LOG_FILE'], '')
+        _, env = self.load_config(PORTAL_SERVER_MODE='sync', LOG_FILE='/var/log/portal.log')
+        self.assertEqual(env['LOG_FILE'], '/var/log/portal.log')
+        self.assertEqual(env['LOG_FILE_PER_PROCESS'], 'true')
+        
+    def test_async_mode_uses_gevent_with_large_gitlab_pool(self):
+        """Test that async mode switches to gevent and widens GitLab concurrency"""
+        config, env = self.load_config(PORTAL_SERVER_MODE='async', FANOUT_WORKERS='50')
+        self.assertEqual(config['worker_class'], 'gevent')
+        self.assertEqual(env['GITLAB_POOL_SIZE'], '200')
+        # Explicit settings are left alone
+        self.assertEqual(env['FANOUT_WORKERS'], '50')
+
+
 class TestCLITool(unittest.TestCase):
     """Test cases for the CLI tool"""
     
@@ -308,6 +1616,39 @@ class TestCLITool(unittest.TestCase):
             self.assertTrue(True)
         except ImportError:
             self.fail("Failed to import onboarding_cli module")
+            
+    def test_templates_revalidated_from_cache(self):
+        """Test that the CLI reuses its cached templates when the portal answers 304"""
+        import onboarding_cli
+        cache_file = os.path.join(tempfile.mkdtemp(), 'templates.json')
+        templates = [{"id": "python", "name": "Python Application"}]
+        
+        with patch('onboarding_cli.TEMPLATE_CACHE_FILE', cache_file), \
+                patch('onboarding_cli.requests.get') as mock_get:
+            mock_get.return_value = MagicMock(status_code=200, headers={'ETag': '"abc"'})
+            mock_get.return_value.json.return_value = templates
+            self.assertEqual(onboarding_cli.get_templates(), templates)
+            self.assertEqual(mock_get.call_args.kwargs['headers'], {})
+            
+            mock_get.return_value = MagicMock(status_code=304)
+            self.assertEqual(onboarding_cli.get_templates(), templates)
+            self.assertEqual(mock_get.call_args.kwargs['headers'], {'If-None-Match': '"abc"'})
+
+            
+    def test_lost_job_is_not_reported_as_failed(self):
+        """Test that a job the portal no longer knows ends with an unknown outcome"""
+        import onboarding_cli
+        accepted = MagicMock(status_code=202)
+        accepted.json.return_value = {"status_url": "/api/jobs/abc"}
+        
+        with patch('onboarding_cli.requests.post', return_value=accepted), \
+                patch('onboarding_cli.requests.get', return_value=MagicMock(status_code=404, ok=False)), \
+                patch('onboarding_cli.JOB_LOOKUP_GRACE', 0), \
+                patch('onboarding_cli.time.sleep'):
+            with self.assertRaises(SystemExit) as ctx:
+                onboarding_cli.deploy_application({'app_name': 'my-app'})
+        
+        self.assertEqual(ctx.exception.code, onboarding_cli.EXIT_OUTCOME_UNKNOWN)
 
 
 if __name__ == '__main__':